@@ -0,0 +1,103 @@
+"""
+Local admin HTTP server for a worker process.
+
+Serves a small table of GET routes (metrics, debug endpoints) from a daemon
+thread, so scraping or debugging never runs on the event loop that carries
+audio. Binds to localhost only.
+"""
+
+import logging
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+logger = logging.getLogger("restaurant.admin_server")
+
+# A route handler gets the query parameters and returns (status, content type, body)
+RouteHandler = Callable[[Dict[str, str]], Tuple[int, str, bytes]]
+
+_ROUTES: Dict[str, RouteHandler] = {}
+_SERVER: Optional[ThreadingHTTPServer] = None
+_SERVER_LOCK = threading.Lock()
+
+DEFAULT_PORT = 9464
+# Job processes each get their own server; try this many consecutive ports
+_PORT_ATTEMPTS = 32
+
+
+def register_route(path: str, handler: RouteHandler) -> None:
+    _ROUTES[path] = handler
+
+
+class _AdminRequestHandler(BaseHTTPRequestHandler):
+    def do_GET(self) -> None:
+        url = urlparse(self.path)
+        handler = _ROUTES.get(url.path)
+        if handler is None:
+            self._send(404, "text/plain; charset=utf-8", b"not found\n")
+            return
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        try:
+            status, content_type, body = handler(params)
+        except Exception as e:
+            logger.exception("admin route %s failed", url.path)
+            status, content_type, body = 500, "text/plain; charset=utf-8", f"{e}\n".encode()
+        self._send(status, content_type, body)
+
+    def _send(self, status: int, content_type: str, body: bytes) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:
+        # Scrapes every few seconds would otherwise flood stderr
+        pass
+
+
+def start_admin_server(port: Optional[int] = None) -> Optional[int]:
+    """
+    Start the admin server once per process and return the port it bound.
+
+    The base port comes from AGENT_ADMIN_PORT (default 9464); if it is taken
+    (another job process on this host), the next free port is used. Setting
+    AGENT_ADMIN_PORT to an empty string disables the server.
+    """
+    global _SERVER
+    with _SERVER_LOCK:
+        if _SERVER is not None:
+            return _SERVER.server_address[1]
+
+        if port is None:
+            configured = os.getenv("AGENT_ADMIN_PORT", str(DEFAULT_PORT))
+            if not configured.strip():
+                return None
+            port = int(configured)
+
+        for candidate in range(port, port + _PORT_ATTEMPTS):
+            try:
+                _SERVER = ThreadingHTTPServer(("127.0.0.1", candidate), _AdminRequestHandler)
+                break
+            except OSError:
+                continue
+        else:
+            logger.warning("no free admin port in %d-%d", port, port + _PORT_ATTEMPTS - 1)
+            return None
+
+        _SERVER.daemon_threads = True
+        threading.Thread(target=_SERVER.serve_forever, name="admin-server", daemon=True).start()
+        bound = _SERVER.server_address[1]
+        logger.info("admin server listening on http://127.0.0.1:%d (pid %d)", bound, os.getpid())
+        return bound
+
+
+def stop_admin_server() -> None:
+    global _SERVER
+    with _SERVER_LOCK:
+        if _SERVER is not None:
+            _SERVER.shutdown()
+            _SERVER.server_close()
+            _SERVER = None
@@ -1,30 +1,65 @@
+import asyncio
 import logging
 import os
 import sys
+from typing import Optional
 from dotenv import load_dotenv
-from livekit import rtc
 from livekit.agents import (
     Agent,
     AgentServer,
-    AgentSession,
     ChatContext,
     ChatMessage,
     JobContext,
     JobProcess,
     RunContext,
+    StopResponse,
     cli,
     function_tool,
-    inference,
-    room_io,
 )
-from livekit.plugins import (
-    noise_cancellation,
-    silero,
-    groq,
-)
-from livekit.plugins.turn_detector.multilingual import MultilingualModel
 
-from rag_engine import get_index
+from rag_engine import get_index, get_lexical_fallback, get_retriever, start_index_build
+from retrieval_filters import NO_FILTER, RetrievalFilter, infer_retrieval_filter, without_doc_type
+from doc_metadata import DOC_TYPE_MENU
+from faq_fast_path import FaqIndex, confidence_threshold, get_faq_index, start_faq_index_build
+from menu_digest import CONTEXT_MODE_DIGEST, digest_instructions, load_digest
+from menu_digest import context_mode as menu_context_mode
+from phrase_cache import GREETING, PhraseCache, default_phrases, get_phrase_cache, load_phrase_cache, tts_synthesizer
+from admin_server import start_admin_server
+from logging_setup import bind_correlation_id, configure_logging, log_transcript
+from profiler import install_signal_handlers, track_session, untrack_session
+from prompt_budget import RAG_CONTEXT_EXTRA, count_tokens, enforce_budget, token_budget
+from latency_profiles import load_profiles
+from order_store import get_order_store
+from provider_pool import get_provider_pool
+from session_store import SessionSnapshot, compact_summary, get_session_store
+from startup_profile import startup_step, startup_steps
+from worker_load import (
+    admission_control,
+    claim_report_dir,
+    compute_load,
+    load_threshold,
+    retrieval_in_flight,
+    start_load_reporting,
+)
+from session_factory import (
+    AGENT_NAME,
+    build_session,
+    caller_identity,
+    is_warmup_dispatch,
+    load_plugins,
+    prewarm_models,
+    room_options,
+    select_profile,
+    warm_up,
+)
+from telemetry import (
+    bind_session,
+    count_faq_fast_path,
+    record_prompt_usage,
+    release_session,
+    span,
+    traced_tool,
+)
 
 from tools.display_helpers import handle_show_menu_item
 from tools.cart_helpers import (
@@ -34,40 +69,63 @@ from tools.cart_helpers import (
     handle_clear_cart,
     handle_get_cart_summary,
 )
+from tools.message_sender import send_data_message
 from tools.navigation_helpers import handle_go_to_menu, handle_cancel_payment
 from tools.order_helpers import (
     handle_proceed_to_payment,
+    handle_set_fulfilment,
     handle_cancel_order,
     handle_modify_order,
+    listen_for_payments,
 )
 
 logger = logging.getLogger("agent-Sage-17cf")
 
+# Heavy modules (llama_index and torch, the livekit plugins) are not imported at
+# module level, so spawning a job process is cheap: they load in prewarm
 load_dotenv()
 
-# Check API Key
-if not os.getenv("GROQ_API_KEY"):
-    print("WARNING: GROQ_API_KEY not found in environment!")
-else:
-    print("GROQ_API_KEY loaded successfully.")
-
-# Global index getter to avoid reloading - or load in init
-# Global variable for the index
-_RAG_INDEX = None
+# The index is loaded (or built on a miss) in the background by rag_engine;
+# until it is ready, search_menu answers from a keyword-only fallback.
 
 def _get_rag_index():
-    global _RAG_INDEX
-    if _RAG_INDEX is None:
-        _RAG_INDEX = get_index()
-    return _RAG_INDEX
-
-def search_menu(query: str) -> str:
+    return get_index(block=False)
+
+def search_menu(
+    query: str,
+    retrieval_filter: RetrievalFilter = NO_FILTER,
+    widen: bool = True,
+    query_embedding=None,
+) -> str:
     index = _get_rag_index()
     if index is None:
-        return "No menu data is available."
+        fallback = get_lexical_fallback()
+        if fallback is None:
+            return "No menu data is available."
+        with span("search_menu.lexical"):
+            chunks = fallback.search(query, top_k=3)
+        if not chunks:
+            return "No relevant menu information found."
+        return "\n\n".join(chunks)
+
+    retriever = get_retriever(block=False)
+    if retriever is not None:
+        if query_embedding is None:
+            with span("search_menu.embed"):
+                query_embedding = retriever.embed(query)
+        # Search only the partitions the filter selects; widen to everything
+        # if the filter was too narrow to find anything
+        with span("search_menu.search"):
+            chunks = retriever.search(query_embedding, retrieval_filter, top_k=3)
+            if not chunks and widen and not retrieval_filter.is_empty:
+                chunks = retriever.search(query_embedding, NO_FILTER, top_k=3)
+        if not chunks:
+            return "No relevant menu information found."
+        return "\n\n".join(c.text for c in chunks)
     
     retriever = index.as_retriever(similarity_top_k=3)
-    nodes = retriever.retrieve(query)
+    with span("search_menu.retrieve"):
+        nodes = retriever.retrieve(query)
     if not nodes:
         return "No relevant menu information found."
         
@@ -79,12 +137,25 @@ class RestaurantAssistant(Agent):
     A voice AI assistant for restaurant ordering.
     """
 
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        context_mode: Optional[str] = None,
+        phrase_cache: Optional[PhraseCache] = None,
+        resume: Optional[SessionSnapshot] = None,
+    ) -> None:
         # In-memory cart state for validation (frontend is source of truth)
-        self._cart_items = []
-        
-        super().__init__(
-            instructions="""You are a friendly restaurant ordering assistant for The Pizzeria, Delhi.
+        self._cart_items = [dict(item) for item in resume.cart_items] if resume else []
+        # "pickup" or "delivery" once the customer has chosen
+        self._fulfilment = resume.fulfilment if resume else None
+        # State of an earlier session by this caller in this room (see session_store.py)
+        self._resume = resume
+        # Where menu facts come from: per-turn retrieval or a digest in the instructions
+        self._context_mode = context_mode or menu_context_mode()
+        self._extra_token_budget = 0
+        # Pre-synthesized audio in this session's TTS voice, if any (see phrase_cache.py)
+        self._phrase_cache = phrase_cache
+
+        instructions = """You are a friendly restaurant ordering assistant for The Pizzeria, Delhi.
 Your job: help the customer place pickup or delivery orders using ONLY the menu and rules in context.
 
 CORE PRINCIPLES:
@@ -105,41 +176,156 @@ FUNCTION USAGE:
 - Use show_menu_item() when a user wants to see an item.
 - Use add_item_to_cart() for adding items (ensure you get name, quantity, size).
 - Use get_cart_summary() when the user asks for the total or cart status.
-- Use proceed_to_payment() ONLY after confirming the full order with the user.""",
-        )
+- Use proceed_to_payment() ONLY after confirming the full order with the user."""
+        if self._context_mode == CONTEXT_MODE_DIGEST:
+            menu_section = digest_instructions(load_digest())
+            instructions = f"{instructions}\n\n{menu_section}"
+            # The digest stands in for the per-turn menu context the budget was sized for
+            self._extra_token_budget = count_tokens(menu_section)
+
+        chat_ctx = None
+        if resume is not None:
+            # The earlier session in one system message: nothing is replayed through the LLM
+            chat_ctx = ChatContext.empty()
+            chat_ctx.add_message(role="system", content=resume.resume_context())
+
+        super().__init__(instructions=instructions, chat_ctx=chat_ctx)
 
     async def on_enter(self) -> None:
         """
         Called when the agent becomes active in the session.
         """
+        if self._resume is not None:
+            # Put the restored cart back on screen and pick up where the caller left off
+            if self._cart_items:
+                await send_data_message(
+                    room=self.session.room,
+                    message_type="update_cart",
+                    data={"items": self._cart_items},
+                )
+            self.session.say(self._resume.welcome_back(), allow_interruptions=False)
+            return
+        audio = self._phrase_cache.audio(GREETING) if self._phrase_cache is not None else None
+        if audio is not None:
+            # Pre-synthesized: no LLM or TTS round-trip before the first word
+            self.session.say(GREETING, audio=audio, allow_interruptions=False)
+            return
         await self.session.generate_reply(
-            instructions="""Welcome to The Pizzeria, Delhi, what would you like to order today?""",
+            instructions=GREETING,
             allow_interruptions=False,
         )
 
+    def snapshot(self) -> SessionSnapshot:
+        """The state a rejoining caller needs: cart, fulfilment and a compact conversation summary."""
+        lines = [
+            (item.role, item.text_content or "")
+            for item in self.chat_ctx.items
+            if item.type == "message"
+            and item.role in ("user", "assistant")
+            and not item.extra.get(RAG_CONTEXT_EXTRA)
+        ]
+        if self._resume is not None:
+            # Keep the earlier session's lines until this one has enough of its own
+            lines = list(self._resume.summary) + lines
+        return SessionSnapshot(
+            cart_items=[dict(item) for item in self._cart_items],
+            fulfilment=self._fulfilment,
+            summary=compact_summary(lines),
+        )
+
+    def _speak_cached(self, text: str) -> Optional[str]:
+        """
+        Say a fixed tool confirmation from the phrase cache and return None, so
+        no LLM reply follows. On a cache miss, return the text for the LLM to
+        relay as before.
+        """
+        audio = self._phrase_cache.audio(text) if self._phrase_cache is not None else None
+        if audio is None:
+            return text
+        self.session.say(text, audio=audio)
+        return None
+
     async def on_user_turn_completed(
         self, turn_ctx: ChatContext, new_message: ChatMessage
     ) -> None:
         """
         Called when the user finishes speaking, before the agent generates a response.
         """
-        # Get the text content from the user's message
-        user_query = new_message.text_content()
-        print(f"DEBUG: User speech detected: '{user_query}'")
-        logger.info(f"User speech detected: '{user_query}'")
-        
-        if user_query:
-            # Search the menu/knowledge base for relevant information
-            context = search_menu(user_query)
+        fast_answer = None
+        with span("on_user_turn_completed"), retrieval_in_flight():
+            # Get the text content from the user's message
+            user_query = new_message.text_content
+            logger.debug("user speech detected: %r", user_query)
+            log_transcript("user_turn", text=user_query)
             
-            # Inject the retrieved context into the chat context
-            turn_ctx.add_message(
-                role="assistant",
-                content=f"Menu and rules context relevant to the user's query:\n{context}",
-            )
+            if user_query:
+                # High-frequency questions (hours, address, delivery, payment) get
+                # their canonical answer without retrieval or an LLM round-trip
+                query_embedding = None
+                faq = get_faq_index()
+                retriever = get_retriever(block=False)
+                if faq is not None and retriever is not None:
+                    with span("faq_match"):
+                        # A model forward pass: off the event loop, so audio keeps flowing
+                        query_embedding = await asyncio.to_thread(retriever.embed, user_query)
+                        fast_answer = self._faq_answer(faq, user_query, query_embedding)
+
+            if user_query and fast_answer is None:
+                # Search the menu/knowledge base for relevant information,
+                # restricted to the doc types / categories the query is about
+                retrieval_filter = infer_retrieval_filter(user_query)
+                if self._context_mode == CONTEXT_MODE_DIGEST:
+                    # Menu facts are already in the instructions; only promotions
+                    # and rules are retrieved, and menu-only questions skip retrieval
+                    retrieval_filter = without_doc_type(retrieval_filter, DOC_TYPE_MENU)
+                    if retrieval_filter is None:
+                        return
+                    context = await asyncio.to_thread(
+                        search_menu, user_query, retrieval_filter, widen=False, query_embedding=query_embedding
+                    )
+                else:
+                    context = await asyncio.to_thread(
+                        search_menu, user_query, retrieval_filter, query_embedding=query_embedding
+                    )
+
+                # Inject the retrieved context into the chat context
+                turn_ctx.add_message(
+                    role="assistant",
+                    content=f"Menu and rules context relevant to the user's query:\n{context}",
+                    extra={RAG_CONTEXT_EXTRA: True},
+                )
+
+        if fast_answer is not None:
+            self.session.say(fast_answer)
+            raise StopResponse()
+
+    def _faq_answer(self, faq: FaqIndex, query: str, query_embedding) -> Optional[str]:
+        """The canonical answer if the query confidently matches an FAQ, else None."""
+        match = faq.match(query, query_embedding)
+        if match is None:
+            return None
+        if match.score < confidence_threshold():
+            count_faq_fast_path(match.entry.intent, answered=False)
+            return None
+        count_faq_fast_path(match.entry.intent, answered=True)
+        log_transcript("faq_fast_path", intent=match.entry.intent, score=round(match.score, 3))
+        return match.entry.answer
+
+    async def llm_node(self, chat_ctx: ChatContext, tools, model_settings):
+        """
+        Measure the prompt per component and trim it to the token budget
+        before handing it to the LLM.
+        """
+        with span("prompt_budget"):
+            budget = token_budget() + self._extra_token_budget
+            chat_ctx, usage = enforce_budget(chat_ctx, tools, budget)
+        record_prompt_usage(usage.by_component(), usage.trimmed)
+        async for chunk in Agent.default.llm_node(self, chat_ctx, tools, model_settings):
+            yield chunk
 
     # Display tools
     @function_tool()
+    @traced_tool
     async def show_menu_item(self, ctx: RunContext, item_name: str) -> str:
         """
         Show a visual representation (image) of a menu item to the customer.
@@ -149,6 +335,7 @@ FUNCTION USAGE:
 
     # Cart management tools
     @function_tool()
+    @traced_tool
     async def add_item_to_cart(
         self,
         ctx: RunContext,
@@ -173,13 +360,15 @@ FUNCTION USAGE:
         )
 
     @function_tool()
-    async def remove_item_from_cart(self, ctx: RunContext, item_name: str) -> str:
+    @traced_tool
+    async def remove_item_from_cart(self, ctx: RunContext, item_name: str) -> Optional[str]:
         """
         Remove an item from the customer's cart.
         """
-        return await handle_remove_item_from_cart(self, item_name)
+        return self._speak_cached(await handle_remove_item_from_cart(self, item_name))
 
     @function_tool()
+    @traced_tool
     async def update_cart_quantity(
         self, ctx: RunContext, item_name: str, new_quantity: int
     ) -> str:
@@ -189,28 +378,44 @@ FUNCTION USAGE:
         return await handle_update_cart_quantity(self, item_name, new_quantity)
 
     @function_tool()
-    async def clear_cart(self, ctx: RunContext) -> str:
+    @traced_tool
+    async def clear_cart(self, ctx: RunContext) -> Optional[str]:
         """Clear all items from the customer's cart."""
-        return await handle_clear_cart(self)
+        return self._speak_cached(await handle_clear_cart(self))
 
     @function_tool()
+    @traced_tool
     async def get_cart_summary(self, ctx: RunContext) -> str:
         """Get a summary of the current cart contents and total."""
         return handle_get_cart_summary(self)
 
     # Navigation tools
     @function_tool()
-    async def go_to_menu(self, ctx: RunContext) -> str:
+    @traced_tool
+    async def go_to_menu(self, ctx: RunContext) -> Optional[str]:
         """Navigate the customer back to the menu page."""
-        return await handle_go_to_menu(self)
+        return self._speak_cached(await handle_go_to_menu(self))
 
     @function_tool()
-    async def cancel_payment(self, ctx: RunContext) -> str:
+    @traced_tool
+    async def cancel_payment(self, ctx: RunContext) -> Optional[str]:
         """Cancel the payment process and return to the menu."""
-        return await handle_cancel_payment(self)
+        return self._speak_cached(await handle_cancel_payment(self))
 
     # Order management tools
     @function_tool()
+    @traced_tool
+    async def set_fulfilment_method(self, ctx: RunContext, method: str) -> str:
+        """
+        Record whether the customer wants their order for pickup or delivery.
+
+        Args:
+            method: "pickup" or "delivery".
+        """
+        return handle_set_fulfilment(self, method)
+
+    @function_tool()
+    @traced_tool
     async def proceed_to_payment(self, ctx: RunContext) -> str:
         """
         Proceed to the payment page when the customer confirms they are ready to pay.
@@ -219,6 +424,7 @@ FUNCTION USAGE:
         return await handle_proceed_to_payment(self)
 
     @function_tool()
+    @traced_tool
     async def cancel_order(self, ctx: RunContext, order_id: str = None) -> str:
         """
         Cancel a confirmed order.
@@ -226,49 +432,148 @@ FUNCTION USAGE:
         return await handle_cancel_order(self, order_id)
 
     @function_tool()
+    @traced_tool
     async def modify_order(self, ctx: RunContext) -> str:
         """
         Modify a confirmed order.
         """
-        return handle_modify_order(self)
+        return await handle_modify_order(self)
+
+
+async def load_resume_state(ctx: JobContext):
+    """The caller's identity and their earlier session's snapshot in this room, if any."""
+    identity = await caller_identity(ctx)
+    snapshot = get_session_store().load(ctx.room.name, identity)
+    if snapshot is None or snapshot.is_empty:
+        return identity, None
+    logger.info("resuming session for %s", identity, extra={"room": ctx.room.name})
+    log_transcript("session_resumed", identity=identity, cart_items=len(snapshot.cart_items))
+    return identity, snapshot
+
 
+def track_snapshots(ctx: JobContext, session, assistant: RestaurantAssistant, identity: str) -> None:
+    """Snapshot the assistant's state after every message and tool call (written off the event loop)."""
 
-server = AgentServer()
+    def _save(_event) -> None:
+        get_session_store().save(ctx.room.name, identity, assistant.snapshot())
+
+    session.on("conversation_item_added", _save)
+    session.on("function_tools_executed", _save)
+
+
+# Reports a load score from event-loop lag, CPU, sessions and retrievals, and
+# stops taking jobs at LOAD_THRESHOLD (see worker_load.py)
+server = AgentServer(load_fnc=compute_load, load_threshold=load_threshold())
 
 def prewarm(proc: JobProcess):
-    proc.userdata["vad"] = silero.VAD.load()
+    # Each step is timed; `agent.py startup-profile` reports them (see startup_profile.py)
+    with startup_step("logging"):
+        # JSON logs and the transcript sink, written off the event loop (see logging_setup.py)
+        configure_logging()
+    with startup_step("admin_server"):
+        # Per-process /metrics and /debug/* endpoints (see telemetry.py, profiler.py)
+        start_admin_server()
+        install_signal_handlers()
+    with startup_step("plugins"):
+        # Registers the plugins on this process's main thread
+        load_plugins()
+    with startup_step("provider_pool"):
+        # Provider sets for every profile, connected by the first checkout (see provider_pool.py)
+        pool = get_provider_pool()
+        for profile in load_profiles().profiles.values():
+            pool.fill(profile)
+    with startup_step("models"):
+        # VAD and noise cancellation, shared by every session in this process
+        prewarm_models(proc)
+    # Start loading the RAG index now so the first turn doesn't wait on it. llama_index
+    # and torch are imported by the index thread, not here (recorded as index_load)
+    start_index_build()
+    start_faq_index_build()
+    if menu_context_mode() == CONTEXT_MODE_DIGEST:
+        with startup_step("menu_digest"):
+            load_digest()
+    with startup_step("stores"):
+        # Recent orders into memory, so the cancel/modify tools never read from disk
+        get_order_store()
+        get_session_store()
+    with startup_step("phrase_cache"):
+        # Greeting and fixed confirmations as pre-synthesized audio, per profile voice (see phrase_cache.py)
+        for tts_model, tts_voice in {p.tts_voice for p in load_profiles().profiles.values()}:
+            load_phrase_cache(tts_model, tts_voice)
+    if not os.getenv("GROQ_API_KEY"):
+        logger.warning("GROQ_API_KEY not found in environment")
+    logger.info("prewarm finished", extra={"startup": startup_steps()})
 
 server.setup_fnc = prewarm
 
-@server.rtc_session()
+@server.rtc_session(agent_name=AGENT_NAME, on_request=admission_control(server))
 async def entrypoint(ctx: JobContext):
-    logger.info(f"Agent interacting with room: {ctx.room.name}")
-    print(f"DEBUG: Agent interacting with room: {ctx.room.name}")
-    session = AgentSession(
-        stt=inference.STT(model="assemblyai/universal-streaming", language="en"),
-        llm=groq.LLM(model="llama-3.3-70b-versatile"),
-        tts=inference.TTS(
-            model="cartesia/sonic-3",
-            voice="9626c31c-bec5-4cca-baa8-f8ba9e84c8bc",
-            language="en"
-        ),
-        turn_detection=MultilingualModel(),
-        vad=ctx.proc.userdata["vad"],
-        preemptive_generation=True,
-    )
-
-    await session.start(
-        agent=RestaurantAssistant(),
-        room=ctx.room,
-        room_options=room_io.RoomOptions(
-            audio_input=room_io.AudioInputOptions(
-                noise_cancellation=lambda params: noise_cancellation.BVCTelephony() if params.participant.kind == rtc.ParticipantKind.PARTICIPANT_KIND_SIP else noise_cancellation.BVC(),
-            ),
-        ),
-    )
+    # Event-loop lag and retrievals of this job process, for the worker's load score
+    start_load_reporting()
+    bind_correlation_id(ctx.job.id)
+    bind_session(room=ctx.room.name, session=ctx.job.id)
+    logger.info("agent joining room %s", ctx.room.name, extra={"room": ctx.room.name})
+
+    profile = select_profile(ctx)
+    # Check out pre-connected providers first, so their handshakes overlap the rest of setup
+    session = build_session(ctx, profile)
+    cache = get_phrase_cache(*profile.tts_voice)
+    # A caller rejoining this room (dropped network, restarted worker) resumes their session
+    identity, snapshot = await load_resume_state(ctx)
+    assistant = RestaurantAssistant(phrase_cache=cache, resume=snapshot)
+    track_snapshots(ctx, session, assistant, identity)
+    track_session(ctx.job.id, assistant)
+
+    async def _release_session() -> None:
+        release_session(room=ctx.room.name, session=ctx.job.id)
+        untrack_session(ctx.job.id)
+
+    ctx.add_shutdown_callback(_release_session)
+    # The payment page reports payment here; the order counts as placed from then on
+    listen_for_payments(ctx.room)
+    if is_warmup_dispatch(ctx):
+        await warm_up(ctx)
+
+    await session.start(agent=assistant, room=ctx.room, room_options=room_options(ctx.proc))
+
+    # Synthesize phrases missing from the cache (first run, new menu items) in
+    # the background with this session's TTS; later workers load them from disk
+    if cache is not None and cache.missing(default_phrases()):
+        fill_task = asyncio.create_task(cache.fill(default_phrases(), tts_synthesizer(session.tts)))
+
+        async def _stop_fill() -> None:
+            fill_task.cancel()
+
+        ctx.add_shutdown_callback(_stop_fill)
 
 
 if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "loadtest":
+        # Capacity load test with simulated rooms and stand-in providers
+        from simulation.capacity_probe import main as run_load_test
+
+        run_load_test(sys.argv[2:])
+        sys.exit(0)
+    if len(sys.argv) > 1 and sys.argv[1] == "replay-endpointing":
+        # Offline VAD / turn-detection tuning on recorded calls
+        from simulation.endpointing_replay import main as run_endpointing_replay
+
+        run_endpointing_replay(sys.argv[2:])
+        sys.exit(0)
+    if len(sys.argv) > 1 and sys.argv[1] == "startup-profile":
+        # Import and prewarm time per module and step
+        from startup_profile import main as run_startup_profile
+
+        run_startup_profile(sys.argv[2:], prewarm)
+        sys.exit(0)
+
+    if not os.getenv("GROQ_API_KEY"):
+        print("WARNING: GROQ_API_KEY not found in environment!")
+    # The worker registers the plugins (and the turn detector's inference
+    # runners) before it starts; job processes do it in prewarm
+    load_plugins()
+    # Job processes report their load into this worker's directory (see worker_load.py)
+    claim_report_dir()
     try:
         cli.run_app(server)
     except KeyboardInterrupt:
@@ -0,0 +1,110 @@
+"""
+Chunking and metadata tagging for the company docs.
+
+Each source document is split into item/section sized chunks, and every chunk
+is tagged with its document type, and for menu items, their category and
+dietary labels. The tags drive the partitions used by the retriever.
+"""
+
+import re
+from typing import Dict, List, Optional, Tuple
+
+DOC_TYPE_MENU = "menu"
+DOC_TYPE_PROMOTIONS = "promotions"
+DOC_TYPE_RULES = "rules"
+DOC_TYPES = (DOC_TYPE_MENU, DOC_TYPE_PROMOTIONS, DOC_TYPE_RULES)
+
+# Dietary labels that can appear on menu chunks
+DIETARY_VEGETARIAN = "vegetarian"
+DIETARY_NON_VEGETARIAN = "non-vegetarian"
+DIETARY_CONTAINS_EGGS = "contains-eggs"
+DIETARY_GLUTEN_FREE_OPTION = "gluten-free-option"
+DIETARY_DAIRY_FREE = "dairy-free"
+
+# Chunks shorter than this (section headings like "PIZZAS") are merged into the next one
+_MIN_CHUNK_CHARS = 40
+
+_CATEGORY_RE = re.compile(r"^Category:\s*(.+)$", re.MULTILINE)
+_DIETARY_RE = re.compile(r"^Dietary:\s*(.+)$", re.MULTILINE)
+_ALLERGENS_RE = re.compile(r"^Common Allergens:\s*(.+)$", re.MULTILINE)
+
+
+def doc_type_for_file(file_name: str) -> Optional[str]:
+    """Map a source file name (e.g. "The pizzeria menu.txt") to its document type."""
+    name = file_name.lower()
+    if "menu" in name:
+        return DOC_TYPE_MENU
+    if "promotion" in name:
+        return DOC_TYPE_PROMOTIONS
+    if "rule" in name:
+        return DOC_TYPE_RULES
+    return None
+
+
+def normalize_category(raw: str) -> str:
+    """Turn "Pizza", "Pizzas" or "PIZZAS" into the category key "pizza"."""
+    category = raw.strip().lower()
+    return category[:-1] if category.endswith("s") else category
+
+
+def dietary_labels(chunk: str) -> List[str]:
+    """Derive dietary labels from a menu item's Dietary and Common Allergens lines."""
+    labels = []
+    dietary_match = _DIETARY_RE.search(chunk)
+    allergens_match = _ALLERGENS_RE.search(chunk)
+    dietary = dietary_match.group(1).lower() if dietary_match else ""
+    allergens = allergens_match.group(1).lower() if allergens_match else ""
+
+    if dietary.startswith("non-vegetarian"):
+        labels.append(DIETARY_NON_VEGETARIAN)
+    elif dietary.startswith("vegetarian"):
+        labels.append(DIETARY_VEGETARIAN)
+    if "egg" in dietary or "egg" in allergens:
+        labels.append(DIETARY_CONTAINS_EGGS)
+    if "gluten-free" in chunk.lower():
+        labels.append(DIETARY_GLUTEN_FREE_OPTION)
+    if allergens_match and "dairy" not in allergens:
+        labels.append(DIETARY_DAIRY_FREE)
+    return labels
+
+
+def _split_blocks(text: str) -> List[str]:
+    blocks = [b.strip() for b in re.split(r"\n\s*\n", text) if b.strip()]
+    merged: List[str] = []
+    carry = ""
+    for block in blocks:
+        block = f"{carry}\n{block}" if carry else block
+        if len(block) < _MIN_CHUNK_CHARS:
+            carry = block
+            continue
+        merged.append(block)
+        carry = ""
+    if carry:
+        merged.append(carry)
+    return merged
+
+
+def chunk_document(text: str, file_name: str) -> List[Tuple[str, Dict[str, str]]]:
+    """
+    Split one document into (chunk_text, metadata) pairs.
+
+    Metadata always has "source" and "doc_type". Menu item chunks also get
+    "category" and a comma-separated "dietary" label list (flat strings, so the
+    values persist cleanly in the docstore).
+    """
+    doc_type = doc_type_for_file(file_name)
+    chunks = []
+    for block in _split_blocks(text):
+        metadata = {"source": file_name, "doc_type": doc_type or "other"}
+        if doc_type == DOC_TYPE_MENU:
+            category_match = _CATEGORY_RE.search(block)
+            if category_match:
+                metadata["category"] = normalize_category(category_match.group(1))
+                metadata["dietary"] = ",".join(dietary_labels(block))
+        chunks.append((block, metadata))
+    return chunks
+
+
+def split_labels(value: Optional[str]) -> List[str]:
+    """Inverse of the comma-joined "dietary" metadata value."""
+    return [label for label in (value or "").split(",") if label]
@@ -0,0 +1,129 @@
+"""
+Offline end-to-end latency benchmark for the restaurant assistant.
+
+Runs scripted ordering conversations through RestaurantAssistant with local
+STT/LLM/TTS and room stand-ins, prints p50/p95/p99 per stage, and compares
+against a stored baseline.
+
+Usage:
+    python backend/e2e_benchmark.py                    # run and compare
+    python backend/e2e_benchmark.py --save-baseline    # run and store as the new baseline
+    python backend/e2e_benchmark.py --context-mode both --provider-latency
+                                                       # retrieval vs menu digest, side by side
+"""
+
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+from typing import Dict
+
+from menu_digest import CONTEXT_MODE_DIGEST, CONTEXT_MODE_RETRIEVAL, CONTEXT_MODES
+from simulation.fakes import FakeLLM, FakeSTT, FakeTTS
+from simulation.harness import SimulatedProviders, run_benchmark
+from simulation.latency import (
+    LatencySummary,
+    compare_to_baseline,
+    format_summary,
+    load_baseline,
+    save_baseline,
+)
+
+PROJECT_ROOT = Path(__file__).parent.parent
+DEFAULT_BASELINE = PROJECT_ROOT / "benchmarks" / "e2e_latency_baseline.json"
+
+# Stages that differ between context modes
+_MODE_STAGES = ("retrieval", "context_injection", "llm", "turn_total")
+
+
+def format_mode_comparison(summaries: Dict[str, LatencySummary]) -> str:
+    """p50/p95 of the mode-sensitive stages, one column pair per context mode."""
+    modes = list(summaries)
+    header = f"{'stage':<20}" + "".join(f" {mode + ' p50':>16} {mode + ' p95':>16}" for mode in modes)
+    lines = [header]
+    for stage in _MODE_STAGES:
+        row = f"{stage:<20}"
+        for mode in modes:
+            stats = summaries[mode].get(stage)
+            if stats is None:
+                row += f" {'-':>16} {'-':>16}"
+            else:
+                row += f" {stats['p50'] * 1000:>16.2f} {stats['p95'] * 1000:>16.2f}"
+        lines.append(row)
+    return "\n".join(lines)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20, help="Times to replay each conversation.")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE, help="Baseline JSON file.")
+    parser.add_argument("--save-baseline", action="store_true", help="Overwrite the baseline with this run.")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed fractional slowdown.")
+    parser.add_argument(
+        "--provider-latency",
+        action="store_true",
+        help="Give the stand-in STT/LLM/TTS realistic delays instead of zero (measures turn_total shape).",
+    )
+    parser.add_argument(
+        "--context-mode",
+        choices=CONTEXT_MODES + ("both",),
+        default=CONTEXT_MODE_RETRIEVAL,
+        help="Where menu facts come from (see menu_digest.py); 'both' compares the two.",
+    )
+    args = parser.parse_args()
+
+    providers = SimulatedProviders.zero_latency()
+    if args.provider_latency:
+        # ~0.1 ms of prefill per uncached prompt token
+        providers = SimulatedProviders(
+            stt=FakeSTT(), llm=FakeLLM(per_uncached_token_latency=0.0001), tts=FakeTTS()
+        )
+
+    if args.context_mode == "both":
+        summaries = {}
+        for mode in (CONTEXT_MODE_RETRIEVAL, CONTEXT_MODE_DIGEST):
+            recorder = asyncio.run(
+                run_benchmark(iterations=args.iterations, providers=providers, context_mode=mode)
+            )
+            summaries[mode] = recorder.summary()
+            print(f"\n[{mode}]")
+            print(format_summary(summaries[mode]))
+        print("\nContext mode comparison (ms):")
+        print(format_mode_comparison(summaries))
+        return
+
+    recorder = asyncio.run(
+        run_benchmark(iterations=args.iterations, providers=providers, context_mode=args.context_mode)
+    )
+    summary = recorder.summary()
+    print(format_summary(summary))
+
+    if args.save_baseline:
+        save_baseline(summary, args.baseline)
+        print(f"\nBaseline saved to {args.baseline}")
+        return
+
+    # Latency baselines are per machine, so none is committed: the first run has nothing to compare with
+    if not args.baseline.exists():
+        print(
+            f"\nNOT COMPARED: no baseline at {args.baseline}, so nothing was checked for regressions."
+            "\nRun with --save-baseline on this machine to record one.",
+            file=sys.stderr,
+        )
+        sys.exit(2)
+
+    baseline = load_baseline(args.baseline)
+    missing = sorted(stage for stage in summary if stage not in baseline)
+    if missing:
+        print(f"\nNot in the baseline, not compared: {', '.join(missing)}")
+    regressions = compare_to_baseline(summary, baseline, tolerance=args.tolerance)
+    if regressions:
+        print("\nREGRESSIONS vs baseline:")
+        for line in regressions:
+            print(f"  {line}")
+        sys.exit(1)
+    print("\nOK: no regressions vs baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,413 @@
+"""
+FAQ fast path: canonical answers spoken without an LLM round-trip.
+
+Opening hours, address, delivery area and fees, payment methods and
+last-order times account for a large share of calls. Their answers are fixed
+by the rules doc, so the agent can say them directly (session.say) instead of
+paying for retrieval, an LLM call and a long generated reply.
+
+Entries are built from the rules doc (one per intent below, answer rendered
+from that doc section) and from the Q/A pairs in the promotions doc. A query
+matches an entry when it shares at least one of the entry's keywords (the
+intent gate) and its embedding is close enough to one of the entry's example
+questions. Only questions are matched: "I'll pay by card" or "I want delivery"
+changes the order, and needs the LLM and its tools. Anything else goes down
+the normal RAG + LLM path.
+
+ingest.py writes the entries and their question embeddings to
+storage/faq_index.json; the agent loads it, or builds it in the background
+once the embedding model is loaded if the file is missing or stale.
+"""
+
+import json
+import logging
+import os
+import re
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, FrozenSet, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from doc_metadata import DOC_TYPE_PROMOTIONS, DOC_TYPE_RULES, doc_type_for_file
+from index_manifest import EMBED_MODEL_NAME, compute_corpus_hash
+
+logger = logging.getLogger("restaurant.faq")
+
+PROJECT_ROOT = Path(__file__).parent.parent
+DATA_DIR = PROJECT_ROOT / "data" / "company_docs"
+FAQ_INDEX_PATH = PROJECT_ROOT / "storage" / "faq_index.json"
+
+DEFAULT_CONFIDENCE_THRESHOLD = 0.85
+
+# Utterances that also ask to change the order need the LLM and its tools
+_ORDER_ACTION_WORDS = frozenset("add cart remove checkout".split())
+# Payment and fulfilment words: questions about them are FAQs ("Can I pay by
+# card?"), statements with them are order choices ("I'll pay by card")
+_ORDER_CHOICE_WORDS = frozenset("pay paying deliver delivery pickup collect".split())
+# A clause that opens with one of these is a question even without a "?"
+# (transcripts often have no punctuation)
+_INTERROGATIVES = frozenset(
+    "what whats when where which who how why can could do does did is are will would may".split()
+)
+# Clause boundaries: punctuation, or a conjunction joining two requests
+_CLAUSE_SPLIT_RE = re.compile(r"(?<=[,.;!?])\s*|\s+(?:and|but|so|then)\s+")
+# Never used as FAQ keywords: too common in ordering talk to signal an intent
+_STOPWORDS = frozenset(
+    """a an and any are as at be can do does for from have how i if in is it me my of on or our please
+    the there to we what when where which who will with you your order orders""".split()
+)
+_WORD_RE = re.compile(r"[a-z0-9]+")
+# Doc sentences addressed to the assistant rather than the caller
+_META_RE = re.compile(r"\b(assistant|inform them)\b", re.IGNORECASE)
+
+
+@dataclass(frozen=True)
+class _IntentSpec:
+    intent: str
+    # Line that starts the section in the rules doc; if the line carries a value
+    # ("Full Address: ..."), that value is the answer
+    heading: str
+    lead: str
+    keywords: FrozenSet[str]
+    questions: Tuple[str, ...]
+    suffix: str = ""
+    # Only take indented (second-level) bullets, e.g. the list of neighbourhoods
+    nested_only: bool = False
+    max_items: int = 8
+
+
+_RULES_INTENTS = (
+    _IntentSpec(
+        intent="opening_hours",
+        heading="OPENING HOURS",
+        lead="We're open",
+        keywords=frozenset("open opening close closing hours timings timing".split()),
+        questions=(
+            "What are your opening hours?",
+            "When are you open?",
+            "What time do you close?",
+            "What are your timings today?",
+        ),
+    ),
+    _IntentSpec(
+        intent="last_order",
+        heading="Last order times:",
+        lead="Last orders:",
+        keywords=frozenset("last latest late".split()),
+        questions=(
+            "What time is the last order?",
+            "How late can I place an order?",
+            "What's the latest I can order for delivery?",
+        ),
+    ),
+    _IntentSpec(
+        intent="address",
+        heading="Full Address:",
+        lead="We're at",
+        keywords=frozenset("address located location where directions".split()),
+        questions=("Where are you located?", "What's your address?", "Where is the restaurant?"),
+    ),
+    _IntentSpec(
+        intent="delivery_area",
+        heading="Delivery:",
+        lead="We deliver to",
+        keywords=frozenset("deliver delivery area areas neighbourhood neighbourhoods".split()),
+        questions=(
+            "Which areas do you deliver to?",
+            "Do you deliver to my area?",
+            "Where do you deliver?",
+        ),
+        suffix="If you're outside these areas, pickup is available.",
+        nested_only=True,
+    ),
+    _IntentSpec(
+        intent="delivery_fee",
+        heading="Delivery fee:",
+        lead="Delivery costs:",
+        keywords=frozenset("fee fees charge charges cost radius km".split()),
+        questions=(
+            "How much is delivery?",
+            "What is the delivery fee?",
+            "What is your delivery radius?",
+            "How far do you deliver?",
+        ),
+        suffix="Orders above 1500 rupees get free delivery within the service area.",
+    ),
+    _IntentSpec(
+        intent="minimum_order",
+        heading="Minimum order for delivery:",
+        lead="The minimum order for delivery is",
+        keywords=frozenset("minimum".split()),
+        questions=("Is there a minimum order for delivery?", "What's the minimum order amount?"),
+        suffix="There's no minimum for pickup.",
+    ),
+    _IntentSpec(
+        intent="payment_methods",
+        heading="Accepted payment methods:",
+        lead="We accept",
+        keywords=frozenset("pay payment payments upi card cards cash cod".split()),
+        questions=(
+            "What payment methods do you accept?",
+            "Can I pay by card?",
+            "Do you take UPI?",
+            "Can I pay cash on delivery?",
+        ),
+        max_items=3,
+    ),
+)
+
+
+@dataclass
+class FaqEntry:
+    intent: str
+    answer: str
+    questions: List[str]
+    keywords: FrozenSet[str]
+
+
+@dataclass
+class FaqMatch:
+    entry: FaqEntry
+    score: float
+
+
+def confidence_threshold() -> float:
+    return float(os.getenv("FAQ_CONFIDENCE_THRESHOLD", DEFAULT_CONFIDENCE_THRESHOLD))
+
+
+def _words(text: str) -> FrozenSet[str]:
+    return frozenset(_WORD_RE.findall(text.lower()))
+
+
+def _clauses(text: str) -> List[Tuple[FrozenSet[str], bool]]:
+    """The words of each clause of an utterance, and whether the clause asks a question."""
+    clauses = []
+    for clause in _CLAUSE_SPLIT_RE.split(text.lower()):
+        words = _WORD_RE.findall(clause)
+        if words:
+            clauses.append((frozenset(words), clause.rstrip().endswith("?") or words[0] in _INTERROGATIVES))
+    return clauses
+
+
+def _speakable(text: str) -> str:
+    """Tidy a doc line for TTS: no parentheticals, "to" for ranges, rupees spelled out."""
+    text = re.sub(r"\s*\([^)]*\)", "", text)
+    text = text.replace(" – ", " to ").replace("–", " to ")
+    text = re.sub(r"₹\s*(\d+)", r"\1 rupees", text)
+    return text.strip().rstrip(".")
+
+
+def _section_items(lines: List[str], spec: _IntentSpec) -> List[str]:
+    for i, line in enumerate(lines):
+        if not line.strip().lower().startswith(spec.heading.lower()):
+            continue
+        inline = line.strip()[len(spec.heading):].strip()
+        if inline:
+            return [inline]
+        items = []
+        for bullet in lines[i + 1:]:
+            if not bullet.strip():
+                break
+            nested = bullet.startswith((" ", "\t"))
+            text = bullet.strip().lstrip("-").strip()
+            if spec.nested_only and not nested:
+                continue
+            if not text or text.endswith(":") or _META_RE.search(text):
+                continue
+            items.append(text)
+        return items[: spec.max_items]
+    return []
+
+
+def _join(items: Sequence[str], as_list: bool) -> str:
+    if as_list and len(items) > 1:
+        return ", ".join(items[:-1]) + " and " + items[-1]
+    # "Monday to Thursday: 11:00 AM ..." reads better aloud as "..., 11:00 AM"
+    return "; ".join(re.sub(r":\s+", ", ", item) for item in items)
+
+
+def _rules_entries(text: str) -> List[FaqEntry]:
+    lines = text.splitlines()
+    entries = []
+    for spec in _RULES_INTENTS:
+        items = [_speakable(item) for item in _section_items(lines, spec)]
+        if not items:
+            logger.warning("FAQ section %r not found in the rules doc", spec.heading)
+            continue
+        answer = f"{spec.lead} {_join(items, as_list=spec.nested_only)}."
+        if spec.suffix:
+            answer = f"{answer} {spec.suffix}"
+        entries.append(FaqEntry(spec.intent, answer, list(spec.questions), spec.keywords))
+    return entries
+
+
+def _qa_entries(text: str) -> List[FaqEntry]:
+    """
+    Q:/A: pairs, with sentences addressed to the assistant removed from the
+    answer. Pairs whose direct answer (first sentence) is such a sentence are
+    left to the LLM.
+    """
+    entries = []
+    for question, answer in re.findall(r"^Q:\s*(.+)\nA:\s*(.+)$", text, re.MULTILINE):
+        sentences = re.split(r"(?<=\.)\s+", answer.strip())
+        if _META_RE.search(sentences[0]):
+            continue
+        spoken = " ".join(s for s in sentences if not _META_RE.search(s))
+        keywords = _words(question) - _STOPWORDS
+        if not keywords:
+            continue
+        slug = "_".join(sorted(keywords))[:48]
+        entries.append(FaqEntry(f"faq:{slug}", _speakable(spoken) + ".", [question.strip()], keywords))
+    return entries
+
+
+def build_faq_entries(data_dir: Path = DATA_DIR) -> List[FaqEntry]:
+    entries: List[FaqEntry] = []
+    for path in sorted(p for p in data_dir.iterdir() if p.is_file()):
+        doc_type = doc_type_for_file(path.name)
+        if doc_type == DOC_TYPE_RULES:
+            entries.extend(_rules_entries(path.read_text(encoding="utf-8")))
+        elif doc_type == DOC_TYPE_PROMOTIONS:
+            entries.extend(_qa_entries(path.read_text(encoding="utf-8")))
+    return entries
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+class FaqIndex:
+    """Example-question embeddings for a list of FAQ entries."""
+
+    def __init__(self, entries: List[FaqEntry], embeddings: np.ndarray, owners: Sequence[int]) -> None:
+        self.entries = entries
+        self._embeddings = _normalize_rows(np.asarray(embeddings, dtype=np.float32))
+        self._owners = np.asarray(owners, dtype=np.int64)
+
+    @classmethod
+    def build(cls, entries: List[FaqEntry], embed: Callable[[str], Sequence[float]]) -> "FaqIndex":
+        owners = [i for i, entry in enumerate(entries) for _ in entry.questions]
+        vectors = [embed(q) for entry in entries for q in entry.questions]
+        return cls(entries, np.asarray(vectors, dtype=np.float32), owners)
+
+    def match(self, query: str, query_embedding: np.ndarray) -> Optional[FaqMatch]:
+        """
+        The closest entry whose intent keywords appear in the query, or None if
+        the query asks no question, mentions no entry's intent, or also asks to
+        change the order.
+        """
+        clauses = _clauses(query)
+        if not any(is_question for _, is_question in clauses):
+            return None
+        words = frozenset().union(*(clause_words for clause_words, _ in clauses))
+        if words & _ORDER_ACTION_WORDS:
+            return None
+        if any(not is_question and clause_words & _ORDER_CHOICE_WORDS for clause_words, is_question in clauses):
+            return None
+        candidates = [i for i, entry in enumerate(self.entries) if words & entry.keywords]
+        if not candidates:
+            return None
+        rows = np.isin(self._owners, candidates)
+        query_vector = np.asarray(query_embedding, dtype=np.float32)
+        norm = np.linalg.norm(query_vector)
+        if norm:
+            query_vector = query_vector / norm
+        scores = self._embeddings[rows] @ query_vector
+        best = int(np.argmax(scores))
+        return FaqMatch(self.entries[int(self._owners[rows][best])], float(scores[best]))
+
+    def to_json(self, corpus_hash: str) -> str:
+        return json.dumps(
+            {
+                "corpus_hash": corpus_hash,
+                "embed_model": EMBED_MODEL_NAME,
+                "entries": [
+                    {
+                        "intent": e.intent,
+                        "answer": e.answer,
+                        "questions": e.questions,
+                        "keywords": sorted(e.keywords),
+                    }
+                    for e in self.entries
+                ],
+                "owners": self._owners.tolist(),
+                "embeddings": self._embeddings.tolist(),
+            }
+        )
+
+    @classmethod
+    def from_json(cls, text: str, corpus_hash: str) -> Optional["FaqIndex"]:
+        """None if the file was built from other docs or another embedding model."""
+        raw = json.loads(text)
+        if raw.get("corpus_hash") != corpus_hash or raw.get("embed_model") != EMBED_MODEL_NAME:
+            return None
+        entries = [
+            FaqEntry(e["intent"], e["answer"], list(e["questions"]), frozenset(e["keywords"]))
+            for e in raw["entries"]
+        ]
+        return cls(entries, np.asarray(raw["embeddings"], dtype=np.float32), raw["owners"])
+
+
+def write_faq_index(
+    embed: Callable[[str], Sequence[float]], data_dir: Path = DATA_DIR, path: Path = FAQ_INDEX_PATH
+) -> FaqIndex:
+    index = FaqIndex.build(build_faq_entries(data_dir), embed)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(index.to_json(compute_corpus_hash(data_dir)), encoding="utf-8")
+    return index
+
+
+def load_faq_index(data_dir: Path = DATA_DIR, path: Path = FAQ_INDEX_PATH) -> Optional[FaqIndex]:
+    if not path.exists():
+        return None
+    try:
+        return FaqIndex.from_json(path.read_text(encoding="utf-8"), compute_corpus_hash(data_dir))
+    except (ValueError, KeyError, TypeError):
+        return None
+
+
+# Process-wide FAQ index, loaded (or built) once in the background like the RAG index
+_FAQ_INDEX: Optional[FaqIndex] = None
+_FAQ_LOCK = threading.Lock()
+_FAQ_THREAD: Optional[threading.Thread] = None
+
+
+def _faq_worker() -> None:
+    global _FAQ_INDEX
+    try:
+        index = load_faq_index()
+        if index is None:
+            # Stale or missing file: embed the questions with the retrieval model
+            from rag_engine import get_retriever
+
+            retriever = get_retriever(block=True)
+            if retriever is None:
+                logger.warning("FAQ fast path disabled: no embedding model available")
+                return
+            index = FaqIndex.build(build_faq_entries(), retriever.embed)
+    except Exception:
+        logger.exception("error loading the FAQ index")
+        return
+    with _FAQ_LOCK:
+        _FAQ_INDEX = index
+
+
+def start_faq_index_build() -> Optional[threading.Thread]:
+    """Load or build the FAQ index in the background, once per process."""
+    global _FAQ_THREAD
+    with _FAQ_LOCK:
+        if _FAQ_INDEX is not None:
+            return None
+        if _FAQ_THREAD is None:
+            _FAQ_THREAD = threading.Thread(target=_faq_worker, name="faq-index-build", daemon=True)
+            _FAQ_THREAD.start()
+        return _FAQ_THREAD
+
+
+def get_faq_index() -> Optional[FaqIndex]:
+    """The FAQ index, or None while it is loading (never blocks)."""
+    return _FAQ_INDEX
@@ -0,0 +1,209 @@
+"""
+Hedged LLM requests with a per-turn deadline and a fast fallback model.
+
+Groq's tail latency occasionally spikes to seconds, and until the LLM
+streams its first token the caller hears dead air. HedgedLLM wraps a
+session's primary LLM and a faster fallback model. Each request goes to
+the primary; if its first token hasn't arrived within the deadline, or it
+fails before producing one, the same request is also sent to the
+fallback. Whichever stream starts first is spoken and the other one is
+cancelled.
+
+Metrics:
+- agent_llm_hedge_total{outcome}: "primary" (no hedge needed),
+  "primary_after_hedge" (the hedge fired but the primary still started
+  first) or "fallback"
+- agent_llm_hedge_saved_seconds: when the fallback wins, how much sooner
+  its first token came than the primary's. The losing primary gets
+  measure_window more seconds to produce a first token, which is thrown
+  away; if it doesn't, the time waited is recorded as a lower bound. A
+  window of 0 cancels it at once and records nothing
+
+A profile opts in with a "hedge" entry in latency_profiles.json, e.g.
+{"model": "llama-3.1-8b-instant", "deadline": 0.8}. LLM_HEDGE_DEADLINE
+overrides the deadline for every profile and LLM_HEDGE_MEASURE_WINDOW
+sets the measure window (default 2).
+"""
+
+import asyncio
+import dataclasses
+import logging
+import os
+import time
+from typing import Any, Dict, Optional, Set, Tuple
+
+from livekit.agents import DEFAULT_API_CONNECT_OPTIONS, APIConnectOptions, llm
+
+from telemetry import observe_llm_hedge, observe_llm_hedge_saved
+
+logger = logging.getLogger("restaurant.hedged_llm")
+
+# First "chunk" of a stream that ended without producing any
+_EMPTY = object()
+
+
+async def _first_chunk(stream: llm.LLMStream) -> Tuple[Any, float]:
+    """The stream's first chunk and when it arrived."""
+    try:
+        chunk = await stream.__anext__()
+    except StopAsyncIteration:
+        chunk = _EMPTY
+    return chunk, time.perf_counter()
+
+
+async def _cancel(task: asyncio.Task, stream: llm.LLMStream) -> None:
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+    await stream.aclose()
+
+
+def hedge_deadline(settings: Dict[str, Any]) -> float:
+    """Seconds the primary gets to stream its first token before the hedge fires."""
+    override = os.getenv("LLM_HEDGE_DEADLINE", "").strip()
+    return float(override) if override else float(settings.get("deadline", 1.0))
+
+
+class HedgedLLM(llm.LLM):
+    def __init__(
+        self,
+        primary: llm.LLM,
+        fallback: llm.LLM,
+        deadline: float = 1.0,
+        measure_window: Optional[float] = None,
+    ) -> None:
+        super().__init__()
+        self.primary = primary
+        self.fallback = fallback
+        self.deadline = deadline
+        if measure_window is None:
+            measure_window = float(os.getenv("LLM_HEDGE_MEASURE_WINDOW", "2"))
+        self.measure_window = measure_window
+        self._tasks: Set[asyncio.Task] = set()
+
+    @property
+    def model(self) -> str:
+        return self.primary.model
+
+    @property
+    def provider(self) -> str:
+        return self.primary.provider
+
+    def chat(
+        self,
+        *,
+        chat_ctx: llm.ChatContext,
+        tools: Optional[list] = None,
+        conn_options: APIConnectOptions = DEFAULT_API_CONNECT_OPTIONS,
+        **kwargs: Any,
+    ) -> "HedgedLLMStream":
+        return HedgedLLMStream(self, chat_ctx=chat_ctx, tools=tools or [], conn_options=conn_options, kwargs=kwargs)
+
+    def prewarm(self) -> None:
+        self.primary.prewarm()
+        self.fallback.prewarm()
+
+    def _measure_loser(self, task: asyncio.Task, stream: llm.LLMStream, winner_at: float) -> None:
+        """Time the losing primary's first token in the background, then close it."""
+
+        async def measure() -> None:
+            try:
+                done, _ = await asyncio.wait({task}, timeout=self.measure_window)
+                if done and task.exception() is None:
+                    loser_at = task.result()[1]
+                else:
+                    loser_at = time.perf_counter()
+                observe_llm_hedge_saved(max(loser_at - winner_at, 0.0))
+            finally:
+                await _cancel(task, stream)
+
+        background = asyncio.get_running_loop().create_task(measure())
+        self._tasks.add(background)
+        background.add_done_callback(self._tasks.discard)
+
+    async def aclose(self) -> None:
+        for task in list(self._tasks):
+            task.cancel()
+        if self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+        await self.primary.aclose()
+        await self.fallback.aclose()
+
+
+class HedgedLLMStream(llm.LLMStream):
+    def __init__(
+        self,
+        hedged: HedgedLLM,
+        *,
+        chat_ctx: llm.ChatContext,
+        tools: list,
+        conn_options: APIConnectOptions,
+        kwargs: Dict[str, Any],
+    ) -> None:
+        super().__init__(hedged, chat_ctx=chat_ctx, tools=tools, conn_options=conn_options)
+        self._hedged = hedged
+        self._kwargs = kwargs
+
+    def _open(self, model: llm.LLM) -> Tuple[llm.LLMStream, asyncio.Task]:
+        stream = model.chat(
+            chat_ctx=self._chat_ctx,
+            tools=self._tools,
+            # Retries are this stream's job: a retry re-runs the whole hedge
+            conn_options=dataclasses.replace(self._conn_options, max_retry=0),
+            **self._kwargs,
+        )
+        return stream, asyncio.create_task(_first_chunk(stream))
+
+    async def _run(self) -> None:
+        hedged = self._hedged
+        primary, primary_first = self._open(hedged.primary)
+        try:
+            await asyncio.wait({primary_first}, timeout=hedged.deadline)
+        except asyncio.CancelledError:
+            await _cancel(primary_first, primary)
+            raise
+        if primary_first.done() and primary_first.exception() is None:
+            observe_llm_hedge("primary")
+            await self._forward(primary, primary_first.result()[0])
+            return
+
+        if primary_first.done():
+            logger.warning("primary LLM failed before its first token, using %s", hedged.fallback.model)
+        fallback, fallback_first = self._open(hedged.fallback)
+        racing = {primary_first: primary, fallback_first: fallback}
+        errors = []
+        winner: Optional[asyncio.Task] = None
+        try:
+            while racing and winner is None:
+                done, _ = await asyncio.wait(racing, return_when=asyncio.FIRST_COMPLETED)
+                # The primary wins a tie
+                for task in sorted(done, key=lambda t: t is not primary_first):
+                    if task.exception() is not None:
+                        errors.append(task.exception())
+                        await racing.pop(task).aclose()
+                    elif winner is None:
+                        winner = task
+        except asyncio.CancelledError:
+            for task, stream in racing.items():
+                await _cancel(task, stream)
+            raise
+
+        if winner is None:
+            raise errors[0]
+        stream = racing.pop(winner)
+        chunk, winner_at = winner.result()
+        observe_llm_hedge("primary_after_hedge" if winner is primary_first else "fallback")
+        if primary_first in racing and hedged.measure_window > 0:
+            hedged._measure_loser(primary_first, racing.pop(primary_first), winner_at)
+        for task, loser in racing.items():
+            await _cancel(task, loser)
+        await self._forward(stream, chunk)
+
+    async def _forward(self, stream: llm.LLMStream, first: Any) -> None:
+        try:
+            if first is _EMPTY:
+                return
+            self._event_ch.send_nowait(first)
+            async for chunk in stream:
+                self._event_ch.send_nowait(chunk)
+        finally:
+            await stream.aclose()
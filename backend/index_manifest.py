@@ -0,0 +1,151 @@
+"""
+Self-describing header for persisted RAG indexes.
+
+Every index written by rag_engine carries a small manifest recording what it
+was built with. Loading compares the manifest against the current
+configuration without touching the docstore or vector store, so an
+incompatible index is rejected immediately with a readable reason.
+
+The corpus hash covers the docs' contents, but reading every doc on every
+load would make the check O(corpus). A fingerprint of each doc's name, size
+and mtime is kept alongside it: while the fingerprint matches (the one in
+the manifest, or the last one this process hashed), the contents aren't
+read again.
+"""
+
+import hashlib
+import json
+from dataclasses import asdict, dataclass, fields
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+MANIFEST_FILENAME = "index_manifest.json"
+
+# Single source of truth for the embedding model used by ingest, the agent and tests
+EMBED_MODEL_NAME = "BAAI/bge-small-en-v1.5"
+EMBED_MODEL_DIMS = {
+    "BAAI/bge-small-en-v1.5": 384,
+}
+
+# Bump whenever chunking or node construction changes in a way that
+# invalidates existing indexes (splitter, chunk size, metadata layout, ...)
+CHUNKER_VERSION = "2"
+
+
+class IndexCompatibilityError(Exception):
+    """Raised when a persisted index was built with a different configuration."""
+
+
+@dataclass(frozen=True)
+class IndexManifest:
+    embed_model: str
+    embed_dim: int
+    chunker_version: str
+    corpus_hash: str
+    # Names, sizes and mtimes of the docs the hash was taken from; not compared
+    # (a touched but unchanged doc is still the same corpus)
+    corpus_fingerprint: str = ""
+
+    def to_json(self) -> str:
+        return json.dumps(asdict(self), indent=2, sort_keys=True)
+
+    @classmethod
+    def from_json(cls, text: str) -> "IndexManifest":
+        raw = json.loads(text)
+        return cls(**{f.name: raw[f.name] for f in fields(cls) if f.name in raw})
+
+
+# Data dir -> (fingerprint, content hash) of the last corpus hashed in this process
+_CORPUS_HASHES: Dict[Path, Tuple[str, str]] = {}
+
+
+def _source_docs(data_dir: Path) -> List[Path]:
+    return sorted(p for p in data_dir.iterdir() if p.is_file())
+
+
+def corpus_fingerprint(data_dir: Path) -> str:
+    """Hash the names, sizes and mtimes of the source docs (one stat per doc, no reads)."""
+    digest = hashlib.sha256()
+    for path in _source_docs(data_dir):
+        stat = path.stat()
+        digest.update(f"{path.name}\0{stat.st_size}\0{stat.st_mtime_ns}\0".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def compute_corpus_hash(data_dir: Path) -> str:
+    """Hash the names and contents of the source docs, read only if their fingerprint changed."""
+    fingerprint = corpus_fingerprint(data_dir)
+    cached = _CORPUS_HASHES.get(data_dir.resolve())
+    if cached is not None and cached[0] == fingerprint:
+        return cached[1]
+    digest = hashlib.sha256()
+    for path in _source_docs(data_dir):
+        digest.update(path.name.encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(path.read_bytes())
+        digest.update(b"\0")
+    _CORPUS_HASHES[data_dir.resolve()] = (fingerprint, digest.hexdigest())
+    return digest.hexdigest()
+
+
+def expected_manifest(data_dir: Path, storage_dir: Optional[Path] = None) -> IndexManifest:
+    """
+    The manifest an index built right now from data_dir would carry.
+
+    With storage_dir, a persisted manifest whose fingerprint still matches
+    the docs supplies the corpus hash, so the docs aren't read.
+    """
+    fingerprint = corpus_fingerprint(data_dir)
+    persisted = read_manifest(storage_dir) if storage_dir is not None else None
+    if persisted is not None and persisted.corpus_fingerprint == fingerprint:
+        _CORPUS_HASHES.setdefault(data_dir.resolve(), (fingerprint, persisted.corpus_hash))
+    return IndexManifest(
+        embed_model=EMBED_MODEL_NAME,
+        embed_dim=EMBED_MODEL_DIMS[EMBED_MODEL_NAME],
+        chunker_version=CHUNKER_VERSION,
+        corpus_hash=compute_corpus_hash(data_dir),
+        corpus_fingerprint=fingerprint,
+    )
+
+
+def write_manifest(storage_dir: Path, manifest: IndexManifest) -> None:
+    (storage_dir / MANIFEST_FILENAME).write_text(manifest.to_json(), encoding="utf-8")
+
+
+def read_manifest(storage_dir: Path) -> Optional[IndexManifest]:
+    path = storage_dir / MANIFEST_FILENAME
+    if not path.exists():
+        return None
+    try:
+        return IndexManifest.from_json(path.read_text(encoding="utf-8"))
+    except (ValueError, KeyError, TypeError):
+        return None
+
+
+def find_incompatibility(storage_dir: Path, expected: IndexManifest) -> Optional[str]:
+    """
+    Compare the persisted manifest with the expected one.
+
+    Returns None if the index is compatible, otherwise a human-readable reason.
+    """
+    actual = read_manifest(storage_dir)
+    if actual is None:
+        return f"{storage_dir} has no readable {MANIFEST_FILENAME} (built by an older version?)"
+
+    for field in fields(IndexManifest):
+        if field.name == "corpus_fingerprint":
+            continue
+        have = getattr(actual, field.name)
+        want = getattr(expected, field.name)
+        if have != want:
+            if field.name == "corpus_hash":
+                return "source documents changed since the index was built"
+            return f"{field.name} mismatch: index has {have!r}, expected {want!r}"
+    return None
+
+
+def validate_manifest(storage_dir: Path, expected: IndexManifest) -> None:
+    """Raise IndexCompatibilityError if the index at storage_dir can't be used as-is."""
+    reason = find_incompatibility(storage_dir, expected)
+    if reason is not None:
+        raise IndexCompatibilityError(reason)
@@ -1,56 +1,50 @@
-import os
-from pathlib import Path
-
-from llama_index.core import SimpleDirectoryReader, VectorStoreIndex, Settings
-from llama_index.core.storage import StorageContext
-from llama_index.core.storage.docstore import SimpleDocumentStore
-from llama_index.core.vector_stores import SimpleVectorStore
-
-# Get project root (one level up from backend directory)
-PROJECT_ROOT = Path(__file__).parent.parent
-DATA_DIR = PROJECT_ROOT / "data" / "company_docs"
-STORAGE_DIR = PROJECT_ROOT / "storage" / "restaurant_index"
-
-# Configure local embedding model (no API key required)
-# Try to use local embeddings, fallback to HuggingFace if needed
-try:
-    from llama_index.embeddings.huggingface import HuggingFaceEmbedding
-    Settings.embed_model = HuggingFaceEmbedding(
-        model_name="BAAI/bge-small-en-v1.5"
-    )
-except ImportError:
-    # If HuggingFace embeddings not available, try to use local default
-    # This will require llama-index-embeddings-huggingface package
-    print("Warning: HuggingFace embeddings not available. Install with: pip install llama-index-embeddings-huggingface")
-    raise
+import argparse
+
+from llama_index.core import Settings
+
+from faq_fast_path import FAQ_INDEX_PATH, load_faq_index, write_faq_index
+from menu_digest import DIGEST_PATH, write_digest
+from rag_engine import DATA_DIR, STORAGE_DIR, build_index, index_staleness, init_settings
 
 
 def main() -> None:
+    parser = argparse.ArgumentParser(description="Build the restaurant RAG index.")
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Rebuild even if the index manifest matches the current docs and settings.",
+    )
+    args = parser.parse_args()
+
     if not DATA_DIR.exists():
         raise SystemExit(f"Data directory not found: {DATA_DIR.resolve()}")
 
-    documents = SimpleDirectoryReader(str(DATA_DIR)).load_data()
-    if not documents:
+    # The menu digest (MENU_CONTEXT_MODE=digest) is cheap to regenerate, so always refresh it
+    if write_digest(DATA_DIR, DIGEST_PATH):
+        print(f"✅ Menu digest written to {DIGEST_PATH.resolve()}")
+
+    # Only rebuild when the fingerprint (embed model, chunker, corpus) changed
+    reason = index_staleness()
+    if reason is None and not args.force:
+        print(f"✅ Index at {STORAGE_DIR.resolve()} is up to date.")
+        if load_faq_index(DATA_DIR, FAQ_INDEX_PATH) is None:
+            _write_faq_index()
+        return
+    print(f"Building index: {reason or 'forced rebuild'}")
+
+    index = build_index()
+    if index is None:
         raise SystemExit("No documents found to index. Add menu/rules docs to data/company_docs.")
 
-    STORAGE_DIR.mkdir(parents=True, exist_ok=True)
+    print(f"✅ Restaurant knowledge indexed and saved to {STORAGE_DIR.resolve()}")
+    _write_faq_index()
 
-    docstore = SimpleDocumentStore()
-    vector_store = SimpleVectorStore()
-    storage_context = StorageContext.from_defaults(
-        docstore=docstore,
-        vector_store=vector_store,
-    )
 
-    VectorStoreIndex.from_documents(
-        documents,
-        storage_context=storage_context,
-        show_progress=True,
-    )
-
-    # Persist to disk for later retrieval
-    storage_context.persist(persist_dir=str(STORAGE_DIR))
-    print(f"✅ Restaurant knowledge indexed and saved to {STORAGE_DIR.resolve()}")
+def _write_faq_index() -> None:
+    # FAQ fast-path answers and their example-question embeddings
+    init_settings()
+    index = write_faq_index(Settings.embed_model.get_query_embedding, DATA_DIR, FAQ_INDEX_PATH)
+    print(f"✅ {len(index.entries)} FAQ answers written to {FAQ_INDEX_PATH.resolve()}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,147 @@
+"""
+Named session profiles: which models, VAD settings and endpointing a session
+runs with, read from latency_profiles.json.
+
+A session's profile is chosen, first match wins, from:
+
+1. the job's dispatch metadata, {"latency_profile": "<name>"} (per session)
+2. LATENCY_PROFILE (per worker)
+3. the config's "rollout" weights, e.g. {"quality": 90, "low-latency": 10};
+   a session id always lands in the same bucket
+4. the config's "default"
+
+Each session records its profile in the logs and in the
+agent_pipeline_latency_seconds{profile=...} histogram, so profiles can be
+A/B tested on live traffic. LATENCY_PROFILES_PATH points at a different
+config file.
+"""
+
+import json
+import logging
+import os
+import zlib
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger("restaurant.latency_profiles")
+
+PROFILES_PATH = Path(__file__).parent / "latency_profiles.json"
+METADATA_KEY = "latency_profile"
+
+TURN_DETECTORS = ("multilingual", "english", "vad", "stt")
+ENDPOINTING_KEYS = ("min_endpointing_delay", "max_endpointing_delay")
+
+
+@dataclass(frozen=True)
+class SessionProfile:
+    name: str
+    stt: Dict[str, str]
+    llm: Dict[str, str]
+    tts: Dict[str, str]
+    turn_detector: str = "multilingual"
+    # silero.VAD.load keyword arguments; empty means the library defaults
+    vad: Dict[str, float] = field(default_factory=dict)
+    # AgentSession endpointing keyword arguments; empty means the library defaults
+    endpointing: Dict[str, float] = field(default_factory=dict)
+    preemptive_generation: bool = True
+    # Fallback model raced against the LLM when it's slow to start (see hedged_llm.py); empty means off
+    hedge: Dict[str, Any] = field(default_factory=dict)
+    description: str = ""
+
+    @property
+    def tts_voice(self) -> Tuple[str, str]:
+        """(model, voice) of the TTS, the key phrase caches are stored under."""
+        return self.tts["model"], self.tts.get("voice", "")
+
+    def vad_key(self) -> str:
+        return json.dumps(self.vad, sort_keys=True)
+
+
+@dataclass(frozen=True)
+class ProfileConfig:
+    default: str
+    profiles: Dict[str, SessionProfile]
+    rollout: Dict[str, float] = field(default_factory=dict)
+
+    def get(self, name: str) -> SessionProfile:
+        if name not in self.profiles:
+            raise ValueError(f"unknown latency profile {name!r}; known: {sorted(self.profiles)}")
+        return self.profiles[name]
+
+    def select(self, session_id: str = "", metadata: str = "") -> SessionProfile:
+        """The profile for one session (see the module docstring for the order)."""
+        requested = _metadata_profile(metadata)
+        if requested is not None:
+            if requested in self.profiles:
+                return self.profiles[requested]
+            logger.warning("dispatch asked for unknown latency profile %r, ignoring", requested)
+        env_profile = os.getenv("LATENCY_PROFILE", "").strip()
+        if env_profile:
+            return self.get(env_profile)
+        if self.rollout and session_id:
+            return self.get(_rollout_bucket(self.rollout, session_id))
+        return self.get(self.default)
+
+
+def _metadata_profile(metadata: str) -> Optional[str]:
+    if not metadata:
+        return None
+    try:
+        data = json.loads(metadata)
+    except ValueError:
+        return None
+    return data.get(METADATA_KEY) if isinstance(data, dict) else None
+
+
+def _rollout_bucket(weights: Dict[str, float], session_id: str) -> str:
+    total = sum(weights.values())
+    point = (zlib.crc32(session_id.encode("utf-8")) % 10000) / 10000 * total
+    for name, weight in sorted(weights.items()):
+        if point < weight:
+            return name
+        point -= weight
+    return sorted(weights)[-1]
+
+
+def _parse_profile(name: str, raw: Dict[str, Any]) -> SessionProfile:
+    profile = SessionProfile(
+        name=name,
+        stt=dict(raw["stt"]),
+        llm=dict(raw["llm"]),
+        tts=dict(raw["tts"]),
+        turn_detector=raw.get("turn_detector", "multilingual"),
+        vad=dict(raw.get("vad", {})),
+        endpointing=dict(raw.get("endpointing", {})),
+        preemptive_generation=bool(raw.get("preemptive_generation", True)),
+        hedge=dict(raw.get("hedge", {})),
+        description=raw.get("description", ""),
+    )
+    if profile.turn_detector not in TURN_DETECTORS:
+        raise ValueError(f"profile {name!r}: turn_detector must be one of {TURN_DETECTORS}")
+    if profile.hedge and "model" not in profile.hedge:
+        raise ValueError(f"profile {name!r}: hedge needs a fallback model")
+    unknown = set(profile.endpointing) - set(ENDPOINTING_KEYS)
+    if unknown:
+        raise ValueError(f"profile {name!r}: unknown endpointing settings {sorted(unknown)}")
+    return profile
+
+
+def parse_config(data: Dict[str, Any]) -> ProfileConfig:
+    profiles = {name: _parse_profile(name, raw) for name, raw in data["profiles"].items()}
+    config = ProfileConfig(default=data["default"], profiles=profiles, rollout=dict(data.get("rollout", {})))
+    config.get(config.default)
+    for name in config.rollout:
+        config.get(name)
+    return config
+
+
+@lru_cache(maxsize=None)
+def _load(path: str) -> ProfileConfig:
+    return parse_config(json.loads(Path(path).read_text(encoding="utf-8")))
+
+
+def load_profiles() -> ProfileConfig:
+    """The profile config for this worker (read once per process)."""
+    return _load(os.getenv("LATENCY_PROFILES_PATH", str(PROFILES_PATH)))
@@ -0,0 +1,90 @@
+"""
+Keyword-only fallback index over the raw company docs.
+
+Used while the vector index is still loading or being built, so the agent
+can answer from the menu and rules without waiting on embeddings.
+"""
+
+import math
+import re
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# Words that carry no signal for menu lookups and would otherwise dominate scores
+_STOPWORDS = frozenset(
+    """a an and are as at be but by can do does for from have how i in is it
+    me my of on or please the there this to want was we what when which with
+    would you your""".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase text and split it into keyword tokens, dropping stopwords."""
+    return [t for t in _TOKEN_RE.findall(text.lower()) if t not in _STOPWORDS]
+
+
+def split_into_chunks(text: str) -> List[str]:
+    """Split a document on blank lines, which separate items and sections in the docs."""
+    return [block.strip() for block in re.split(r"\n\s*\n", text) if block.strip()]
+
+
+class LexicalIndex:
+    """
+    A small BM25 index over paragraph-sized chunks.
+
+    Cheap enough to build on the first turn (the whole corpus is a few KB),
+    and needs no embedding model.
+    """
+
+    def __init__(self, chunks: List[str], k1: float = 1.5, b: float = 0.75) -> None:
+        self.chunks = chunks
+        self._k1 = k1
+        self._b = b
+        self._term_freqs: List[Counter] = [Counter(tokenize(c)) for c in chunks]
+        self._lengths = [sum(tf.values()) for tf in self._term_freqs]
+        self._avg_length = (sum(self._lengths) / len(self._lengths)) if chunks else 0.0
+
+        doc_freq: Dict[str, int] = Counter()
+        for tf in self._term_freqs:
+            doc_freq.update(tf.keys())
+        n = len(chunks)
+        self._idf = {
+            term: math.log(1 + (n - df + 0.5) / (df + 0.5)) for term, df in doc_freq.items()
+        }
+
+    @classmethod
+    def from_directory(cls, data_dir: Path) -> Optional["LexicalIndex"]:
+        """Build the index from every .txt file in data_dir, or None if there are none."""
+        if not data_dir.exists():
+            return None
+
+        chunks: List[str] = []
+        for path in sorted(data_dir.glob("*.txt")):
+            chunks.extend(split_into_chunks(path.read_text(encoding="utf-8")))
+
+        if not chunks:
+            return None
+        return cls(chunks)
+
+    def search(self, query: str, top_k: int = 3) -> List[str]:
+        """Return up to top_k chunks ranked by BM25 score; chunks with no matching terms are dropped."""
+        terms = [t for t in tokenize(query) if t in self._idf]
+        if not terms:
+            return []
+
+        scored = []
+        for i, tf in enumerate(self._term_freqs):
+            score = 0.0
+            norm = self._k1 * (1 - self._b + self._b * self._lengths[i] / self._avg_length)
+            for term in terms:
+                freq = tf.get(term)
+                if freq:
+                    score += self._idf[term] * freq * (self._k1 + 1) / (freq + norm)
+            if score > 0:
+                scored.append((score, i))
+
+        scored.sort(key=lambda pair: (-pair[0], pair[1]))
+        return [self.chunks[i] for _, i in scored[:top_k]]
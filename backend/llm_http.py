@@ -0,0 +1,118 @@
+"""
+One pooled HTTP client per process for the session LLMs.
+
+By default every groq.LLM builds its own openai client and httpx pool, so
+each session sets up its own TCP/TLS connections and sessions share
+nothing. Here all sessions in a job process share one openai.AsyncClient
+per LLM endpoint, over one httpx pool with keep-alive (and HTTP/2 when the
+h2 package is installed).
+
+The client is per process, and a livekit job process runs one session
+(PROCESS_MAX_SESSIONS, see provider_pool.py), so connections are not
+carried over from one call to the next. What the pool saves is within a
+session: every turn, and the hedged fallback on the same endpoint, reuse
+the connection the first request opened. The first connection itself is
+opened when the session checks out its providers (the LLM's prewarm()),
+while the caller is still joining. Only a process running several
+sessions at once reuses connections across sessions.
+
+Pool size is LLM_HTTP_MAX_CONNECTIONS (default 20). Idle connections are
+kept for LLM_HTTP_KEEPALIVE_EXPIRY seconds (default 120). For every
+request, the agent_llm_http_connections_total metric records whether it
+reused a connection, and agent_llm_http_pool_wait_seconds records how
+long it waited for one.
+"""
+
+import importlib.util
+import os
+import time
+from typing import Dict, Optional
+
+import httpx
+import openai
+
+from telemetry import observe_llm_connection
+
+GROQ_BASE_URL = "https://api.groq.com/openai/v1"
+
+# Trace events that mark the moment a request holds a connection: a new
+# connection starts connecting, or a pooled one starts sending
+_ACQUIRED_EVENTS = (
+    "connection.connect_tcp.started",
+    "connection.connect_unix_socket.started",
+    "http11.send_request_headers.started",
+    "http2.send_request_headers.started",
+)
+
+
+class InstrumentedTransport(httpx.AsyncHTTPTransport):
+    """httpx transport that reports connection reuse and pool wait per request."""
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        start = time.perf_counter()
+        acquired: Dict[str, float] = {}
+        inner_trace = request.extensions.get("trace")
+
+        async def trace(event_name: str, info: dict) -> None:
+            if not acquired and event_name in _ACQUIRED_EVENTS:
+                acquired["at"] = time.perf_counter()
+                acquired["new"] = event_name.startswith("connection.")
+            if inner_trace is not None:
+                await inner_trace(event_name, info)
+
+        request.extensions["trace"] = trace
+        try:
+            return await super().handle_async_request(request)
+        finally:
+            if acquired:
+                observe_llm_connection(reused=not acquired["new"], pool_wait=acquired["at"] - start)
+
+
+def http2_available() -> bool:
+    return importlib.util.find_spec("h2") is not None
+
+
+def create_llm_client(
+    base_url: str = GROQ_BASE_URL,
+    api_key: Optional[str] = None,
+    max_connections: int = 20,
+    keepalive_expiry: float = 120.0,
+) -> openai.AsyncClient:
+    """An openai client over an instrumented keep-alive pool (HTTP/2 if available)."""
+    limits = httpx.Limits(
+        max_connections=max_connections,
+        max_keepalive_connections=max_connections,
+        keepalive_expiry=keepalive_expiry,
+    )
+    http2 = http2_available()
+    http_client = httpx.AsyncClient(
+        # Same timeouts the LLM plugins use for their own clients
+        timeout=httpx.Timeout(connect=15.0, read=5.0, write=5.0, pool=5.0),
+        follow_redirects=True,
+        limits=limits,
+        http2=http2,
+        transport=InstrumentedTransport(limits=limits, http2=http2),
+    )
+    return openai.AsyncClient(
+        api_key=api_key or os.getenv("GROQ_API_KEY"),
+        base_url=base_url,
+        # Retries are the LLM plugin's job (APIConnectOptions)
+        max_retries=0,
+        http_client=http_client,
+    )
+
+
+_CLIENTS: Dict[str, openai.AsyncClient] = {}
+
+
+def shared_llm_client(base_url: str = GROQ_BASE_URL) -> openai.AsyncClient:
+    """The process's client for an LLM endpoint, created on first use."""
+    client = _CLIENTS.get(base_url)
+    if client is None:
+        client = create_llm_client(
+            base_url,
+            max_connections=int(os.getenv("LLM_HTTP_MAX_CONNECTIONS", "20")),
+            keepalive_expiry=float(os.getenv("LLM_HTTP_KEEPALIVE_EXPIRY", "120")),
+        )
+        _CLIENTS[base_url] = client
+    return client
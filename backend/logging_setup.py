@@ -0,0 +1,212 @@
+"""
+Structured, queue-based logging for the agent worker.
+
+Log calls on the event loop only enqueue the LogRecord; a listener thread
+formats it as JSON and writes it, so console and disk I/O never stall audio.
+Every record carries the correlation id of the session it was logged from.
+
+A separate transcript/event sink writes one JSON line per conversation event
+(user turns, tool calls, ...) to a rotating file, in batches, for offline
+analysis.
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import time
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, List, Optional, Sequence
+
+PROJECT_ROOT = Path(__file__).parent.parent
+
+# Loggers owned by this app. LiveKit's own loggers are left alone: the framework
+# forwards them from job processes to the main process itself.
+APP_LOGGERS = ("agent-Sage-17cf", "restaurant")
+TRANSCRIPT_LOGGER = "restaurant.transcript"
+
+_CORRELATION_ID: ContextVar[str] = ContextVar("log_correlation_id", default="")
+
+# LogRecord attributes that are not user-supplied `extra` fields
+_STANDARD_ATTRS = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {
+    "message",
+    "asctime",
+    "correlation_id",
+}
+
+_LISTENERS: List[logging.handlers.QueueListener] = []
+_ATEXIT_REGISTERED = False
+
+
+def bind_correlation_id(correlation_id: str) -> None:
+    """Tag every record logged from this async context (and tasks it spawns)."""
+    _CORRELATION_ID.set(correlation_id)
+
+
+class _CorrelationQueueHandler(logging.handlers.QueueHandler):
+    """
+    Enqueues records without formatting them.
+
+    The stock QueueHandler formats the message in the calling thread; here the
+    only work on the caller's side is reading the correlation id.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.correlation_id = _CORRELATION_ID.get()
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, including any `extra={...}` fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": round(record.created, 6),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            "correlation_id": getattr(record, "correlation_id", ""),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _STANDARD_ATTRS and not key.startswith("_"):
+                payload[key] = value
+        if record.exc_info:
+            payload["exc"] = self.formatException(record.exc_info)
+        return json.dumps(payload, default=str, ensure_ascii=False)
+
+
+class BatchedRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """
+    RotatingFileHandler that buffers formatted lines and writes them in batches.
+
+    A batch is written when it reaches batch_size lines, when a record arrives
+    more than flush_interval seconds after the last write, and on close.
+    Runs on the queue listener thread, never on the event loop.
+    """
+
+    def __init__(
+        self,
+        filename: Path,
+        max_bytes: int = 10 * 2**20,
+        backup_count: int = 5,
+        batch_size: int = 64,
+        flush_interval: float = 1.0,
+    ) -> None:
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8")
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._buffer: List[str] = []
+        self._last_write = time.monotonic()
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            self._buffer.append(self.format(record) + "\n")
+            if (
+                len(self._buffer) >= self.batch_size
+                or time.monotonic() - self._last_write >= self.flush_interval
+            ):
+                self._write_batch()
+        except Exception:
+            self.handleError(record)
+
+    def _write_batch(self) -> None:
+        if not self._buffer:
+            return
+        chunk = "".join(self._buffer)
+        self._buffer.clear()
+        if self.stream is None:
+            self.stream = self._open()
+        if self.maxBytes and self.stream.tell() + len(chunk) > self.maxBytes:
+            self.doRollover()
+        self.stream.write(chunk)
+        self.stream.flush()
+        self._last_write = time.monotonic()
+
+    def flush(self) -> None:
+        self.acquire()
+        try:
+            self._write_batch()
+        finally:
+            self.release()
+
+    def close(self) -> None:
+        self.flush()
+        super().close()
+
+
+def _attach_queue(logger: logging.Logger, *handlers: logging.Handler) -> None:
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    _LISTENERS.append(listener)
+    for existing in list(logger.handlers):
+        if isinstance(existing, _CorrelationQueueHandler):
+            logger.removeHandler(existing)
+    logger.addHandler(_CorrelationQueueHandler(log_queue))
+    logger.propagate = False
+
+
+def configure_logging(
+    level: Optional[str] = None,
+    transcript_dir: Optional[Path] = None,
+    loggers: Sequence[str] = APP_LOGGERS,
+) -> None:
+    """
+    Route the app's loggers through a queue to a JSON console handler, and the
+    transcript logger to a batched rotating file.
+
+    level defaults to LOG_LEVEL (INFO). The transcript file goes to
+    TRANSCRIPT_DIR (default logs/) as transcript-<pid>.jsonl, one file per
+    process so job processes never rotate each other's files. Set
+    TRANSCRIPT_DIR to an empty string to disable the transcript sink.
+    Calling this again (e.g. in each job process) replaces the previous setup.
+    """
+    global _ATEXIT_REGISTERED
+    shutdown_logging()
+    if not _ATEXIT_REGISTERED:
+        atexit.register(shutdown_logging)
+        _ATEXIT_REGISTERED = True
+
+    level = (level or os.getenv("LOG_LEVEL", "INFO")).upper()
+    console = logging.StreamHandler()
+    console.setFormatter(JsonFormatter())
+    for name in loggers:
+        logger = logging.getLogger(name)
+        logger.setLevel(level)
+        _attach_queue(logger, console)
+
+    transcript_logger = logging.getLogger(TRANSCRIPT_LOGGER)
+    if transcript_dir is None:
+        configured = os.getenv("TRANSCRIPT_DIR", str(PROJECT_ROOT / "logs"))
+        transcript_dir = Path(configured) if configured.strip() else None
+    if transcript_dir is None:
+        transcript_logger.setLevel(logging.CRITICAL + 1)
+        transcript_logger.propagate = False
+        return
+
+    transcript_dir.mkdir(parents=True, exist_ok=True)
+    sink = BatchedRotatingFileHandler(transcript_dir / f"transcript-{os.getpid()}.jsonl")
+    sink.setFormatter(JsonFormatter())
+    transcript_logger.setLevel(logging.INFO)
+    _attach_queue(transcript_logger, sink)
+
+
+def shutdown_logging() -> None:
+    """Drain the queues and flush the transcript file."""
+    while _LISTENERS:
+        listener = _LISTENERS.pop()
+        listener.stop()
+        for handler in listener.handlers:
+            handler.close()
+
+
+_transcript = logging.getLogger(TRANSCRIPT_LOGGER)
+
+
+def log_transcript(event: str, **fields: Any) -> None:
+    """Record a conversation event (e.g. "user_turn", "tool_call") to the transcript sink."""
+    if _transcript.isEnabledFor(logging.INFO):
+        _transcript.info(event, extra={"event": event, **fields})
@@ -0,0 +1,204 @@
+"""
+Static menu digest: the whole menu as a compact table in the system prompt.
+
+For a single outlet the menu is small enough (~10 KB of prose, well under 1K
+tokens as a table) to send on every request. Placed in the instructions it is
+a stable prompt prefix the LLM provider can cache, and menu questions no
+longer need a per-turn embed + search + context injection. Promotions and
+rules are still retrieved per turn.
+
+The context mode is a per-deployment setting, MENU_CONTEXT_MODE:
+- "retrieval" (default): menu facts come from per-turn RAG context
+- "digest": menu facts come from this digest in the instructions
+
+ingest.py writes the digest next to the index; the agent regenerates it in
+memory if the file is missing or was built from different docs.
+"""
+
+import os
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from doc_metadata import DOC_TYPE_MENU, doc_type_for_file
+from index_manifest import compute_corpus_hash
+
+PROJECT_ROOT = Path(__file__).parent.parent
+DATA_DIR = PROJECT_ROOT / "data" / "company_docs"
+DIGEST_PATH = PROJECT_ROOT / "storage" / "menu_digest.txt"
+
+CONTEXT_MODE_RETRIEVAL = "retrieval"
+CONTEXT_MODE_DIGEST = "digest"
+CONTEXT_MODES = (CONTEXT_MODE_RETRIEVAL, CONTEXT_MODE_DIGEST)
+
+_HASH_PREFIX = "# corpus-hash: "
+_LIST_SECTIONS = ("available sizes", "options", "flavours", "flavors")
+_ADDON_SECTION = "optional add-ons"
+_PRICED_LINE_RE = re.compile(r"^-\s*(.+?)\s+[–-]\s+(?:\+?₹\s*(\d+)|(no extra charge))", re.IGNORECASE)
+_PRICE_RE = re.compile(r"₹\s*(\d+)")
+_PARENS_RE = re.compile(r"\s*\([^)]*\)")
+
+_digest_cache: Optional[Tuple[str, str]] = None
+
+
+def context_mode() -> str:
+    mode = os.getenv("MENU_CONTEXT_MODE", CONTEXT_MODE_RETRIEVAL).strip().lower()
+    if mode not in CONTEXT_MODES:
+        raise ValueError(f"MENU_CONTEXT_MODE must be one of {CONTEXT_MODES}, got {mode!r}")
+    return mode
+
+
+@dataclass
+class MenuItem:
+    name: str
+    category: str = ""
+    dietary: str = ""
+    contents: str = ""
+    prices: List[str] = field(default_factory=list)
+    addons: List[str] = field(default_factory=list)
+    allergens: str = ""
+
+
+def _short_dietary(value: str) -> str:
+    short = re.sub(r"non-vegetarian", "non-veg", value, flags=re.IGNORECASE)
+    short = re.sub(r"\bvegetarian\b", "veg", short, flags=re.IGNORECASE)
+    # Keep short qualifiers ("contains eggs"), drop long explanations
+    return re.sub(r"\s*\(([^)]{25,})\)", "", short).strip()
+
+
+def _short_allergens(value: str) -> str:
+    value = _PARENS_RE.sub("", value).strip()
+    return re.sub(r"^contains\s+", "", value, flags=re.IGNORECASE)
+
+
+def _priced_entry(line: str, keep_qualifier: bool) -> Optional[str]:
+    match = _PRICED_LINE_RE.match(line)
+    if not match:
+        return None
+    name = match.group(1)
+    if not (keep_qualifier and "only" in name):
+        name = _PARENS_RE.sub("", name)
+    price = match.group(2) or "0"
+    return f"{name.strip()} {price}"
+
+
+def _parse_item(block: str) -> Optional[MenuItem]:
+    lines = [line.strip() for line in block.splitlines() if line.strip()]
+    if len(lines) < 2 or not any(line.startswith("Category:") for line in lines):
+        return None
+    item = MenuItem(name=lines[0])
+    section = None
+    for line in lines[1:]:
+        key, _, value = line.partition(":")
+        key = key.strip().lower()
+        if line.startswith("-"):
+            entry = _priced_entry(line, keep_qualifier=section == _ADDON_SECTION)
+            if entry and section == _ADDON_SECTION:
+                item.addons.append(entry)
+            elif entry and section in _LIST_SECTIONS:
+                item.prices.append(entry)
+            continue
+        section = None
+        if key == "category":
+            item.category = value.strip()
+        elif key == "dietary":
+            item.dietary = _short_dietary(value.strip())
+        elif key == "description":
+            # The first sentence lists the ingredients; the rest is marketing copy
+            item.contents = value.strip().split(". ")[0].rstrip(".")
+        elif key == "price":
+            price = _PRICE_RE.search(value)
+            if price:
+                item.prices.append(price.group(1))
+        elif key == "common allergens":
+            item.allergens = _short_allergens(value.strip())
+        elif key.startswith(_ADDON_SECTION):
+            section = _ADDON_SECTION
+        elif key in _LIST_SECTIONS:
+            section = key
+    return item
+
+
+def parse_menu(text: str) -> Tuple[List[str], List[MenuItem]]:
+    """Return the menu's general notes and its items, in document order."""
+    notes: List[str] = []
+    items: List[MenuItem] = []
+    for block in re.split(r"\n\s*\n", text):
+        lines = [line.strip() for line in block.strip().splitlines()]
+        if lines and lines[0].upper() == "IMPORTANT NOTES":
+            notes.extend(line.lstrip("- ").strip() for line in lines[1:] if line.startswith("-"))
+            continue
+        item = _parse_item(block)
+        if item is not None:
+            items.append(item)
+    return notes, items
+
+
+def format_digest(notes: List[str], items: List[MenuItem]) -> str:
+    lines = [f"- {note}" for note in notes]
+    lines.append("Item | Category | Diet | Contents | Price ₹ | Add-ons ₹ | Allergens")
+    for item in items:
+        lines.append(
+            " | ".join(
+                (
+                    item.name,
+                    item.category,
+                    item.dietary,
+                    item.contents,
+                    " / ".join(item.prices),
+                    "; ".join(item.addons) or "-",
+                    item.allergens or "-",
+                )
+            )
+        )
+    return "\n".join(lines)
+
+
+def build_digest(data_dir: Path = DATA_DIR) -> str:
+    """Digest of every menu document in data_dir."""
+    sections = []
+    for path in sorted(p for p in data_dir.iterdir() if p.is_file()):
+        if doc_type_for_file(path.name) != DOC_TYPE_MENU:
+            continue
+        notes, items = parse_menu(path.read_text(encoding="utf-8"))
+        if items:
+            sections.append(format_digest(notes, items))
+    return "\n\n".join(sections)
+
+
+def write_digest(data_dir: Path = DATA_DIR, path: Path = DIGEST_PATH) -> str:
+    digest = build_digest(data_dir)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(f"{_HASH_PREFIX}{compute_corpus_hash(data_dir)}\n{digest}\n", encoding="utf-8")
+    return digest
+
+
+def load_digest(data_dir: Path = DATA_DIR, path: Path = DIGEST_PATH) -> str:
+    """
+    The digest for the current docs: read from the file ingest wrote, or built
+    in memory if that file is missing or stale. Cached per process.
+    """
+    global _digest_cache
+    corpus_hash = compute_corpus_hash(data_dir)
+    if _digest_cache is not None and _digest_cache[0] == corpus_hash:
+        return _digest_cache[1]
+
+    digest = None
+    if path.exists():
+        header, _, body = path.read_text(encoding="utf-8").partition("\n")
+        if header == f"{_HASH_PREFIX}{corpus_hash}":
+            digest = body.rstrip("\n")
+    if digest is None:
+        digest = build_digest(data_dir)
+    _digest_cache = (corpus_hash, digest)
+    return digest
+
+
+def digest_instructions(digest: str) -> str:
+    """The instructions section that carries the digest."""
+    return (
+        "FULL MENU (authoritative for items, prices, add-ons and dietary info; "
+        "promotions and restaurant rules arrive as context per turn):\n"
+        f"{digest}"
+    )
@@ -0,0 +1,320 @@
+"""
+Durable order store for the cancel / modify window.
+
+Orders used to live only in the browser's localStorage, so the agent had no
+way to check the 5-minute rule. The store keeps them in SQLite (WAL mode)
+at storage/orders.sqlite3 (ORDER_STORE_PATH overrides):
+
+- place(): records an order when the customer confirms it. Order ids are
+  idempotent: placing an id that already exists returns the stored order
+  unchanged, so a retried tool call never creates a second order
+- the agent places orders as pending when it sends the caller to pay, and
+  cancels them if the caller backs out of paying. The payment page tells
+  the agent when the caller pays, and the order becomes placed then:
+  the 5-minute window starts at payment, and unpaid orders never count as
+  placed
+- reads are answered from memory: the process's own orders, and those
+  placed in the last ORDER_STORE_RETENTION hours (default 24) when it
+  started, are indexed by order id and by identity in placement order.
+  Anything else falls back to the table's (order_id) and
+  (identity, placed_at) indexes, e.g. an order placed by another worker.
+  get_async() and latest_for_async() do that read on a worker thread, for
+  callers on the event loop
+- writes are write-behind: they update memory at once and are queued for
+  a background thread, which commits them in batches (up to batch_size
+  rows, gathered for at most flush_interval seconds), so the voice loop
+  never waits on disk. flush() waits for everything queued so far
+"""
+
+import asyncio
+import json
+import logging
+import os
+import queue
+import random
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field, replace
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+logger = logging.getLogger("restaurant.order_store")
+
+PROJECT_ROOT = Path(__file__).parent.parent
+ORDER_STORE_PATH = PROJECT_ROOT / "storage" / "orders.sqlite3"
+
+CHANGE_WINDOW_SECONDS = 5 * 60
+
+STATUS_PLACED = "placed"
+# Sent to the payment page, not paid yet
+STATUS_PENDING = "pending"
+STATUS_CANCELLED = "cancelled"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS orders (
+    order_id TEXT PRIMARY KEY,
+    identity TEXT NOT NULL,
+    room TEXT NOT NULL,
+    items TEXT NOT NULL,
+    total REAL NOT NULL,
+    status TEXT NOT NULL,
+    placed_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS orders_by_identity ON orders (identity, placed_at);
+CREATE INDEX IF NOT EXISTS orders_by_placed_at ON orders (placed_at);
+"""
+
+_COLUMNS = "order_id, identity, room, items, total, status, placed_at, updated_at"
+
+# A later write of the same order only changes its status and clock (placement is idempotent)
+_UPSERT = f"""
+INSERT INTO orders ({_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(order_id) DO UPDATE SET
+    status = excluded.status, placed_at = excluded.placed_at, updated_at = excluded.updated_at
+"""
+
+_BY_ID = "order_id = ?"
+_LATEST_FOR = "identity = ? ORDER BY placed_at DESC LIMIT 1"
+
+
+def new_order_id() -> str:
+    """An order id in the frontend's format, ORD-<epoch ms>-<random>."""
+    return f"ORD-{int(time.time() * 1000)}-{random.randrange(10000)}"
+
+
+@dataclass(frozen=True)
+class Order:
+    order_id: str
+    identity: str
+    room: str
+    items: List[dict]
+    total: float
+    placed_at: float
+    status: str = STATUS_PLACED
+    updated_at: float = field(default=0.0, compare=False)
+
+    def age(self, now: Optional[float] = None) -> float:
+        return (time.time() if now is None else now) - self.placed_at
+
+    def can_change(self, now: Optional[float] = None, window: float = CHANGE_WINDOW_SECONDS) -> bool:
+        """True while the order can still be cancelled or modified."""
+        return self.status == STATUS_PLACED and self.age(now) <= window
+
+    def _row(self) -> tuple:
+        return (
+            self.order_id,
+            self.identity,
+            self.room,
+            json.dumps(self.items),
+            self.total,
+            self.status,
+            self.placed_at,
+            self.updated_at or self.placed_at,
+        )
+
+    @classmethod
+    def _from_row(cls, row: tuple) -> "Order":
+        order_id, identity, room, items, total, status, placed_at, updated_at = row
+        return cls(order_id, identity, room, json.loads(items), total, placed_at, status, updated_at)
+
+
+class _FlushMarker:
+    def __init__(self) -> None:
+        self.done = threading.Event()
+
+
+_Write = Union[Order, _FlushMarker, None]
+
+
+class OrderStore:
+    def __init__(
+        self,
+        path: Union[str, Path] = ORDER_STORE_PATH,
+        retention: float = 24 * 3600,
+        batch_size: int = 100,
+        flush_interval: float = 0.05,
+    ) -> None:
+        self.path = Path(path)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # Reads that miss memory run on the caller's thread (a worker thread for the
+        # *_async reads), one at a time; writes only on the writer thread
+        self._reader = self._connect()
+        self._read_lock = threading.Lock()
+        self._orders: Dict[str, Order] = {}
+        self._by_identity: Dict[str, List[str]] = {}
+        since = time.time() - retention
+        rows = self._reader.execute(
+            f"SELECT {_COLUMNS} FROM orders WHERE placed_at >= ? ORDER BY placed_at", (since,)
+        ).fetchall()
+        for row in rows:
+            self._remember(Order._from_row(row))
+        self._queue: "queue.SimpleQueue[_Write]" = queue.SimpleQueue()
+        self._writer = threading.Thread(target=self._write_loop, name="order-store-writer", daemon=True)
+        self._writer.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        # WAL keeps commits consistent with NORMAL; a power cut can lose only the last batches
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(_SCHEMA)
+        return conn
+
+    def _remember(self, order: Order) -> None:
+        if order.order_id not in self._orders:
+            self._by_identity.setdefault(order.identity, []).append(order.order_id)
+        self._orders[order.order_id] = order
+
+    def place(
+        self,
+        order_id: str,
+        identity: str,
+        room: str,
+        items: List[dict],
+        total: float,
+        placed_at: Optional[float] = None,
+        status: str = STATUS_PLACED,
+        fresh: bool = False,
+    ) -> Order:
+        """
+        Record a confirmed order; an id that's already stored returns the stored order.
+
+        Pass fresh=True for an id new_order_id() just made: nothing can be
+        stored under it, so the table isn't searched for one.
+        """
+        existing = self._orders.get(order_id) if fresh else self.get(order_id)
+        if existing is not None:
+            return existing
+        placed_at = time.time() if placed_at is None else placed_at
+        order = Order(order_id, identity, room, [dict(item) for item in items], total, placed_at, status, placed_at)
+        self._remember(order)
+        self._queue.put(order)
+        return order
+
+    def _select(self, where: str, params: tuple) -> Optional[Order]:
+        with self._read_lock:
+            row = self._reader.execute(f"SELECT {_COLUMNS} FROM orders WHERE {where}", params).fetchone()
+        return None if row is None else Order._from_row(row)
+
+    def _loaded(self, order: Optional[Order]) -> Optional[Order]:
+        if order is None:
+            return None
+        # Memory wins: it may hold a newer status than the table
+        if order.order_id not in self._orders:
+            self._remember(order)
+        return self._orders[order.order_id]
+
+    def _latest_in_memory(self, identity: str) -> Optional[Order]:
+        order_ids = self._by_identity.get(identity)
+        if not order_ids:
+            return None
+        return max((self._orders[i] for i in order_ids), key=lambda o: o.placed_at)
+
+    def get(self, order_id: str) -> Optional[Order]:
+        order = self._orders.get(order_id)
+        if order is not None:
+            return order
+        return self._loaded(self._select(_BY_ID, (order_id,)))
+
+    async def get_async(self, order_id: str) -> Optional[Order]:
+        """get() for the event loop: a miss is read from the table on a worker thread."""
+        order = self._orders.get(order_id)
+        if order is not None:
+            return order
+        return self._loaded(await asyncio.to_thread(self._select, _BY_ID, (order_id,)))
+
+    def latest_for(self, identity: str) -> Optional[Order]:
+        """The identity's most recently placed order."""
+        order = self._latest_in_memory(identity)
+        if order is not None:
+            return order
+        return self._loaded(self._select(_LATEST_FOR, (identity,)))
+
+    async def latest_for_async(self, identity: str) -> Optional[Order]:
+        """latest_for() for the event loop: a miss is read from the table on a worker thread."""
+        order = self._latest_in_memory(identity)
+        if order is not None:
+            return order
+        return self._loaded(await asyncio.to_thread(self._select, _LATEST_FOR, (identity,)))
+
+    def set_status(self, order_id: str, status: str, restart: bool = False) -> Optional[Order]:
+        """
+        Change an order's status. restart=True also restarts its clock
+        (placed_at), as when a pending order is paid.
+        """
+        order = self.get(order_id)
+        if order is None:
+            return None
+        now = time.time()
+        order = replace(order, status=status, placed_at=now if restart else order.placed_at, updated_at=now)
+        self._orders[order_id] = order
+        self._queue.put(order)
+        return order
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every write queued so far is committed."""
+        marker = _FlushMarker()
+        self._queue.put(marker)
+        return marker.done.wait(timeout)
+
+    def close(self) -> None:
+        if self._writer.is_alive():
+            self._queue.put(None)
+            self._writer.join()
+        self._reader.close()
+
+    def _write_loop(self) -> None:
+        conn = self._connect()
+        try:
+            running = True
+            while running:
+                batch: List[Order] = []
+                markers: List[_FlushMarker] = []
+                item = self._queue.get()
+                deadline = time.monotonic() + self.flush_interval
+                while True:
+                    if item is None:
+                        running = False
+                        break
+                    if isinstance(item, _FlushMarker):
+                        markers.append(item)
+                        break
+                    batch.append(item)
+                    if len(batch) >= self.batch_size:
+                        break
+                    try:
+                        item = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                    except queue.Empty:
+                        break
+                self._commit(conn, batch)
+                for marker in markers:
+                    marker.done.set()
+        finally:
+            conn.close()
+
+    def _commit(self, conn: sqlite3.Connection, batch: List[Order]) -> None:
+        if not batch:
+            return
+        try:
+            with conn:
+                conn.execute("BEGIN")
+                conn.executemany(_UPSERT, [order._row() for order in batch])
+        except sqlite3.Error:
+            logger.exception("could not write %d orders to %s", len(batch), self.path)
+
+
+_STORE: Optional[OrderStore] = None
+
+
+def get_order_store() -> OrderStore:
+    global _STORE
+    if _STORE is None:
+        _STORE = OrderStore(
+            os.getenv("ORDER_STORE_PATH", str(ORDER_STORE_PATH)),
+            retention=float(os.getenv("ORDER_STORE_RETENTION", "24")) * 3600,
+        )
+    return _STORE
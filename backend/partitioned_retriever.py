@@ -0,0 +1,159 @@
+"""
+Metadata-partitioned vector search over the persisted index.
+
+All node embeddings are held in one normalized matrix whose rows are sorted by
+document type, so each doc type is a contiguous row range. Menu categories and
+dietary labels are boolean row masks (bitmaps). A RetrievalFilter selects rows
+from those precomputed partitions before any similarity math is done, so a
+filtered search only scores the rows it could return.
+"""
+
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Callable, Dict, FrozenSet, List, Sequence, Tuple
+
+import numpy as np
+
+from doc_metadata import DOC_TYPE_MENU, split_labels
+from retrieval_filters import NO_FILTER, RetrievalFilter
+
+
+@dataclass
+class RetrievedChunk:
+    text: str
+    score: float
+    metadata: Dict[str, str]
+
+
+class PartitionedRetriever:
+    """Cosine-similarity search restricted to filter-selected partitions."""
+
+    def __init__(
+        self,
+        texts: Sequence[str],
+        metadatas: Sequence[Dict[str, str]],
+        embeddings: np.ndarray,
+        embed_query: Callable[[str], List[float]],
+    ) -> None:
+        if not (len(texts) == len(metadatas) == len(embeddings)):
+            raise ValueError("texts, metadatas and embeddings must have the same length")
+
+        order = sorted(range(len(texts)), key=lambda i: (metadatas[i].get("doc_type", ""), i))
+        self._texts = [texts[i] for i in order]
+        self._metadatas = [metadatas[i] for i in order]
+        matrix = np.asarray(embeddings, dtype=np.float32)[order]
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        self._matrix = matrix / np.where(norms == 0, 1, norms)
+        self._embed_query = embed_query
+
+        # Row ranges per doc type (rows are sorted by doc type)
+        self._doc_type_ranges: Dict[str, Tuple[int, int]] = {}
+        for row, metadata in enumerate(self._metadatas):
+            doc_type = metadata.get("doc_type", "")
+            start, _ = self._doc_type_ranges.get(doc_type, (row, row))
+            self._doc_type_ranges[doc_type] = (start, row + 1)
+
+        # Bitmaps over all rows for menu categories and dietary labels
+        n = len(self._texts)
+        self._category_masks: Dict[str, np.ndarray] = {}
+        self._dietary_masks: Dict[str, np.ndarray] = {}
+        for row, metadata in enumerate(self._metadatas):
+            category = metadata.get("category")
+            if category:
+                self._category_masks.setdefault(category, np.zeros(n, dtype=bool))[row] = True
+            for label in split_labels(metadata.get("dietary")):
+                self._dietary_masks.setdefault(label, np.zeros(n, dtype=bool))[row] = True
+
+        self._partition = lru_cache(maxsize=128)(self._compute_partition)
+
+    @classmethod
+    def from_index(cls, index, embed_query: Callable[[str], List[float]]) -> "PartitionedRetriever":
+        """
+        Build from a loaded VectorStoreIndex backed by the default SimpleVectorStore.
+
+        Raises ValueError for vector stores that don't expose their embeddings.
+        """
+        data = getattr(index.vector_store, "data", None)
+        embedding_dict = getattr(data, "embedding_dict", None)
+        if not embedding_dict:
+            raise ValueError("vector store does not expose an in-memory embedding table")
+
+        node_ids = list(embedding_dict)
+        nodes = index.docstore.get_nodes(node_ids)
+        return cls(
+            texts=[node.get_content() for node in nodes],
+            metadatas=[dict(node.metadata) for node in nodes],
+            embeddings=np.array([embedding_dict[node_id] for node_id in node_ids]),
+            embed_query=embed_query,
+        )
+
+    def __len__(self) -> int:
+        return len(self._texts)
+
+    def _compute_partition(self, retrieval_filter: RetrievalFilter) -> Tuple[np.ndarray, np.ndarray]:
+        """Rows selected by the filter, and the matching slice of the embedding matrix."""
+        n = len(self._texts)
+        if retrieval_filter.is_empty:
+            return np.arange(n), self._matrix
+
+        doc_types = retrieval_filter.doc_types or frozenset(self._doc_type_ranges)
+        selected = np.zeros(n, dtype=bool)
+        for doc_type in doc_types:
+            if doc_type not in self._doc_type_ranges:
+                continue
+            start, end = self._doc_type_ranges[doc_type]
+            rows = np.zeros(n, dtype=bool)
+            rows[start:end] = True
+            if doc_type == DOC_TYPE_MENU:
+                if retrieval_filter.categories:
+                    rows &= self._any_mask(self._category_masks, retrieval_filter.categories)
+                if retrieval_filter.dietary:
+                    rows &= self._any_mask(self._dietary_masks, retrieval_filter.dietary)
+            selected |= rows
+
+        row_ids = np.flatnonzero(selected)
+        if len(row_ids) and row_ids[-1] - row_ids[0] + 1 == len(row_ids):
+            # Contiguous partition: a view, no copy
+            return row_ids, self._matrix[row_ids[0] : row_ids[-1] + 1]
+        return row_ids, self._matrix[row_ids]
+
+    def _any_mask(self, masks: Dict[str, np.ndarray], keys: FrozenSet) -> np.ndarray:
+        combined = np.zeros(len(self._texts), dtype=bool)
+        for key in keys:
+            if key in masks:
+                combined |= masks[key]
+        return combined
+
+    def embed(self, query: str) -> np.ndarray:
+        vector = np.asarray(self._embed_query(query), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def search(
+        self,
+        query_embedding: np.ndarray,
+        retrieval_filter: RetrievalFilter = NO_FILTER,
+        top_k: int = 3,
+    ) -> List[RetrievedChunk]:
+        """Score only the rows in the filter's partition and return the best top_k."""
+        row_ids, matrix = self._partition(retrieval_filter)
+        if len(row_ids) == 0:
+            return []
+
+        scores = matrix @ query_embedding
+        k = min(top_k, len(scores))
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best])]
+        return [
+            RetrievedChunk(
+                text=self._texts[row_ids[i]],
+                score=float(scores[i]),
+                metadata=self._metadatas[row_ids[i]],
+            )
+            for i in best
+        ]
+
+    def retrieve(
+        self, query: str, retrieval_filter: RetrievalFilter = NO_FILTER, top_k: int = 3
+    ) -> List[RetrievedChunk]:
+        return self.search(self.embed(query), retrieval_filter, top_k)
@@ -0,0 +1,191 @@
+"""
+Pre-synthesized audio for fixed and templated agent phrases.
+
+The greeting and the fixed tool confirmations ("I've cleared your cart...")
+are the same words on every call, so they are synthesized once per
+(text, voice, model) and stored on disk as WAV files. A hit is played
+straight from memory as audio frames: the greeting starts at once, with no
+LLM call, and confirmations skip TTS.
+
+Job processes load a cache per TTS voice at prewarm. Phrases that aren't on disk yet
+are synthesized in the background by the first session that needs them,
+using that session's TTS, and every later worker loads them from disk.
+"""
+
+import asyncio
+import hashlib
+import logging
+import wave
+from dataclasses import dataclass
+from pathlib import Path
+from typing import AsyncIterator, Callable, Dict, Iterable, List, Optional, Tuple
+
+from livekit import rtc
+
+from menu_digest import parse_menu
+from doc_metadata import DOC_TYPE_MENU, doc_type_for_file
+
+logger = logging.getLogger("restaurant.phrase_cache")
+
+PROJECT_ROOT = Path(__file__).parent.parent
+DATA_DIR = PROJECT_ROOT / "data" / "company_docs"
+CACHE_DIR = PROJECT_ROOT / "storage" / "phrase_cache"
+
+GREETING = "Welcome to The Pizzeria, Delhi, what would you like to order today?"
+CLEARED_CART = "I've cleared your cart. What would you like to order?"
+BACK_TO_MENU = "Taking you back to the menu now."
+PAYMENT_CANCELLED = "Payment cancelled. Taking you back to the menu."
+REMOVED_ITEM = "Removed {item_name} from your cart."
+
+FIXED_PHRASES = (GREETING, CLEARED_CART, BACK_TO_MENU, PAYMENT_CANCELLED)
+
+_FRAME_MS = 20
+
+# Text -> stream of frames for that text (a TTS, or the local stand-in in tests)
+Synthesizer = Callable[[str], AsyncIterator[rtc.AudioFrame]]
+
+
+def default_phrases(data_dir: Path = DATA_DIR) -> List[str]:
+    """The fixed phrases plus templated ones expanded for every menu item."""
+    phrases = list(FIXED_PHRASES)
+    for path in sorted(p for p in data_dir.iterdir() if p.is_file()):
+        if doc_type_for_file(path.name) == DOC_TYPE_MENU:
+            _, items = parse_menu(path.read_text(encoding="utf-8"))
+            phrases.extend(REMOVED_ITEM.format(item_name=item.name) for item in items)
+    return phrases
+
+
+def tts_synthesizer(tts) -> Synthesizer:
+    """Adapt a livekit.agents TTS (non-streaming synthesize) to a Synthesizer."""
+
+    async def synthesize(text: str) -> AsyncIterator[rtc.AudioFrame]:
+        async with tts.synthesize(text) as stream:
+            async for audio in stream:
+                yield audio.frame
+
+    return synthesize
+
+
+@dataclass
+class CachedPhrase:
+    text: str
+    pcm: bytes
+    sample_rate: int
+    num_channels: int
+
+    def frames(self, frame_ms: int = _FRAME_MS) -> List[rtc.AudioFrame]:
+        samples_per_frame = self.sample_rate * frame_ms // 1000
+        frame_bytes = samples_per_frame * self.num_channels * 2
+        return [
+            rtc.AudioFrame(
+                data=self.pcm[start:start + frame_bytes],
+                sample_rate=self.sample_rate,
+                num_channels=self.num_channels,
+                samples_per_channel=len(self.pcm[start:start + frame_bytes]) // (2 * self.num_channels),
+            )
+            for start in range(0, len(self.pcm), frame_bytes)
+        ]
+
+
+class PhraseCache:
+    """Audio for a set of phrases in one voice of one TTS model, on disk and in memory."""
+
+    def __init__(self, model: str, voice: str, cache_dir: Path = CACHE_DIR) -> None:
+        self.model = model
+        self.voice = voice
+        self.directory = cache_dir
+        self._phrases: Dict[str, CachedPhrase] = {}
+
+    def _path(self, text: str) -> Path:
+        key = hashlib.sha256(f"{self.model}\0{self.voice}\0{text}".encode("utf-8")).hexdigest()
+        return self.directory / f"{key}.wav"
+
+    def __contains__(self, text: str) -> bool:
+        return text in self._phrases
+
+    def __len__(self) -> int:
+        return len(self._phrases)
+
+    def load(self, phrases: Iterable[str]) -> int:
+        """Load whichever of the phrases are on disk; returns how many are cached."""
+        for text in phrases:
+            if text in self._phrases:
+                continue
+            path = self._path(text)
+            if not path.exists():
+                continue
+            try:
+                with wave.open(str(path), "rb") as wav:
+                    self._phrases[text] = CachedPhrase(
+                        text=text,
+                        pcm=wav.readframes(wav.getnframes()),
+                        sample_rate=wav.getframerate(),
+                        num_channels=wav.getnchannels(),
+                    )
+            except (wave.Error, EOFError):
+                logger.warning("ignoring unreadable cached phrase %s", path.name)
+        return len(self._phrases)
+
+    def missing(self, phrases: Iterable[str]) -> List[str]:
+        return [text for text in phrases if text not in self._phrases]
+
+    def _write(self, phrase: CachedPhrase) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self._path(phrase.text)
+        tmp_path = path.with_suffix(".tmp")
+        with wave.open(str(tmp_path), "wb") as wav:
+            wav.setnchannels(phrase.num_channels)
+            wav.setsampwidth(2)
+            wav.setframerate(phrase.sample_rate)
+            wav.writeframes(phrase.pcm)
+        tmp_path.replace(path)
+
+    async def fill(self, phrases: Iterable[str], synthesize: Synthesizer) -> int:
+        """Synthesize and persist the phrases not cached yet, one at a time; returns how many."""
+        filled = 0
+        for text in self.missing(phrases):
+            chunks: List[bytes] = []
+            sample_rate, num_channels = 0, 0
+            try:
+                async for frame in synthesize(text):
+                    chunks.append(bytes(frame.data.cast("B")))
+                    sample_rate, num_channels = frame.sample_rate, frame.num_channels
+            except Exception:
+                logger.warning("could not synthesize phrase %r", text, exc_info=True)
+                continue
+            if not chunks:
+                continue
+            phrase = CachedPhrase(text, b"".join(chunks), sample_rate, num_channels)
+            await asyncio.to_thread(self._write, phrase)
+            self._phrases[text] = phrase
+            filled += 1
+        return filled
+
+    def audio(self, text: str) -> Optional[AsyncIterator[rtc.AudioFrame]]:
+        """Frames for a cached phrase (for session.say(text, audio=...)), or None on a miss."""
+        phrase = self._phrases.get(text)
+        if phrase is None:
+            return None
+        frames = phrase.frames()
+
+        async def stream() -> AsyncIterator[rtc.AudioFrame]:
+            for frame in frames:
+                yield frame
+
+        return stream()
+
+
+# Caches loaded in this process, by (TTS model, voice); filled at prewarm
+_CACHES: Dict[Tuple[str, str], PhraseCache] = {}
+
+
+def load_phrase_cache(model: str, voice: str, cache_dir: Path = CACHE_DIR) -> PhraseCache:
+    cache = PhraseCache(model, voice, cache_dir)
+    cached = cache.load(default_phrases())
+    logger.info("loaded %d cached phrases for %s/%s", cached, model, voice)
+    _CACHES[(model, voice)] = cache
+    return cache
+
+
+def get_phrase_cache(model: str, voice: str) -> Optional[PhraseCache]:
+    return _CACHES.get((model, voice))
@@ -0,0 +1,262 @@
+"""
+On-demand profiling for a live worker process.
+
+Nothing runs until asked, so there is no cost in normal operation. Two modes:
+
+- CPU: a sampling profiler that reads every thread's stack at a fixed
+  interval for a set duration and writes collapsed stacks (one
+  "frame;frame;frame count" line per unique stack), which flamegraph.pl,
+  speedscope and inferno read directly. Each stack is rooted at the sessions
+  that were active when it was sampled.
+- Heap: a tracemalloc diff over a window, plus per-session growth of each
+  RestaurantAssistant's chat context.
+
+Trigger through the admin server (localhost only):
+    curl 'http://127.0.0.1:9464/debug/profile?seconds=30' > agent.collapsed
+    curl 'http://127.0.0.1:9464/debug/heap?seconds=60'
+or with SIGUSR1 (CPU) / SIGUSR2 (heap), which write to PROFILE_DIR
+(default logs/profiles/).
+"""
+
+import json
+import logging
+import os
+import signal
+import sys
+import threading
+import time
+import tracemalloc
+import weakref
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Tuple
+
+from admin_server import register_route
+
+logger = logging.getLogger("restaurant.profiler")
+
+PROJECT_ROOT = Path(__file__).parent.parent
+
+DEFAULT_SECONDS = 30.0
+DEFAULT_INTERVAL = 0.01
+MAX_SECONDS = 300.0
+
+# Agents of the sessions running in this process, by session (job) id
+_SESSIONS: "weakref.WeakValueDictionary[str, object]" = weakref.WeakValueDictionary()
+
+# One profile or heap capture at a time per process
+_CAPTURE_LOCK = threading.Lock()
+
+
+def track_session(session_id: str, agent: object) -> None:
+    """Make a session's agent visible to the profiler (held weakly)."""
+    _SESSIONS[session_id] = agent
+
+
+def untrack_session(session_id: str) -> None:
+    _SESSIONS.pop(session_id, None)
+
+
+def active_sessions() -> Tuple[str, ...]:
+    return tuple(sorted(_SESSIONS.keys()))
+
+
+class ProfilerBusyError(RuntimeError):
+    """Raised when a capture is requested while another one is running."""
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    # ';' separates frames and ' ' separates the count in collapsed stacks
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})".replace(";", ":").replace(" ", "_")
+
+
+def sample_stacks(seconds: float, interval: float = DEFAULT_INTERVAL) -> Counter:
+    """
+    Sample every other thread's stack every `interval` seconds for `seconds`.
+
+    Returns a Counter of collapsed stacks rooted at
+    "sessions[<ids>];<thread name>".
+    """
+    own_id = threading.get_ident()
+    deadline = time.monotonic() + seconds
+    stacks: Counter = Counter()
+    while time.monotonic() < deadline:
+        names = {t.ident: t.name for t in threading.enumerate()}
+        root = f"sessions[{','.join(active_sessions()) or 'idle'}]"
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_id:
+                continue
+            frames = []
+            while frame is not None:
+                frames.append(_frame_label(frame))
+                frame = frame.f_back
+            frames.append(names.get(thread_id, str(thread_id)).replace(";", ":").replace(" ", "_"))
+            frames.append(root.replace(" ", "_"))
+            stacks[";".join(reversed(frames))] += 1
+        time.sleep(interval)
+    return stacks
+
+
+def format_collapsed(stacks: Counter) -> str:
+    return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+def _chat_context_size(agent: object) -> Tuple[int, int]:
+    """(items, approximate bytes of text) in an agent's chat context."""
+    items = list(getattr(agent, "chat_ctx").items)
+    size = 0
+    for item in items:
+        if item.type == "message":
+            size += sum(len(c) if isinstance(c, str) else sys.getsizeof(c) for c in item.content)
+        elif item.type == "function_call":
+            size += len(item.arguments) + len(item.name)
+        elif item.type == "function_call_output":
+            size += len(item.output)
+    return len(items), size
+
+
+def _session_sizes() -> Dict[str, Tuple[int, int]]:
+    sizes = {}
+    for session_id, agent in list(_SESSIONS.items()):
+        try:
+            sizes[session_id] = _chat_context_size(agent)
+        except Exception:
+            logger.debug("could not size chat context of session %s", session_id, exc_info=True)
+    return sizes
+
+
+def heap_snapshot(seconds: float, top: int = 25) -> Dict[str, object]:
+    """
+    Diff allocations over a `seconds` window and report chat-context growth
+    per session.
+
+    tracemalloc is started for the window if it is not already tracing and
+    stopped again afterwards, so its overhead only applies while capturing.
+    """
+    started_here = not tracemalloc.is_tracing()
+    if started_here:
+        tracemalloc.start(10)
+    try:
+        sessions_before = _session_sizes()
+        before = tracemalloc.take_snapshot()
+        time.sleep(seconds)
+        after = tracemalloc.take_snapshot()
+        sessions_after = _session_sizes()
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        if started_here:
+            tracemalloc.stop()
+
+    growth = after.compare_to(before, "lineno")
+    sessions = {}
+    for session_id, (items, size) in sessions_after.items():
+        items_before, size_before = sessions_before.get(session_id, (0, 0))
+        sessions[session_id] = {
+            "chat_items": items,
+            "chat_bytes": size,
+            "chat_items_delta": items - items_before,
+            "chat_bytes_delta": size - size_before,
+        }
+    return {
+        "pid": os.getpid(),
+        "seconds": seconds,
+        "traced_current_bytes": current,
+        "traced_peak_bytes": peak,
+        "sessions": sessions,
+        "top_growth": [
+            {
+                "location": str(stat.traceback[0]),
+                "size_delta_bytes": stat.size_diff,
+                "count_delta": stat.count_diff,
+                "size_bytes": stat.size,
+            }
+            for stat in growth[:top]
+        ],
+    }
+
+
+def profile_cpu(seconds: float = DEFAULT_SECONDS, interval: float = DEFAULT_INTERVAL) -> str:
+    """Run the sampling profiler and return collapsed stacks."""
+    if not _CAPTURE_LOCK.acquire(blocking=False):
+        raise ProfilerBusyError("a profile is already running in this process")
+    try:
+        logger.info("cpu profile started for %.1fs", seconds, extra={"sessions": active_sessions()})
+        return format_collapsed(sample_stacks(seconds, interval))
+    finally:
+        _CAPTURE_LOCK.release()
+
+
+def profile_heap(seconds: float = DEFAULT_SECONDS) -> Dict[str, object]:
+    if not _CAPTURE_LOCK.acquire(blocking=False):
+        raise ProfilerBusyError("a profile is already running in this process")
+    try:
+        logger.info("heap snapshot started for %.1fs", seconds, extra={"sessions": active_sessions()})
+        return heap_snapshot(seconds)
+    finally:
+        _CAPTURE_LOCK.release()
+
+
+def _output_path(kind: str, suffix: str) -> Path:
+    directory = Path(os.getenv("PROFILE_DIR", str(PROJECT_ROOT / "logs" / "profiles")))
+    directory.mkdir(parents=True, exist_ok=True)
+    return directory / f"{kind}-{os.getpid()}-{time.strftime('%Y%m%d-%H%M%S')}.{suffix}"
+
+
+def _seconds_param(params: Dict[str, str]) -> float:
+    return min(MAX_SECONDS, max(0.1, float(params.get("seconds", DEFAULT_SECONDS))))
+
+
+def _profile_route(params: Dict[str, str]) -> Tuple[int, str, bytes]:
+    try:
+        interval = max(0.001, float(params.get("interval", DEFAULT_INTERVAL)))
+        collapsed = profile_cpu(_seconds_param(params), interval)
+    except ProfilerBusyError as e:
+        return 409, "text/plain; charset=utf-8", f"{e}\n".encode()
+    return 200, "text/plain; charset=utf-8", collapsed.encode()
+
+
+def _heap_route(params: Dict[str, str]) -> Tuple[int, str, bytes]:
+    try:
+        report = profile_heap(_seconds_param(params))
+    except ProfilerBusyError as e:
+        return 409, "text/plain; charset=utf-8", f"{e}\n".encode()
+    return 200, "application/json", json.dumps(report, indent=2).encode()
+
+
+register_route("/debug/profile", _profile_route)
+register_route("/debug/heap", _heap_route)
+
+
+def _capture_to_file(kind: str) -> None:
+    seconds = float(os.getenv("PROFILE_SECONDS", DEFAULT_SECONDS))
+    try:
+        if kind == "cpu":
+            path = _output_path("cpu", "collapsed")
+            path.write_text(profile_cpu(seconds), encoding="utf-8")
+        else:
+            path = _output_path("heap", "json")
+            path.write_text(json.dumps(profile_heap(seconds), indent=2), encoding="utf-8")
+    except ProfilerBusyError as e:
+        logger.warning("%s", e)
+        return
+    logger.info("%s profile written to %s", kind, path)
+
+
+def _on_signal(signum, frame) -> None:
+    # Runs on the main thread between bytecodes: hand off immediately
+    kind = "cpu" if signum == signal.SIGUSR1 else "heap"
+    threading.Thread(target=_capture_to_file, args=(kind,), name=f"profiler-{kind}", daemon=True).start()
+
+
+def install_signal_handlers() -> bool:
+    """SIGUSR1 starts a CPU profile, SIGUSR2 a heap snapshot. Main thread, POSIX only."""
+    if not hasattr(signal, "SIGUSR1"):
+        return False
+    try:
+        signal.signal(signal.SIGUSR1, _on_signal)
+        signal.signal(signal.SIGUSR2, _on_signal)
+    except ValueError:
+        # Not on the main thread of the process
+        return False
+    return True
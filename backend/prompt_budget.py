@@ -0,0 +1,211 @@
+"""
+Prompt token accounting and per-turn budget enforcement.
+
+Each LLM request is made of four components:
+
+- instructions: the system prompt (RestaurantAssistant's instructions)
+- tools: the JSON schemas of the function tools
+- rag_context: menu/rules context injected by on_user_turn_completed
+- history: everything else in the conversation
+
+Counts use the cl100k tokenizer bundled with llama_index, so they work
+offline; they approximate the served model's tokenizer closely enough for
+budgeting. When a request is over budget, components are trimmed
+lowest-priority first:
+
+1. RAG context injected on earlier turns (the current turn's is kept)
+2. the oldest history, keeping the last few items and never splitting a
+   tool call from its output
+3. the lowest-ranked chunks of the current turn's RAG context
+
+Instructions and tool schemas are never trimmed.
+"""
+
+import json
+import logging
+import os
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Dict, List, Sequence, Set, Tuple
+
+from livekit.agents import llm
+from livekit.agents.llm import ChatContext, ChatMessage
+from livekit.agents.llm.utils import build_legacy_openai_schema
+
+logger = logging.getLogger("restaurant.prompt_budget")
+
+# Tag on the ChatMessage.extra of injected RAG context
+RAG_CONTEXT_EXTRA = "rag_context"
+
+DEFAULT_TOKEN_BUDGET = 3000
+# History items kept even when over budget, so the model still sees the last exchange
+MIN_HISTORY_ITEMS = 4
+# Per-message framing tokens (role, separators) added by chat templates
+_MESSAGE_OVERHEAD = 4
+
+COMPONENTS = ("instructions", "tools", "rag_context", "history")
+
+
+def token_budget() -> int:
+    return int(os.getenv("PROMPT_TOKEN_BUDGET", DEFAULT_TOKEN_BUDGET))
+
+
+@lru_cache(maxsize=1)
+def _tokenizer():
+    # Imported on first use: llama_index is slow to import and only its tokenizer is needed here
+    from llama_index.core.utils import get_tokenizer
+
+    return get_tokenizer()
+
+
+# History repeats every turn, so most texts have been counted before
+@lru_cache(maxsize=4096)
+def count_tokens(text: str) -> int:
+    return len(_tokenizer()(text)) if text else 0
+
+
+@dataclass
+class PromptUsage:
+    instructions: int = 0
+    tools: int = 0
+    rag_context: int = 0
+    history: int = 0
+    # Trim actions applied to fit the budget, in order
+    trimmed: List[str] = field(default_factory=list)
+
+    @property
+    def total(self) -> int:
+        return self.instructions + self.tools + self.rag_context + self.history
+
+    def by_component(self) -> Dict[str, int]:
+        return {name: getattr(self, name) for name in COMPONENTS}
+
+
+def tool_tokens(tools: Sequence[llm.Tool]) -> int:
+    total = 0
+    for tool in tools:
+        if isinstance(tool, llm.FunctionTool):
+            schema = build_legacy_openai_schema(tool)
+        elif isinstance(tool, llm.RawFunctionTool):
+            schema = tool.info.raw_schema
+        else:
+            continue
+        total += count_tokens(json.dumps(schema, sort_keys=True))
+    return total
+
+
+def item_tokens(item: llm.ChatItem) -> int:
+    if item.type == "message":
+        return count_tokens(item.text_content or "") + _MESSAGE_OVERHEAD
+    if item.type == "function_call":
+        return count_tokens(item.name) + count_tokens(item.arguments) + _MESSAGE_OVERHEAD
+    if item.type == "function_call_output":
+        return count_tokens(item.output) + _MESSAGE_OVERHEAD
+    # Handoffs and config updates are not sent to the model
+    return 0
+
+
+def _is_instructions(item: llm.ChatItem) -> bool:
+    return item.type == "message" and item.role in ("system", "developer")
+
+
+def _is_rag_context(item: llm.ChatItem) -> bool:
+    return item.type == "message" and bool(item.extra.get(RAG_CONTEXT_EXTRA))
+
+
+def measure(chat_ctx: ChatContext, tools: Sequence[llm.Tool]) -> PromptUsage:
+    usage = PromptUsage(tools=tool_tokens(tools))
+    for item in chat_ctx.items:
+        tokens = item_tokens(item)
+        if _is_instructions(item):
+            usage.instructions += tokens
+        elif _is_rag_context(item):
+            usage.rag_context += tokens
+        else:
+            usage.history += tokens
+    return usage
+
+
+def _call_ids(item: llm.ChatItem) -> Set[str]:
+    call_id = getattr(item, "call_id", None)
+    return {call_id} if item.type in ("function_call", "function_call_output") and call_id else set()
+
+
+def _truncate_rag_message(message: ChatMessage, max_tokens: int) -> ChatMessage:
+    """Drop trailing (lowest-ranked) chunks until the message fits in max_tokens."""
+    header, _, body = (message.text_content or "").partition("\n")
+    chunks = body.split("\n\n")
+    while len(chunks) > 1 and count_tokens(header + "\n" + "\n\n".join(chunks)) + _MESSAGE_OVERHEAD > max_tokens:
+        chunks.pop()
+    return message.model_copy(update={"content": [header + "\n" + "\n\n".join(chunks)]})
+
+
+def enforce_budget(
+    chat_ctx: ChatContext,
+    tools: Sequence[llm.Tool],
+    budget: int,
+    min_history_items: int = MIN_HISTORY_ITEMS,
+) -> Tuple[ChatContext, PromptUsage]:
+    """
+    Return a chat context that fits in `budget` tokens (if trimming allows) and
+    the usage after trimming. The input context and its items are not modified.
+    """
+    usage = measure(chat_ctx, tools)
+    if usage.total <= budget:
+        return chat_ctx, usage
+
+    items = list(chat_ctx.items)
+    tokens = {item.id: item_tokens(item) for item in items}
+    total = usage.total
+    trimmed: List[str] = []
+
+    def drop(victims: Sequence[llm.ChatItem], action: str) -> None:
+        nonlocal total, items
+        ids = {v.id for v in victims}
+        total -= sum(tokens[i] for i in ids)
+        items = [item for item in items if item.id not in ids]
+        trimmed.append(action)
+
+    # 1. RAG context from earlier turns
+    rag_messages = [item for item in items if _is_rag_context(item)]
+    for stale in rag_messages[:-1]:
+        if total <= budget:
+            break
+        drop([stale], "stale_rag_context")
+
+    # 2. Oldest history, keeping tool calls together with their outputs
+    while total > budget:
+        history = [item for item in items if not _is_instructions(item) and not _is_rag_context(item)]
+        if len(history) <= min_history_items:
+            break
+        oldest = history[0]
+        call_ids = _call_ids(oldest)
+        group = [oldest] + [item for item in history[1:] if call_ids & _call_ids(item)]
+        if len(history) - len(group) < min_history_items:
+            break
+        drop(group, "history")
+
+    # 3. Lowest-ranked chunks of the current RAG context
+    current_rag = [item for item in items if _is_rag_context(item)]
+    if total > budget and current_rag:
+        message = current_rag[-1]
+        allowance = max(0, tokens[message.id] - (total - budget))
+        shortened = _truncate_rag_message(message, allowance)
+        new_tokens = item_tokens(shortened)
+        if new_tokens < tokens[message.id]:
+            items = [shortened if item.id == message.id else item for item in items]
+            total -= tokens[message.id] - new_tokens
+            tokens[message.id] = new_tokens
+            trimmed.append("rag_chunks")
+
+    trimmed_ctx = ChatContext(items)
+    trimmed_usage = measure(trimmed_ctx, tools)
+    trimmed_usage.trimmed = trimmed
+    if trimmed_usage.total > budget:
+        logger.warning(
+            "prompt is %d tokens after trimming, over the %d budget",
+            trimmed_usage.total,
+            budget,
+            extra={"components": trimmed_usage.by_component()},
+        )
+    return trimmed_ctx, trimmed_usage
@@ -0,0 +1,230 @@
+"""
+Per-process pool of pre-connected STT/LLM/TTS providers.
+
+Provider plugins connect lazily: the TTS websocket and the LLM's TLS
+connection are opened on first use, so without warming, the first turn's
+handshakes land on the caller. The pool keeps up to PROVIDER_POOL_SIZE
+provider sets per latency profile with their connections already opened
+(the plugins' public prewarm()), and a session checks one out as soon as
+its job is accepted, before the caller joins:
+
+- prewarm: the pool is filled for every profile before the first job.
+  prewarm runs before the job process's event loop starts, and the
+  plugins connect on that loop, so these sets are built but not connected
+  until checkout
+- checkout: a pooled set if one is ready, else a set built and warmed on
+  the spot. A replacement is warmed in the background only while the
+  process can take another session (PROCESS_MAX_SESSIONS, default 1: a
+  livekit job process runs one job), so a busy process doesn't hold
+  connections no session will use
+- idle eviction: a pooled set is closed after PROVIDER_POOL_MAX_IDLE
+  seconds, before the providers drop idle connections themselves (the
+  gateway TTS reconnects after 300 s)
+- failures: a set that can't be built is logged and not pooled; checkout
+  builds one directly, so an outage costs warmth, never the session.
+  Refills wait PROVIDER_POOL_RETRY seconds after a failure
+
+A checked-out set belongs to its session, which releases (closes) it at
+shutdown.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable, Deque, Dict, Optional, Set
+
+from latency_profiles import SessionProfile
+from llm_http import GROQ_BASE_URL, shared_llm_client
+from telemetry import count_provider_checkout
+
+logger = logging.getLogger("restaurant.provider_pool")
+
+
+@dataclass
+class Providers:
+    stt: object
+    llm: object
+    tts: object
+    # When the connections were opened (None: built but not connected yet)
+    warmed_at: Optional[float] = None
+
+    def warm(self) -> None:
+        """Start opening every provider's connection (non-blocking)."""
+        for component in (self.stt, self.llm, self.tts):
+            component.prewarm()
+        self.warmed_at = time.monotonic()
+
+    async def aclose(self) -> None:
+        for component in (self.stt, self.llm, self.tts):
+            try:
+                await component.aclose()
+            except Exception:
+                logger.warning("error closing %s", type(component).__name__, exc_info=True)
+
+
+def create_providers(profile: SessionProfile) -> Providers:
+    """The profile's STT, LLM and TTS, unconnected."""
+    # Imported here so the pool can be exercised without the provider plugins
+    from livekit.agents import inference
+    from livekit.plugins import groq
+
+    from hedged_llm import HedgedLLM, hedge_deadline
+
+    # Every session's LLM in this process shares one pooled HTTP client (see llm_http.py)
+    client = shared_llm_client(profile.llm.get("base_url", GROQ_BASE_URL))
+    session_llm = groq.LLM(**profile.llm, client=client)
+    if profile.hedge:
+        # A faster model raced against the primary when it's slow to start (see hedged_llm.py)
+        fallback_settings = {k: v for k, v in profile.hedge.items() if k != "deadline"}
+        fallback_client = shared_llm_client(fallback_settings.get("base_url", GROQ_BASE_URL))
+        session_llm = HedgedLLM(
+            session_llm,
+            groq.LLM(**fallback_settings, client=fallback_client),
+            deadline=hedge_deadline(profile.hedge),
+        )
+    return Providers(
+        stt=inference.STT(**profile.stt),
+        llm=session_llm,
+        tts=inference.TTS(**profile.tts),
+    )
+
+
+class ProviderPool:
+    def __init__(
+        self,
+        size: int = 1,
+        max_idle: float = 240.0,
+        retry_after: float = 30.0,
+        max_sessions: int = 1,
+        factory: Callable[[SessionProfile], Providers] = create_providers,
+    ) -> None:
+        self.size = size
+        self.max_idle = max_idle
+        self.retry_after = retry_after
+        self.max_sessions = max_sessions
+        self._factory = factory
+        # Sets checked out and not yet released by their sessions
+        self._in_use = 0
+        self._idle: Dict[str, Deque[Providers]] = {}
+        self._failed_at: Dict[str, float] = {}
+        self._tasks: Set[asyncio.Task] = set()
+
+    def idle_count(self, profile: SessionProfile) -> int:
+        return len(self._idle.get(profile.name, ()))
+
+    def _build(self, profile: SessionProfile, connect: bool = True) -> Optional[Providers]:
+        try:
+            providers = self._factory(profile)
+            if connect:
+                providers.warm()
+        except Exception:
+            self._failed_at[profile.name] = time.monotonic()
+            logger.warning("could not pre-connect providers for profile %s", profile.name, exc_info=True)
+            return None
+        self._failed_at.pop(profile.name, None)
+        return providers
+
+    def _close_later(self, providers: Providers) -> None:
+        task = asyncio.get_running_loop().create_task(providers.aclose())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def evict_idle(self) -> int:
+        """Close pooled sets idle longer than max_idle; returns how many."""
+        now = time.monotonic()
+        evicted = 0
+        for idle in self._idle.values():
+            # Sets built before the event loop hold no connections yet
+            stale = [p for p in idle if p.warmed_at is not None and now - p.warmed_at > self.max_idle]
+            for providers in stale:
+                idle.remove(providers)
+                self._close_later(providers)
+                evicted += 1
+        return evicted
+
+    def fill(self, profile: SessionProfile) -> int:
+        """
+        Warm sets for the profile up to the pool size; returns how many were added.
+
+        Without a running event loop (prewarm) the sets are only built:
+        checkout connects them.
+        """
+        failed_at = self._failed_at.get(profile.name)
+        if failed_at is not None and time.monotonic() - failed_at < self.retry_after:
+            return 0
+        try:
+            asyncio.get_running_loop()
+            connect = True
+        except RuntimeError:
+            connect = False
+        idle = self._idle.setdefault(profile.name, deque())
+        added = 0
+        while len(idle) < self.size:
+            providers = self._build(profile, connect)
+            if providers is None:
+                break
+            idle.append(providers)
+            if connect:
+                self._schedule_eviction()
+            added += 1
+        return added
+
+    def _schedule_eviction(self) -> None:
+        # Slightly after max_idle, so the set is past it when the timer fires
+        asyncio.get_running_loop().call_later(self.max_idle + 0.01, self.evict_idle)
+
+    def checkout(self, profile: SessionProfile) -> Providers:
+        """
+        Pre-connected providers for a new session; release() them when it ends.
+
+        Refills the pool in the background while the process can take
+        another session.
+        """
+        self.evict_idle()
+        idle = self._idle.get(profile.name)
+        providers = idle.popleft() if idle else None
+        warm = providers is not None and providers.warmed_at is not None
+        if providers is None:
+            # Build and warm now: connections still open before the caller joins
+            providers = self._build(profile) or self._factory(profile)
+        elif not warm:
+            # Built in prewarm, before this process's event loop: connect now
+            try:
+                providers.warm()
+            except Exception:
+                logger.warning("could not pre-connect providers for profile %s", profile.name, exc_info=True)
+        count_provider_checkout(profile.name, warm)
+        self._in_use += 1
+        if self.size > 0 and self._in_use < self.max_sessions:
+            asyncio.get_running_loop().call_soon(self.fill, profile)
+        return providers
+
+    async def release(self, providers: Providers) -> None:
+        """Close a checked-out set when its session ends."""
+        self._in_use -= 1
+        await providers.aclose()
+
+    async def aclose(self) -> None:
+        for idle in self._idle.values():
+            while idle:
+                self._close_later(idle.popleft())
+        if self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+
+
+_POOL: Optional[ProviderPool] = None
+
+
+def get_provider_pool() -> ProviderPool:
+    global _POOL
+    if _POOL is None:
+        _POOL = ProviderPool(
+            size=int(os.getenv("PROVIDER_POOL_SIZE", "1")),
+            max_idle=float(os.getenv("PROVIDER_POOL_MAX_IDLE", "240")),
+            retry_after=float(os.getenv("PROVIDER_POOL_RETRY", "30")),
+            max_sessions=int(os.getenv("PROCESS_MAX_SESSIONS", "1")),
+        )
+    return _POOL
@@ -1,26 +1,50 @@
 import os
+import shutil
+import threading
 from pathlib import Path
-from typing import Optional
-
-from llama_index.core import (
-    VectorStoreIndex,
-    SimpleDirectoryReader,
-    StorageContext,
-    load_index_from_storage,
-    Settings,
+from typing import TYPE_CHECKING, List, Optional
+
+# llama_index (and, through the embeddings, torch) is imported by the functions
+# that use it: importing this module stays cheap, and the index thread pays for
+# it in the background (see start_index_build)
+if TYPE_CHECKING:
+    from llama_index.core import VectorStoreIndex
+    from llama_index.core.schema import TextNode
+
+from doc_metadata import chunk_document
+from index_manifest import (
+    EMBED_MODEL_NAME,
+    IndexCompatibilityError,
+    expected_manifest,
+    find_incompatibility,
+    validate_manifest,
+    write_manifest,
 )
+from lexical_index import LexicalIndex
+from partitioned_retriever import PartitionedRetriever
+from startup_profile import startup_step
 
 # Constants
 PROJECT_ROOT = Path(__file__).parent.parent
 STORAGE_DIR = PROJECT_ROOT / "storage" / "restaurant_index"
 DATA_DIR = PROJECT_ROOT / "data" / "company_docs"
 
+# Process-wide index state. The vector index is loaded (or built on a miss) by a
+# single background thread; callers that can't wait use the lexical fallback.
+_INDEX: Optional["VectorStoreIndex"] = None
+_INDEX_LOCK = threading.Lock()
+_BUILD_THREAD: Optional[threading.Thread] = None
+_RETRIEVER: Optional[PartitionedRetriever] = None
+_LEXICAL_FALLBACK: Optional[LexicalIndex] = None
+
 def init_settings():
+    from llama_index.core import Settings
+
     # 1. Embeddings
     try:
         from llama_index.embeddings.huggingface import HuggingFaceEmbedding
         Settings.embed_model = HuggingFaceEmbedding(
-            model_name="BAAI/bge-small-en-v1.5"
+            model_name=EMBED_MODEL_NAME
         )
     except ImportError as e:
         print(f"CRITICAL: Failed to load HuggingFace embeddings: {e}")
@@ -33,33 +57,183 @@ def init_settings():
     # Explicitly disable OpenAI default to prevent API key errors during initialization
     Settings.llm = None 
 
-def get_index() -> Optional[VectorStoreIndex]:
+def build_nodes(documents) -> List["TextNode"]:
     """
-    Loads the index from disk. Unlike the ingest script, this function responsible 
-    for providing the index object to consumers (Agent or Tests).
+    Splits the docs into item/section chunks tagged with doc_type, category and
+    dietary labels (see doc_metadata), which the partitioned retriever filters on.
     """
-    init_settings()  # Ensure configured before loading
-    if not STORAGE_DIR.exists():
-        # If storage doesn't exist, we could try to build it, or just return None.
-        # For a robust production app, we might expect the build step to have happened.
-        # But if we want to follow the user's 'rag_engine' pattern which auto-builds:
-        if DATA_DIR.exists():
-            print("Storage not found. Attempting to build index from data...")
-            documents = SimpleDirectoryReader(str(DATA_DIR)).load_data()
-            if not documents:
-                return None
-            
-            index = VectorStoreIndex.from_documents(documents)
-            # Ensure parent storage dir exists
-            STORAGE_DIR.mkdir(parents=True, exist_ok=True)
-            index.storage_context.persist(persist_dir=str(STORAGE_DIR))
-            return index
+    from llama_index.core.schema import TextNode
+
+    nodes = []
+    for document in documents:
+        file_name = document.metadata.get("file_name", "")
+        for text, metadata in chunk_document(document.text, file_name):
+            nodes.append(TextNode(text=text, metadata=metadata))
+    return nodes
+
+def build_index() -> Optional["VectorStoreIndex"]:
+    """
+    Builds the index from the raw docs and persists it with its manifest.
+
+    The index is written to a private temp directory and moved into place, so a
+    reader (or another worker process building at the same time) never sees a
+    half-written STORAGE_DIR. An existing, stale index is replaced.
+    """
+    from llama_index.core import Settings, SimpleDirectoryReader, VectorStoreIndex
+
+    init_settings()
+    documents = SimpleDirectoryReader(str(DATA_DIR)).load_data()
+    if not documents:
         return None
 
+    manifest = expected_manifest(DATA_DIR)
+    embed_dim = len(Settings.embed_model.get_text_embedding("dimension probe"))
+    if embed_dim != manifest.embed_dim:
+        raise IndexCompatibilityError(
+            f"{manifest.embed_model} produced {embed_dim}-dim embeddings, expected {manifest.embed_dim}"
+        )
+
+    index = VectorStoreIndex(build_nodes(documents))
+    # Ensure parent storage dir exists
+    STORAGE_DIR.parent.mkdir(parents=True, exist_ok=True)
+    tmp_dir = STORAGE_DIR.with_name(f"{STORAGE_DIR.name}.tmp-{os.getpid()}")
+    index.storage_context.persist(persist_dir=str(tmp_dir))
+    write_manifest(tmp_dir, manifest)
+
+    if STORAGE_DIR.exists() and find_incompatibility(STORAGE_DIR, manifest) is not None:
+        stale_dir = STORAGE_DIR.with_name(f"{STORAGE_DIR.name}.stale-{os.getpid()}")
+        os.replace(STORAGE_DIR, stale_dir)
+        shutil.rmtree(stale_dir, ignore_errors=True)
     try:
+        os.replace(tmp_dir, STORAGE_DIR)
+    except OSError:
+        # Another process finished first; its copy is equivalent to ours
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    return index
+
+def index_staleness() -> Optional[str]:
+    """Returns why the persisted index needs rebuilding, or None if it is current."""
+    if not STORAGE_DIR.exists():
+        return f"no index at {STORAGE_DIR}"
+    return find_incompatibility(STORAGE_DIR, expected_manifest(DATA_DIR, STORAGE_DIR))
+
+def load_index() -> Optional["VectorStoreIndex"]:
+    """
+    Loads the persisted index, or returns None if there isn't one.
+
+    The manifest is checked before anything else is read, so an index built with
+    a different embedding model, chunker or corpus raises IndexCompatibilityError
+    straight away instead of failing inside llama_index or retrieving garbage.
+    """
+    if not STORAGE_DIR.exists():
+        return None
+    validate_manifest(STORAGE_DIR, expected_manifest(DATA_DIR, STORAGE_DIR))
+
+    from llama_index.core import StorageContext, load_index_from_storage
+
+    init_settings()  # Ensure configured before loading
+    storage_context = StorageContext.from_defaults(persist_dir=str(STORAGE_DIR))
+    return load_index_from_storage(storage_context=storage_context)
+
+def _load_or_build_index() -> Optional["VectorStoreIndex"]:
+    if not DATA_DIR.exists():
+        from llama_index.core import StorageContext, load_index_from_storage
+
+        # Nothing to validate or rebuild against; use whatever was shipped
+        init_settings()
+        if not STORAGE_DIR.exists():
+            return None
         storage_context = StorageContext.from_defaults(persist_dir=str(STORAGE_DIR))
-        index = load_index_from_storage(storage_context=storage_context)
-        return index
+        return load_index_from_storage(storage_context=storage_context)
+
+    try:
+        index = load_index()
+    except IndexCompatibilityError as e:
+        print(f"Index at {STORAGE_DIR} is out of date ({e}). Rebuilding...")
+        return build_index()
     except Exception as e:
         print(f"Error loading index: {e}")
         return None
+
+    if index is None:
+        print("Storage not found. Attempting to build index from data...")
+        return build_index()
+    return index
+
+def _build_retriever(index: "VectorStoreIndex") -> Optional[PartitionedRetriever]:
+    from llama_index.core import Settings
+
+    try:
+        return PartitionedRetriever.from_index(
+            index, embed_query=Settings.embed_model.get_query_embedding
+        )
+    except ValueError as e:
+        print(f"Partitioned retrieval unavailable, using plain retriever: {e}")
+        return None
+
+def _index_worker() -> None:
+    global _INDEX, _RETRIEVER
+    try:
+        with startup_step("index_load"):
+            index = _load_or_build_index()
+            retriever = _build_retriever(index) if index is not None else None
+    except Exception as e:
+        print(f"Error building index: {e}")
+        index, retriever = None, None
+    with _INDEX_LOCK:
+        _RETRIEVER = retriever
+        _INDEX = index
+
+def start_index_build(retry_failed: bool = True) -> Optional[threading.Thread]:
+    """
+    Starts loading (or building) the index in the background, single-flight.
+
+    Returns the thread doing the work, or None if the index is already loaded.
+    Concurrent callers get the same thread instead of starting a duplicate build.
+    With retry_failed=False, a previous attempt that finished without an index
+    is not retried, so hot-path callers don't kick off a build on every turn.
+    """
+    global _BUILD_THREAD
+    with _INDEX_LOCK:
+        if _INDEX is not None:
+            return None
+        if _BUILD_THREAD is not None and (_BUILD_THREAD.is_alive() or not retry_failed):
+            return _BUILD_THREAD
+        _BUILD_THREAD = threading.Thread(
+            target=_index_worker, name="rag-index-build", daemon=True
+        )
+        _BUILD_THREAD.start()
+        return _BUILD_THREAD
+
+def is_index_ready() -> bool:
+    return _INDEX is not None
+
+def get_index(block: bool = True) -> Optional["VectorStoreIndex"]:
+    """
+    Loads the index from disk. Unlike the ingest script, this function responsible 
+    for providing the index object to consumers (Agent or Tests).
+
+    With block=False the call never waits: it returns None while the index is
+    still loading or building in the background (see get_lexical_fallback).
+    """
+    thread = start_index_build(retry_failed=block)
+    if thread is not None and block:
+        thread.join()
+    return _INDEX
+
+def get_retriever(block: bool = True) -> Optional[PartitionedRetriever]:
+    """
+    The metadata-partitioned retriever over the loaded index.
+
+    None while the index is still loading, or if the vector store doesn't
+    expose its embeddings (callers then fall back to index.as_retriever()).
+    """
+    get_index(block=block)
+    return _RETRIEVER
+
+def get_lexical_fallback() -> Optional[LexicalIndex]:
+    """Keyword-only index over the raw docs, for use until the vector index is ready."""
+    global _LEXICAL_FALLBACK
+    if _LEXICAL_FALLBACK is None:
+        _LEXICAL_FALLBACK = LexicalIndex.from_directory(DATA_DIR)
+    return _LEXICAL_FALLBACK
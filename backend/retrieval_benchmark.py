@@ -0,0 +1,257 @@
+"""
+Offline retrieval quality and latency benchmark over the real restaurant docs.
+
+Asks the golden set of caller questions (benchmarks/retrieval_golden.json)
+against the persisted index and reports:
+
+- quality: recall@1/3/5 and MRR, overall and per doc type, for the filter
+  the agent infers from each question (widened to the whole index when it
+  finds nothing, as search_menu does) and for unfiltered search
+- latency: index load (embedding model + vector store + partition matrix),
+  the first (cold) query, and warm embed / search / total p50/p95
+
+Each golden question lists the sections that answer it as a doc type and a
+marker substring; a retrieved chunk is relevant when both match. Recall@k is
+the fraction of a question's sections found in the top k, averaged over
+questions; MRR uses the rank of the first relevant chunk.
+
+Usage:
+    python backend/retrieval_benchmark.py                    # run and compare
+    python backend/retrieval_benchmark.py --save-baseline    # run and store as the new baseline
+"""
+
+import argparse
+import json
+import sys
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Sequence, Tuple
+
+from retrieval_filters import NO_FILTER, infer_retrieval_filter
+from simulation.latency import LatencyRecorder, LatencySummary, compare_to_baseline, format_summary
+
+PROJECT_ROOT = Path(__file__).parent.parent
+DEFAULT_GOLDEN = PROJECT_ROOT / "benchmarks" / "retrieval_golden.json"
+DEFAULT_BASELINE = PROJECT_ROOT / "benchmarks" / "retrieval_baseline.json"
+
+KS = (1, 3, 5)
+MODE_INFERRED = "inferred"
+MODE_UNFILTERED = "unfiltered"
+MODES = (MODE_INFERRED, MODE_UNFILTERED)
+
+# Single-sample stages: compared against the baseline with their own tolerance
+_COLD_STAGES = ("index_load", "cold_query")
+
+# Quality shape: {mode: {"recall@1": r, ..., "mrr": m, "by_doc_type": {doc_type: {...}}}}
+QualityReport = Dict[str, Dict]
+
+
+@dataclass(frozen=True)
+class GoldenQuery:
+    question: str
+    # (doc_type, marker) of every section that answers the question
+    relevant: Tuple[Tuple[str, str], ...]
+
+    @property
+    def doc_types(self) -> Tuple[str, ...]:
+        return tuple(sorted({doc_type for doc_type, _ in self.relevant}))
+
+
+def load_golden(path: Path = DEFAULT_GOLDEN) -> List[GoldenQuery]:
+    data = json.loads(path.read_text(encoding="utf-8"))
+    return [
+        GoldenQuery(
+            question=entry["question"],
+            relevant=tuple((r["doc_type"], r["contains"]) for r in entry["relevant"]),
+        )
+        for entry in data["queries"]
+    ]
+
+
+def matched_section(query: GoldenQuery, text: str, metadata: Dict[str, str]) -> int:
+    """Index of the golden section a retrieved chunk belongs to, or -1."""
+    for i, (doc_type, marker) in enumerate(query.relevant):
+        if metadata.get("doc_type") == doc_type and marker in text:
+            return i
+    return -1
+
+
+def search(retriever, query: GoldenQuery, mode: str, top_k: int, query_embedding=None):
+    """The chunks the agent would see for the question in the given mode."""
+    if query_embedding is None:
+        query_embedding = retriever.embed(query.question)
+    if mode == MODE_UNFILTERED:
+        return retriever.search(query_embedding, NO_FILTER, top_k=top_k)
+    retrieval_filter = infer_retrieval_filter(query.question)
+    chunks = retriever.search(query_embedding, retrieval_filter, top_k=top_k)
+    if not chunks and not retrieval_filter.is_empty:
+        chunks = retriever.search(query_embedding, NO_FILTER, top_k=top_k)
+    return chunks
+
+
+def score_ranking(query: GoldenQuery, chunks: Sequence, ks: Sequence[int] = KS) -> Dict[str, float]:
+    """recall@k for each k and the reciprocal rank of one question's ranked chunks."""
+    sections = [matched_section(query, c.text, c.metadata) for c in chunks]
+    scores = {}
+    for k in ks:
+        found = {s for s in sections[:k] if s >= 0}
+        scores[f"recall@{k}"] = len(found) / len(query.relevant)
+    first = next((rank for rank, s in enumerate(sections, start=1) if s >= 0), None)
+    scores["mrr"] = 1.0 / first if first else 0.0
+    return scores
+
+
+def _mean(rows: List[Dict[str, float]]) -> Dict[str, float]:
+    return {key: sum(row[key] for row in rows) / len(rows) for key in rows[0]}
+
+
+def evaluate(retriever, golden: Sequence[GoldenQuery], ks: Sequence[int] = KS) -> Tuple[QualityReport, List[str]]:
+    """
+    Quality per mode, plus one line per question that found nothing relevant
+    in the top max(ks) with the agent's filter.
+    """
+    report: QualityReport = {}
+    misses = []
+    embeddings = [retriever.embed(q.question) for q in golden]
+    for mode in MODES:
+        rows = []
+        by_doc_type: Dict[str, List[Dict[str, float]]] = defaultdict(list)
+        for query, embedding in zip(golden, embeddings):
+            chunks = search(retriever, query, mode, max(ks), query_embedding=embedding)
+            row = score_ranking(query, chunks, ks)
+            rows.append(row)
+            for doc_type in query.doc_types:
+                by_doc_type[doc_type].append(row)
+            if mode == MODE_INFERRED and row["mrr"] == 0.0:
+                top = chunks[0].text.splitlines()[0] if chunks else "nothing"
+                misses.append(f"{query.question!r} -> {top!r}")
+        report[mode] = _mean(rows)
+        report[mode]["by_doc_type"] = {doc_type: _mean(r) for doc_type, r in sorted(by_doc_type.items())}
+    return report, misses
+
+
+def measure_latency(golden: Sequence[GoldenQuery], iterations: int = 5):
+    """
+    Load the index from disk and time it, then time the questions.
+
+    Run in a fresh process: index_load includes loading the embedding model
+    and cold_query the first embedding, neither of which repeats.
+    """
+    import rag_engine
+
+    reason = rag_engine.index_staleness()
+    if reason is not None:
+        print(f"Building the index first ({reason})...")
+        rag_engine.build_index()
+
+    recorder = LatencyRecorder()
+    with recorder.measure("index_load"):
+        index = rag_engine.load_index()
+        retriever = rag_engine._build_retriever(index) if index is not None else None
+    if retriever is None:
+        raise SystemExit("The index could not be loaded; run python backend/ingest.py first.")
+
+    with recorder.measure("cold_query"):
+        search(retriever, golden[0], MODE_INFERRED, top_k=3)
+
+    for _ in range(iterations):
+        for query in golden:
+            started = time.perf_counter()
+            with recorder.measure("embed"):
+                embedding = retriever.embed(query.question)
+            with recorder.measure("search"):
+                search(retriever, query, MODE_INFERRED, top_k=3, query_embedding=embedding)
+            recorder.record("query_total", time.perf_counter() - started)
+    return retriever, recorder.summary()
+
+
+def format_quality(report: QualityReport, ks: Sequence[int] = KS) -> str:
+    metrics = [f"recall@{k}" for k in ks] + ["mrr"]
+    lines = [f"{'mode':<24}" + "".join(f" {m:>9}" for m in metrics)]
+    for mode, stats in report.items():
+        lines.append(f"{mode:<24}" + "".join(f" {stats[m]:>9.3f}" for m in metrics))
+        for doc_type, row in stats["by_doc_type"].items():
+            lines.append(f"{'  ' + doc_type:<24}" + "".join(f" {row[m]:>9.3f}" for m in metrics))
+    return "\n".join(lines)
+
+
+def compare_quality(report: QualityReport, baseline: QualityReport, tolerance: float = 0.02) -> List[str]:
+    """Overall metrics that dropped by more than `tolerance` (absolute) since the baseline."""
+    regressions = []
+    for mode, stats in report.items():
+        before = baseline.get(mode, {})
+        for metric, after in stats.items():
+            if metric == "by_doc_type" or metric not in before:
+                continue
+            if before[metric] - after > tolerance:
+                regressions.append(f"{mode} {metric}: {before[metric]:.3f} -> {after:.3f}")
+    return regressions
+
+
+def compare_latency(
+    summary: LatencySummary, baseline: LatencySummary, tolerance: float = 0.25, cold_tolerance: float = 0.5
+) -> List[str]:
+    warm = {stage: stats for stage, stats in summary.items() if stage not in _COLD_STAGES}
+    cold = {stage: stats for stage, stats in summary.items() if stage in _COLD_STAGES}
+    return compare_to_baseline(warm, baseline, tolerance=tolerance) + compare_to_baseline(
+        cold, baseline, tolerance=cold_tolerance, min_delta=0.05, metrics=("p50",)
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--golden", type=Path, default=DEFAULT_GOLDEN, help="Golden question set.")
+    parser.add_argument("--iterations", type=int, default=5, help="Times to ask each question for warm latency.")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE, help="Baseline JSON file.")
+    parser.add_argument("--save-baseline", action="store_true", help="Overwrite the baseline with this run.")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed fractional slowdown (warm).")
+    parser.add_argument(
+        "--cold-tolerance", type=float, default=0.5, help="Allowed fractional slowdown of index load and cold query."
+    )
+    parser.add_argument(
+        "--quality-tolerance", type=float, default=0.02, help="Allowed absolute drop in recall@k or MRR."
+    )
+    args = parser.parse_args()
+
+    golden = load_golden(args.golden)
+    retriever, latency = measure_latency(golden, iterations=args.iterations)
+    quality, misses = evaluate(retriever, golden)
+
+    print(f"Retrieval quality ({len(golden)} questions):")
+    print(format_quality(quality))
+    if misses:
+        print("\nNo relevant chunk in the top 5 (agent's filter):")
+        for line in misses:
+            print(f"  {line}")
+    print("\nRetrieval latency:")
+    print(format_summary(latency))
+
+    if args.save_baseline:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(
+            json.dumps({"quality": quality, "latency": latency}, indent=2, sort_keys=True), encoding="utf-8"
+        )
+        print(f"\nBaseline saved to {args.baseline}")
+        return
+
+    if not args.baseline.exists():
+        print(f"\nNo baseline at {args.baseline}; run with --save-baseline to create one.")
+        return
+
+    baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+    regressions = compare_quality(quality, baseline["quality"], tolerance=args.quality_tolerance)
+    regressions += compare_latency(
+        latency, baseline["latency"], tolerance=args.tolerance, cold_tolerance=args.cold_tolerance
+    )
+    if regressions:
+        print("\nREGRESSIONS vs baseline:")
+        for line in regressions:
+            print(f"  {line}")
+        sys.exit(1)
+    print("\nOK: no regressions vs baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+Retrieval filters: which partitions of the index a search may look at.
+
+A filter restricts search to a set of document types and, within the menu,
+to categories and dietary labels. The agent infers one per turn from the
+caller's words; an empty filter searches everything.
+"""
+
+import re
+from dataclasses import dataclass, field
+from typing import FrozenSet, Optional
+
+from doc_metadata import (
+    DIETARY_DAIRY_FREE,
+    DIETARY_GLUTEN_FREE_OPTION,
+    DIETARY_NON_VEGETARIAN,
+    DIETARY_VEGETARIAN,
+    DOC_TYPE_MENU,
+    DOC_TYPE_PROMOTIONS,
+    DOC_TYPE_RULES,
+    DOC_TYPES,
+)
+
+
+@dataclass(frozen=True)
+class RetrievalFilter:
+    """
+    Partitions to search. Empty fields mean "no restriction".
+
+    categories and dietary only constrain menu chunks; promotions and rules
+    chunks are included whenever their doc type is allowed.
+    """
+
+    doc_types: FrozenSet[str] = field(default_factory=frozenset)
+    categories: FrozenSet[str] = field(default_factory=frozenset)
+    dietary: FrozenSet[str] = field(default_factory=frozenset)
+
+    @property
+    def is_empty(self) -> bool:
+        return not (self.doc_types or self.categories or self.dietary)
+
+
+NO_FILTER = RetrievalFilter()
+
+# Keyword -> menu category key (see doc_metadata.normalize_category)
+_CATEGORY_KEYWORDS = {
+    "pizza": "pizza",
+    "pizzas": "pizza",
+    "pasta": "pasta",
+    "pastas": "pasta",
+    "spaghetti": "pasta",
+    "penne": "pasta",
+    "lasagna": "pasta",
+    "appetizer": "appetizer",
+    "appetizers": "appetizer",
+    "starter": "appetizer",
+    "starters": "appetizer",
+    "salad": "salad",
+    "salads": "salad",
+    "dessert": "dessert",
+    "desserts": "dessert",
+    "sweet": "dessert",
+    "drink": "beverage",
+    "drinks": "beverage",
+    "beverage": "beverage",
+    "beverages": "beverage",
+    "soda": "beverage",
+}
+
+_DIETARY_KEYWORDS = {
+    "vegetarian": DIETARY_VEGETARIAN,
+    "veg": DIETARY_VEGETARIAN,
+    "veggie": DIETARY_VEGETARIAN,
+    "non-veg": DIETARY_NON_VEGETARIAN,
+    "non-vegetarian": DIETARY_NON_VEGETARIAN,
+    "meat": DIETARY_NON_VEGETARIAN,
+    "gluten-free": DIETARY_GLUTEN_FREE_OPTION,
+    "dairy-free": DIETARY_DAIRY_FREE,
+    "lactose": DIETARY_DAIRY_FREE,
+}
+
+# Dietary questions with no menu label to filter on: vegetarian items may still
+# contain dairy, so "vegan" only points the search at the policy docs and FAQs
+_UNLABELLED_DIETARY_KEYWORDS = frozenset({"vegan"})
+
+# Spoken variants of the hyphenated keywords ("non veg", "nonveg", "gluten free")
+_PHRASE_RE = [
+    (re.compile(r"\bnon[\s-]*(veg|vegetarian)\b"), r"non-\1"),
+    (re.compile(r"\b(gluten|dairy)[\s-]+free\b"), r"\1-free"),
+]
+
+_PROMOTION_KEYWORDS = frozenset(
+    "deal deals offer offers combo combos promotion promotions discount discounts special specials free".split()
+)
+_RULES_KEYWORDS = frozenset(
+    """open opening close closing hours timing timings address located location deliver delivery
+    pickup minimum fee fees pay payment upi card cash cod gst tax cancel modify allergy allergies
+    allergic phone contact""".split()
+)
+
+_WORD_RE = re.compile(r"[a-z]+(?:-[a-z]+)*")
+
+
+def infer_retrieval_filter(query: str) -> RetrievalFilter:
+    """
+    Guess which partitions a caller's question needs.
+
+    Deliberately conservative: when nothing specific is mentioned the filter
+    is empty and the whole index is searched.
+    """
+    text = query.lower()
+    for pattern, replacement in _PHRASE_RE:
+        text = pattern.sub(replacement, text)
+    words = set(_WORD_RE.findall(text))
+    categories = frozenset(_CATEGORY_KEYWORDS[w] for w in words if w in _CATEGORY_KEYWORDS)
+    dietary = frozenset(_DIETARY_KEYWORDS[w] for w in words if w in _DIETARY_KEYWORDS)
+
+    doc_types = set()
+    if categories or dietary:
+        doc_types.add(DOC_TYPE_MENU)
+    if words & _PROMOTION_KEYWORDS:
+        doc_types.add(DOC_TYPE_PROMOTIONS)
+    if words & _RULES_KEYWORDS:
+        doc_types.add(DOC_TYPE_RULES)
+    if (dietary or words & _UNLABELLED_DIETARY_KEYWORDS) and doc_types == {DOC_TYPE_MENU}:
+        # Dietary questions are also answered by the allergy policy and the FAQs
+        doc_types.update((DOC_TYPE_RULES, DOC_TYPE_PROMOTIONS))
+
+    if not doc_types:
+        return NO_FILTER
+    return RetrievalFilter(
+        doc_types=frozenset(doc_types), categories=categories, dietary=dietary
+    )
+
+
+def without_doc_type(retrieval_filter: RetrievalFilter, doc_type: str) -> Optional[RetrievalFilter]:
+    """
+    The filter minus one doc type (and the menu-only category/dietary
+    constraints), or None if nothing would be left to search.
+    """
+    doc_types = (retrieval_filter.doc_types or frozenset(DOC_TYPES)) - {doc_type}
+    if not doc_types:
+        return None
+    return RetrievalFilter(doc_types=doc_types)
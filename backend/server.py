@@ -2,9 +2,9 @@
 Server setup and session configuration for the restaurant voice agent.
 
 This module handles:
-- Agent server creation
-- Session configuration (STT, LLM, TTS, VAD)
-- Room options and audio processing
+- Configuration checks before starting
+- Running agent.server: the same entrypoint, prewarm and admission control
+  as agent.py (pipeline and room options via session_factory)
 """
 
 import os
@@ -14,13 +14,13 @@ from dotenv import load_dotenv
 # Load environment variables
 load_dotenv()
 
-from livekit import agents, rtc
-from livekit.agents import JobContext, WorkerOptions, cli, inference
-from livekit.agents import AgentSession, room_io
-from livekit.plugins import groq, silero
-from livekit.plugins.turn_detector.multilingual import MultilingualModel
+from livekit.agents import cli
 
-from agent import RestaurantAssistant
+# The same AgentServer agent.py runs (entrypoint, prewarm, load-aware admission),
+# so the two workers can't drift apart
+from agent import server
+from worker_load import claim_report_dir
+from session_factory import load_plugins
 
 # Deepgram code commented out as requested
 # try:
@@ -30,43 +30,6 @@ from agent import RestaurantAssistant
 #     DEEPGRAM_AVAILABLE = False
 
 
-async def restaurant_agent(ctx: JobContext):
-    """
-    Entry point for the voice agent session.
-    """
-    # Create the agent session with standard configuration:
-    # - STT: AssemblyAI (via LiveKit Inference)
-    # - LLM: Groq (via Plugin)
-    # - TTS: Cartesia (via LiveKit Inference)
-    
-    # Pre-load VAD
-    vad_model = silero.VAD.load()
-
-    session = AgentSession(
-        stt=inference.STT(model="assemblyai/universal-streaming", language="en"),
-        llm=groq.LLM(model="llama-3.3-70b-versatile"),
-        tts=inference.TTS(
-            model="cartesia/sonic-3",
-            voice="9626c31c-bec5-4cca-baa8-f8ba9e84c8bc",
-            language="en"
-        ),
-        turn_detection=MultilingualModel(),
-        vad=vad_model,
-        preemptive_generation=True,
-    )
-
-    # Start the session
-    await session.start(
-        agent=RestaurantAssistant(),
-        room=ctx.room,
-        room_options=room_io.RoomOptions(
-            audio_input=room_io.AudioInputOptions(
-                noise_cancellation=lambda params: noise_cancellation.BVCTelephony() if params.participant.kind == rtc.ParticipantKind.PARTICIPANT_KIND_SIP else noise_cancellation.BVC(),
-            ),
-        ),
-    )
-
-
 if __name__ == "__main__":
     # Check environment variables before starting
     print("Checking configuration...")
@@ -88,11 +51,13 @@ if __name__ == "__main__":
     print("OK: All environment variables found")
     print(f"LiveKit URL: {os.getenv('LIVEKIT_URL')}")
     print("Starting agent server...")
-    
-    opts = WorkerOptions(entrypoint_fnc=restaurant_agent)
+    # Plugins register on the worker's main thread before it starts; job processes do it in prewarm
+    load_plugins()
+    # Job processes report their load into this worker's directory (see worker_load.py)
+    claim_report_dir()
     
     try:
-        cli.run_app(opts)
+        cli.run_app(server)
     except KeyboardInterrupt:
         print("\n\nAgent server stopped by user")
         sys.exit(0)
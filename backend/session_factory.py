@@ -0,0 +1,189 @@
+"""
+One place to build the voice pipeline for a session, shared by agent.py and
+server.py so the two entrypoints can't drift apart.
+
+What a session runs with (models, VAD, turn detection, endpointing) comes
+from its latency profile (see latency_profiles.py). Model-backed components
+are created once per job process and reused by every session the process
+runs:
+
+- VAD: Silero is loaded at prewarm, once per distinct VAD setting across
+  the profiles, before the process takes a job
+- turn detector: needs the job context to reach the process's inference
+  executor, so it is created on the first job that uses it and cached
+- noise cancellation: the BVC / BVC-telephony options are created at prewarm
+
+The plugins themselves (Silero and onnxruntime, noise cancellation, the turn
+detector) are imported by load_plugins(), not when this module is imported,
+so spawning a job process doesn't pay for them before prewarm starts.
+
+STT, LLM and TTS are per-session: they hold the session's connections. A
+session checks out a pre-connected set from the process's provider pool
+(see provider_pool.py) and releases it, closing its connections, at shutdown.
+
+Sessions created by the token server's /bootstrap endpoint are dispatched
+before the caller joins, with {"warmup": true} in the dispatch metadata; for
+those, warm_up() joins the room while the caller's browser is still
+connecting, and caller_identity() reads the caller from the same metadata
+instead of waiting for them to join.
+"""
+
+import json
+import logging
+import os
+
+from livekit import rtc
+from livekit.agents import AgentSession, JobContext, JobProcess, MetricsCollectedEvent, room_io
+
+from latency_profiles import SessionProfile, load_profiles
+from logging_setup import log_transcript
+from provider_pool import get_provider_pool
+from telemetry import observe_pipeline_metrics
+
+logger = logging.getLogger("restaurant.session_factory")
+
+
+def _multilingual_model():
+    from livekit.plugins.turn_detector.multilingual import MultilingualModel
+
+    return MultilingualModel()
+
+
+def _english_model():
+    from livekit.plugins.turn_detector.english import EnglishModel
+
+    return EnglishModel()
+
+
+_TURN_DETECTOR_MODELS = {"multilingual": _multilingual_model, "english": _english_model}
+_NOISE_CANCELLATION = "noise_cancellation"
+_NOISE_CANCELLATION_SIP = "noise_cancellation_sip"
+
+# Explicit dispatch: the token server dispatches this name (see token_server.py)
+AGENT_NAME = os.getenv("AGENT_NAME", "restaurant-assistant")
+WARMUP_METADATA_KEY = "warmup"
+
+
+def load_plugins() -> None:
+    """
+    Import (and so register) the plugins sessions use.
+
+    Plugins must be registered on the process's main thread, and the turn
+    detector's inference runners before the worker starts its inference
+    process: call this from the worker's startup and from prewarm, not from
+    a session.
+    """
+    from livekit.plugins import noise_cancellation, silero  # noqa: F401
+    from livekit.plugins.turn_detector import english, multilingual  # noqa: F401
+
+
+def prewarm_models(proc: JobProcess) -> None:
+    """Load the per-process models every profile needs into proc.userdata."""
+    from livekit.plugins import noise_cancellation
+
+    for profile in load_profiles().profiles.values():
+        _vad(proc, profile)
+    proc.userdata[_NOISE_CANCELLATION] = noise_cancellation.BVC()
+    proc.userdata[_NOISE_CANCELLATION_SIP] = noise_cancellation.BVCTelephony()
+
+
+def _shared(proc: JobProcess, key: str, create):
+    # Setup functions other than prewarm_models (tests, ad-hoc workers) still get a working session
+    if key not in proc.userdata:
+        proc.userdata[key] = create()
+    return proc.userdata[key]
+
+
+def _vad(proc: JobProcess, profile: SessionProfile):
+    from livekit.plugins import silero
+
+    return _shared(proc, f"vad:{profile.vad_key()}", lambda: silero.VAD.load(**profile.vad))
+
+
+def turn_detector(ctx: JobContext, profile: SessionProfile):
+    """The process's turn detector for the profile, created on its first job ("vad"/"stt" need no model)."""
+    model = _TURN_DETECTOR_MODELS.get(profile.turn_detector)
+    if model is None:
+        return profile.turn_detector
+    return _shared(ctx.proc, f"turn_detector:{profile.turn_detector}", model)
+
+
+def room_options(proc: JobProcess) -> room_io.RoomOptions:
+    """Room options with noise cancellation tuned for phone callers (SIP) or WebRTC clients."""
+    from livekit.plugins import noise_cancellation
+
+    bvc = _shared(proc, _NOISE_CANCELLATION, noise_cancellation.BVC)
+    bvc_sip = _shared(proc, _NOISE_CANCELLATION_SIP, noise_cancellation.BVCTelephony)
+    return room_io.RoomOptions(
+        audio_input=room_io.AudioInputOptions(
+            noise_cancellation=lambda params: bvc_sip
+            if params.participant.kind == rtc.ParticipantKind.PARTICIPANT_KIND_SIP
+            else bvc,
+        ),
+    )
+
+
+def select_profile(ctx: JobContext) -> SessionProfile:
+    return load_profiles().select(session_id=ctx.job.id, metadata=ctx.job.metadata)
+
+
+def build_session(ctx: JobContext, profile: SessionProfile) -> AgentSession:
+    """An AgentSession for the profile, using the process's shared VAD, turn detector and provider pool."""
+    pool = get_provider_pool()
+    providers = pool.checkout(profile)
+
+    async def _release_providers() -> None:
+        await pool.release(providers)
+
+    ctx.add_shutdown_callback(_release_providers)
+    session = AgentSession(
+        stt=providers.stt,
+        llm=providers.llm,
+        tts=providers.tts,
+        turn_detection=turn_detector(ctx, profile),
+        vad=_vad(ctx.proc, profile),
+        preemptive_generation=profile.preemptive_generation,
+        **profile.endpointing,
+    )
+
+    @session.on("metrics_collected")
+    def _on_metrics(event: MetricsCollectedEvent) -> None:
+        observe_pipeline_metrics(profile.name, event.metrics)
+
+    logger.info("session using latency profile %s", profile.name, extra={"profile": profile.name})
+    log_transcript("session_profile", profile=profile.name)
+    return session
+
+
+def _dispatch_metadata(ctx: JobContext) -> dict:
+    try:
+        data = json.loads(ctx.job.metadata or "{}")
+    except json.JSONDecodeError:
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def is_warmup_dispatch(ctx: JobContext) -> bool:
+    """True for jobs dispatched ahead of the caller by the token server's /bootstrap."""
+    return bool(_dispatch_metadata(ctx).get(WARMUP_METADATA_KEY))
+
+
+async def caller_identity(ctx: JobContext) -> str:
+    """The caller's identity: from /bootstrap's dispatch hints, else the first participant to join."""
+    identity = _dispatch_metadata(ctx).get("identity")
+    if identity:
+        return identity
+    if not ctx.room.isconnected():
+        await ctx.connect()
+    participant = await ctx.wait_for_participant()
+    return participant.identity
+
+
+async def warm_up(ctx: JobContext) -> None:
+    """Join the room before the caller arrives; its providers are already connecting."""
+    await ctx.connect()
+    logger.info(
+        "warmed up ahead of caller %s",
+        _dispatch_metadata(ctx).get("identity", "?"),
+        extra={"room": ctx.room.name},
+    )
@@ -0,0 +1,206 @@
+"""
+Session state snapshots, so a caller who drops and rejoins picks up where
+they left off.
+
+When a caller's network drops or their worker restarts, the new session
+used to start with an empty cart and no context, and the customer had to
+repeat the whole order. Each session now snapshots its state after every
+change: the cart, the fulfilment choice (pickup / delivery) and a compact
+summary of the conversation (the last few user and agent lines, without
+retrieved context). Snapshots are keyed by room and caller identity and
+kept in storage/sessions.sqlite3 (SESSION_STORE_PATH overrides).
+
+A session for the same room and identity restores the latest snapshot in
+one step: the cart is set, the summary goes into the agent's initial chat
+context and the caller is welcomed back with a fixed phrase, so no history
+is replayed through the LLM. Snapshots older than SESSION_SNAPSHOT_TTL
+seconds (default 1800) are ignored.
+
+Saving never touches the disk on the event loop: the latest snapshot per
+session replaces any unwritten one and a background thread writes them.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+logger = logging.getLogger("restaurant.session_store")
+
+PROJECT_ROOT = Path(__file__).parent.parent
+SESSION_STORE_PATH = PROJECT_ROOT / "storage" / "sessions.sqlite3"
+
+# How much conversation a snapshot keeps: enough to resume, not a transcript
+SUMMARY_LINES = 6
+SUMMARY_LINE_CHARS = 200
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    room TEXT NOT NULL,
+    identity TEXT NOT NULL,
+    state TEXT NOT NULL,
+    saved_at REAL NOT NULL,
+    PRIMARY KEY (room, identity)
+);
+"""
+
+_UPSERT = """
+INSERT INTO sessions (room, identity, state, saved_at) VALUES (?, ?, ?, ?)
+ON CONFLICT(room, identity) DO UPDATE SET state = excluded.state, saved_at = excluded.saved_at
+"""
+
+
+@dataclass
+class SessionSnapshot:
+    cart_items: List[dict] = field(default_factory=list)
+    fulfilment: Optional[str] = None
+    # (role, text) of the last few user / assistant lines, oldest first
+    summary: List[Tuple[str, str]] = field(default_factory=list)
+    saved_at: float = field(default_factory=time.time)
+
+    @property
+    def is_empty(self) -> bool:
+        return not self.cart_items and not self.fulfilment and not self.summary
+
+    def to_json(self) -> str:
+        return json.dumps(asdict(self))
+
+    @classmethod
+    def from_json(cls, text: str) -> "SessionSnapshot":
+        data = json.loads(text)
+        return cls(
+            cart_items=data.get("cart_items", []),
+            fulfilment=data.get("fulfilment"),
+            summary=[(role, line) for role, line in data.get("summary", [])],
+            saved_at=data.get("saved_at", 0.0),
+        )
+
+    def resume_context(self) -> str:
+        """The snapshot as one message for the agent's initial chat context."""
+        lines = ["The customer reconnected. Continue their order from where it left off; do not start over."]
+        if self.cart_items:
+            lines.append("Cart: " + "; ".join(_describe_item(item) for item in self.cart_items))
+        else:
+            lines.append("Cart: empty")
+        if self.fulfilment:
+            lines.append(f"Fulfilment: {self.fulfilment}")
+        if self.summary:
+            lines.append("Conversation so far (most recent last):")
+            lines.extend(f"{role}: {text}" for role, text in self.summary)
+        return "\n".join(lines)
+
+    def welcome_back(self) -> str:
+        """A fixed phrase to resume with, spoken without an LLM call."""
+        if not self.cart_items:
+            return "Welcome back! Where were we? What can I get for you?"
+        items = ", ".join(_describe_item(item, with_price=False) for item in self.cart_items)
+        return f"Welcome back! I've still got your order: {items}. Would you like to continue?"
+
+
+def _describe_item(item: dict, with_price: bool = True) -> str:
+    quantity = item.get("quantity", 1)
+    size = f" ({item['size']})" if item.get("size") else ""
+    addons = f" with {', '.join(item['addons'])}" if item.get("addons") else ""
+    price = f" at ₹{item.get('price', 0.0):.0f} each" if with_price else ""
+    return f"{quantity}x {item['name']}{size}{addons}{price}"
+
+
+def compact_summary(lines: List[Tuple[str, str]]) -> List[Tuple[str, str]]:
+    """The last SUMMARY_LINES non-empty lines, each cut to SUMMARY_LINE_CHARS."""
+    kept = [(role, " ".join(text.split())) for role, text in lines if text and text.strip()]
+    return [
+        (role, text if len(text) <= SUMMARY_LINE_CHARS else text[: SUMMARY_LINE_CHARS - 1] + "…")
+        for role, text in kept[-SUMMARY_LINES:]
+    ]
+
+
+class SessionStore:
+    def __init__(self, path: Union[str, Path] = SESSION_STORE_PATH, ttl: float = 1800.0) -> None:
+        self.path = Path(path)
+        self.ttl = ttl
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._db_lock = threading.Lock()
+        # Latest unwritten snapshot per (room, identity); a newer save replaces it
+        self._pending: Dict[Tuple[str, str], SessionSnapshot] = {}
+        self._pending_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._idle = threading.Event()
+        self._idle.set()
+        self._closed = False
+        self._writer = threading.Thread(target=self._write_loop, name="session-store-writer", daemon=True)
+        self._writer.start()
+
+    def save(self, room: str, identity: str, snapshot: SessionSnapshot) -> None:
+        """Queue the session's latest state for writing (returns at once)."""
+        with self._pending_lock:
+            self._pending[(room, identity)] = snapshot
+            self._idle.clear()
+        self._wake.set()
+
+    def load(self, room: str, identity: str) -> Optional[SessionSnapshot]:
+        """The session's latest snapshot if one was saved within the TTL."""
+        with self._pending_lock:
+            snapshot = self._pending.get((room, identity))
+        if snapshot is None:
+            with self._db_lock:
+                row = self._conn.execute(
+                    "SELECT state FROM sessions WHERE room = ? AND identity = ?", (room, identity)
+                ).fetchone()
+            if row is None:
+                return None
+            snapshot = SessionSnapshot.from_json(row[0])
+        if time.time() - snapshot.saved_at > self.ttl:
+            return None
+        return snapshot
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every snapshot saved so far is written."""
+        return self._idle.wait(timeout)
+
+    def close(self) -> None:
+        self._closed = True
+        self._wake.set()
+        self._writer.join()
+        self._conn.close()
+
+    def _write_loop(self) -> None:
+        while True:
+            self._wake.wait()
+            self._wake.clear()
+            with self._pending_lock:
+                batch, self._pending = self._pending, {}
+            if batch:
+                rows = [(room, identity, s.to_json(), s.saved_at) for (room, identity), s in batch.items()]
+                try:
+                    with self._db_lock, self._conn:
+                        self._conn.execute("BEGIN")
+                        self._conn.executemany(_UPSERT, rows)
+                except sqlite3.Error:
+                    logger.exception("could not write %d session snapshots to %s", len(rows), self.path)
+            with self._pending_lock:
+                if not self._pending:
+                    self._idle.set()
+            if self._closed and self._idle.is_set():
+                return
+
+
+_STORE: Optional[SessionStore] = None
+
+
+def get_session_store() -> SessionStore:
+    global _STORE
+    if _STORE is None:
+        _STORE = SessionStore(
+            os.getenv("SESSION_STORE_PATH", str(SESSION_STORE_PATH)),
+            ttl=float(os.getenv("SESSION_SNAPSHOT_TTL", "1800")),
+        )
+    return _STORE
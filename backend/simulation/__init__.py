@@ -0,0 +1,11 @@
+"""
+Offline simulation package for the restaurant assistant.
+
+Local stand-ins for the room, STT, LLM and TTS, plus the harnesses that drive
+RestaurantAssistant through scripted conversations without network access:
+- fakes: room / session / plugin stand-ins
+- latency: per-stage latency recording and baseline comparison
+- conversations: scripted ordering conversations
+- harness: the end-to-end latency benchmark
+- capacity_probe: the worker capacity load test (agent.py loadtest)
+"""
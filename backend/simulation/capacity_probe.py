@@ -0,0 +1,222 @@
+"""
+Concurrency load test and capacity model for one worker process.
+
+Runs N simulated sessions (real RestaurantAssistant, stand-in providers with
+realistic delays) concurrently in this process, ramping N up step by step.
+For each step it records event-loop lag, CPU, RSS per session and per-turn
+latency, and the resulting capacity curve says how many sessions a worker
+can hold before turn latency degrades.
+
+The sessions drive the assistant's hooks directly: AgentSession, Silero VAD,
+the turn detector, noise cancellation and audio I/O are not run, and their
+per-session CPU is not in the curve (see CapacityReport.excludes). Treat
+max_healthy_sessions as an upper bound and confirm it on a real worker.
+
+Run through the agent entrypoint:
+    python backend/agent.py loadtest --levels 1,2,4,8,16,32 --output capacity.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import List, Optional, Sequence
+
+import psutil
+
+from simulation.conversations import DEFAULT_CONVERSATIONS
+from simulation.fakes import FakeLLM, FakeSTT, FakeTTS
+from simulation.harness import SimulatedProviders, run_conversation
+from simulation.latency import LatencyRecorder, percentile
+from worker_load import EventLoopLagMonitor
+
+# Run by real sessions but not by the load test's simulated ones
+NOT_SIMULATED = ("AgentSession", "Silero VAD", "turn detector", "noise cancellation", "audio I/O")
+
+
+@dataclass
+class CapacityPoint:
+    sessions: int
+    turns: int
+    turn_p50_ms: float
+    turn_p95_ms: float
+    turn_p99_ms: float
+    loop_lag_p50_ms: float
+    loop_lag_p99_ms: float
+    loop_lag_max_ms: float
+    # This process's CPU time over wall time (100 = one core busy)
+    cpu_percent: float
+    # Host-wide CPU, measured as the worker's load score does (psutil.cpu_percent)
+    host_cpu_percent: float
+    rss_mb: float
+    rss_per_session_mb: float
+
+
+@dataclass
+class CapacityReport:
+    points: List[CapacityPoint]
+    max_healthy_sessions: int
+    # False if even the highest level tested was healthy: ramp further to find the limit
+    capacity_reached: bool
+    suggested_load_threshold: float
+    lag_budget_ms: float
+    max_turn_degradation: float
+    # Per-session work the simulated sessions skip, which the curve leaves out
+    excludes: List[str] = field(default_factory=lambda: list(NOT_SIMULATED))
+
+
+def realistic_providers() -> SimulatedProviders:
+    """Stand-ins with roughly production-shaped delays, so sessions overlap like real calls."""
+    return SimulatedProviders(
+        stt=FakeSTT(final_transcript_delay=0.3),
+        llm=FakeLLM(time_to_first_token=0.4, per_message_latency=0.005),
+        tts=FakeTTS(first_frame_delay=0.15),
+        publish_latency=0.005,
+    )
+
+
+async def _session_loop(index: int, rounds: int, providers: SimulatedProviders, recorder: LatencyRecorder) -> None:
+    for round_number in range(rounds):
+        for conversation in DEFAULT_CONVERSATIONS:
+            await run_conversation(
+                conversation,
+                providers,
+                recorder,
+                room_name=f"load-{index}-{conversation.name}-{round_number}",
+            )
+
+
+async def measure_level(sessions: int, rounds: int, providers: SimulatedProviders) -> CapacityPoint:
+    """Run `sessions` simulated sessions concurrently and summarize the step."""
+    process = psutil.Process(os.getpid())
+    rss_before = process.memory_info().rss
+    cpu_before = process.cpu_times()
+    # Host-wide CPU since this call, as WorkerLoad.sample reads it
+    psutil.cpu_percent(interval=None)
+    wall_before = time.perf_counter()
+
+    monitor = EventLoopLagMonitor()
+    monitor.start()
+    recorders = [LatencyRecorder() for _ in range(sessions)]
+    await asyncio.gather(
+        *(_session_loop(i, rounds, providers, recorders[i]) for i in range(sessions))
+    )
+    await monitor.stop()
+
+    wall = time.perf_counter() - wall_before
+    host_cpu = psutil.cpu_percent(interval=None)
+    cpu_after = process.cpu_times()
+    cpu_seconds = (cpu_after.user - cpu_before.user) + (cpu_after.system - cpu_before.system)
+    rss_after = process.memory_info().rss
+
+    turns = sorted(t for r in recorders for t in r.samples["turn_total"])
+    lag = sorted(monitor.samples)
+    return CapacityPoint(
+        sessions=sessions,
+        turns=len(turns),
+        turn_p50_ms=percentile(turns, 50) * 1000,
+        turn_p95_ms=percentile(turns, 95) * 1000,
+        turn_p99_ms=percentile(turns, 99) * 1000,
+        loop_lag_p50_ms=percentile(lag, 50) * 1000,
+        loop_lag_p99_ms=percentile(lag, 99) * 1000,
+        loop_lag_max_ms=(lag[-1] * 1000) if lag else 0.0,
+        cpu_percent=100 * cpu_seconds / wall if wall else 0.0,
+        host_cpu_percent=host_cpu,
+        rss_mb=rss_after / 2**20,
+        rss_per_session_mb=max(0, rss_after - rss_before) / 2**20 / sessions,
+    )
+
+
+def load_score(point: CapacityPoint, lag_budget_ms: float) -> float:
+    """
+    The worker's load score at a level, from the components this test measures:
+    loop lag over its budget and host CPU (see WorkerLoad.sample). The sessions
+    component is set separately, through LOAD_MAX_SESSIONS.
+    """
+    return min(1.0, max(point.loop_lag_p99_ms / lag_budget_ms, point.host_cpu_percent / 100))
+
+
+def build_report(
+    points: Sequence[CapacityPoint], lag_budget_ms: float, max_turn_degradation: float
+) -> CapacityReport:
+    """
+    The largest healthy level is the last one whose loop-lag p99 stays under
+    budget and whose turn p95 is within max_turn_degradation of the
+    single-session level. The suggested load threshold is the load score at
+    that level, so LOAD_THRESHOLD and LOAD_LAG_BUDGET_MS can be used as is.
+    """
+    reference = points[0].turn_p95_ms
+    healthy = [
+        p
+        for p in points
+        if p.loop_lag_p99_ms <= lag_budget_ms
+        and p.turn_p95_ms <= reference * (1 + max_turn_degradation)
+    ]
+    best = healthy[-1] if healthy else points[0]
+    return CapacityReport(
+        points=list(points),
+        max_healthy_sessions=best.sessions if healthy else 0,
+        capacity_reached=len(healthy) < len(points),
+        suggested_load_threshold=round(load_score(best, lag_budget_ms), 2),
+        lag_budget_ms=lag_budget_ms,
+        max_turn_degradation=max_turn_degradation,
+    )
+
+
+async def run_capacity_curve(
+    levels: Sequence[int],
+    rounds: int = 1,
+    providers: Optional[SimulatedProviders] = None,
+    lag_budget_ms: float = 50.0,
+    max_turn_degradation: float = 0.5,
+) -> CapacityReport:
+    providers = providers or realistic_providers()
+    points = []
+    for sessions in levels:
+        point = await measure_level(sessions, rounds, providers)
+        print(
+            f"{sessions:>4} sessions: turn p95 {point.turn_p95_ms:8.1f} ms, "
+            f"loop lag p99 {point.loop_lag_p99_ms:6.1f} ms, CPU {point.cpu_percent:5.1f}% "
+            f"(host {point.host_cpu_percent:5.1f}%), "
+            f"RSS/session {point.rss_per_session_mb:6.2f} MB"
+        )
+        points.append(point)
+    return build_report(points, lag_budget_ms, max_turn_degradation)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(prog="agent.py loadtest", description="Worker capacity load test.")
+    parser.add_argument("--levels", default="1,2,4,8,16,32", help="Comma-separated session counts to ramp through.")
+    parser.add_argument("--rounds", type=int, default=1, help="Scripted conversation rounds per session per level.")
+    parser.add_argument("--lag-budget-ms", type=float, default=50.0, help="Max healthy event-loop lag p99.")
+    parser.add_argument("--max-degradation", type=float, default=0.5, help="Max healthy turn p95 increase vs 1 session.")
+    parser.add_argument("--output", type=Path, help="Write the capacity curve as JSON here.")
+    args = parser.parse_args(argv)
+
+    # Warm the index first so step 1 doesn't pay for loading it
+    from rag_engine import get_index
+
+    get_index()
+
+    levels = [int(level) for level in args.levels.split(",") if level.strip()]
+    report = asyncio.run(
+        run_capacity_curve(
+            levels,
+            rounds=args.rounds,
+            lag_budget_ms=args.lag_budget_ms,
+            max_turn_degradation=args.max_degradation,
+        )
+    )
+    print(
+        f"\nMax healthy sessions per worker: {report.max_healthy_sessions} "
+        f"(suggested load threshold: {report.suggested_load_threshold})"
+    )
+    print(f"Not simulated, so not in this curve: {', '.join(report.excludes)}.")
+    if not report.capacity_reached:
+        print("Every level was healthy; add higher --levels to find where latency degrades.")
+    if args.output:
+        args.output.write_text(json.dumps(asdict(report), indent=2), encoding="utf-8")
+        print(f"Capacity curve written to {args.output}")
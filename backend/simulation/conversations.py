@@ -0,0 +1,116 @@
+"""
+Scripted ordering conversations used by the offline benchmarks.
+
+Each turn is what the caller says plus what the (stand-in) LLM decides to do
+about it: the tool calls it makes and the reply it speaks.
+"""
+
+from dataclasses import dataclass
+from typing import List
+
+from simulation.fakes import FakeLLMResponse
+
+
+@dataclass
+class ScriptedTurn:
+    user_text: str
+    response: FakeLLMResponse
+
+
+@dataclass
+class ScriptedConversation:
+    name: str
+    turns: List[ScriptedTurn]
+
+
+def _turn(user_text: str, reply: str, *tool_calls) -> ScriptedTurn:
+    return ScriptedTurn(user_text, FakeLLMResponse(tool_calls=list(tool_calls), text=reply))
+
+
+PIZZA_ORDER = ScriptedConversation(
+    name="pizza_order",
+    turns=[
+        _turn(
+            "Hi, what vegetarian pizzas do you have?",
+            "We have Margherita, Verdure Grigliate, Four Cheese and Truffle Funghi. Which one would you like?",
+        ),
+        _turn(
+            "Can I see the margherita?",
+            "Here it is on your left.",
+            ("show_menu_item", {"item_name": "Margherita"}),
+        ),
+        _turn(
+            "I'll have a large margherita with extra basil",
+            "Added a large Margherita with extra basil. Anything else?",
+            (
+                "add_item_to_cart",
+                {
+                    "item_name": "Margherita Pizza",
+                    "quantity": 1,
+                    "size": "Large",
+                    "price": 589.0,
+                    "addons": ["Extra basil"],
+                },
+            ),
+        ),
+        _turn(
+            "And two cokes please",
+            "Two Cokes added.",
+            ("add_item_to_cart", {"item_name": "Coke", "quantity": 2, "price": 99.0}),
+        ),
+        _turn(
+            "Actually make that two pizzas",
+            "Got it, two large Margheritas.",
+            ("update_cart_quantity", {"item_name": "Margherita Pizza", "new_quantity": 2}),
+        ),
+        _turn(
+            "What's my total?",
+            "Your total comes to 1,445 rupees including GST.",
+            ("get_cart_summary", {}),
+        ),
+        _turn(
+            "Okay, I'm ready to pay",
+            "Taking you to the payment page now.",
+            ("proceed_to_payment", {}),
+        ),
+    ],
+)
+
+CHANGE_OF_MIND = ScriptedConversation(
+    name="change_of_mind",
+    turns=[
+        _turn(
+            "What are your opening hours on Friday?",
+            "On Friday we're open from 11 AM to midnight.",
+        ),
+        _turn(
+            "Do you deliver to Lajpat Nagar?",
+            "Yes, Lajpat Nagar is in our delivery area.",
+        ),
+        _turn(
+            "Add a medium pepperoni pizza",
+            "Added a medium Pepperoni Piccante.",
+            (
+                "add_item_to_cart",
+                {"item_name": "Pepperoni Piccante Pizza", "quantity": 1, "size": "Medium", "price": 549.0},
+            ),
+        ),
+        _turn(
+            "Actually, remove that",
+            "Removed the pepperoni pizza.",
+            ("remove_item_from_cart", {"item_name": "Pepperoni Piccante Pizza"}),
+        ),
+        _turn(
+            "Is the tiramisu eggless?",
+            "Our tiramisu contains eggs.",
+        ),
+        _turn(
+            "Clear everything and take me back to the menu",
+            "Done, your cart is empty and you're back on the menu.",
+            ("clear_cart", {}),
+            ("go_to_menu", {}),
+        ),
+    ],
+)
+
+DEFAULT_CONVERSATIONS = [PIZZA_ORDER, CHANGE_OF_MIND]
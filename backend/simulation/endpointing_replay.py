@@ -0,0 +1,438 @@
+"""
+Offline endpointing replay: tune VAD and turn detection on recorded calls.
+
+Feeds recorded caller audio through Silero VAD and the turn detector, with
+the settings of a latency profile (see latency_profiles.py), on CPU and
+without a LiveKit room. It then applies the endpointing rule AgentSession
+uses. When the VAD reports end of speech, the turn detector scores the
+transcript so far. Below the model's "unlikely" threshold the turn is held
+for max_endpointing_delay, otherwise for min_endpointing_delay. The delay
+counts from the end of speech, and the turn ends unless the caller resumes
+first.
+
+For every combination in a parameter grid it reports:
+
+- end-of-turn latency: labelled end of the caller's turn -> turn committed
+- premature cut-off rate: turns committed during a mid-turn pause
+- missed: turns never committed before the next one started
+
+Each recording is a WAV file (mono or stereo, any sample rate, including
+8 kHz SIP audio) with a label file next to it, <name>.json:
+
+    {"turns": [
+        {"utterances": [{"start": 0.4, "end": 2.1, "text": "I'd like a large"},
+                        {"start": 2.9, "end": 3.8, "text": "pepperoni pizza"}]},
+        {"agent": "Anything else?",
+         "utterances": [{"start": 6.2, "end": 6.7, "text": "No thanks"}]}
+    ]}
+
+A turn's utterances are the caller's speech between the pauses that are not
+the end of the turn; "agent" is what the agent said before the turn (it is
+part of what the turn detector sees).
+
+Run through the agent entrypoint:
+    python backend/agent.py replay-endpointing recordings/ --profile telephony \\
+        --grid min_silence_duration=0.3,0.45,0.55 --grid min_endpointing_delay=0.3,0.5
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import wave
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from livekit import rtc
+from livekit.agents import vad as agents_vad
+from livekit.plugins import silero
+
+from latency_profiles import SessionProfile, load_profiles
+from simulation.latency import percentile
+
+# AgentSession's endpointing defaults, for profiles that don't set them
+DEFAULT_MIN_ENDPOINTING_DELAY = 0.5
+DEFAULT_MAX_ENDPOINTING_DELAY = 3.0
+
+VAD_SETTINGS = (
+    "min_speech_duration",
+    "min_silence_duration",
+    "prefix_padding_duration",
+    "activation_threshold",
+    "sample_rate",
+)
+ENDPOINTING_SETTINGS = ("min_endpointing_delay", "max_endpointing_delay", "unlikely_threshold")
+
+_FRAME_MS = 20
+
+# Chat history (role/content dicts, oldest first) -> end-of-turn probability
+Predictor = Callable[[List[Dict[str, str]]], float]
+
+
+@dataclass
+class Utterance:
+    start: float
+    end: float
+    text: str
+
+
+@dataclass
+class LabeledTurn:
+    utterances: List[Utterance]
+    agent: str = ""
+
+    @property
+    def start(self) -> float:
+        return self.utterances[0].start
+
+    @property
+    def end(self) -> float:
+        return self.utterances[-1].end
+
+
+@dataclass
+class Recording:
+    audio_path: Path
+    turns: List[LabeledTurn]
+
+    @property
+    def name(self) -> str:
+        return self.audio_path.stem
+
+
+@dataclass
+class SpeechSegment:
+    """Speech as the VAD saw it: start and end of speech, and when END_OF_SPEECH fired."""
+
+    start: float
+    end: float
+    # None if the recording ended mid-speech
+    end_of_speech_at: Optional[float]
+
+
+@dataclass
+class SettingResult:
+    settings: Dict[str, float]
+    turns: int
+    premature_cutoffs: int
+    missed: int
+    latency_p50_ms: float
+    latency_p90_ms: float
+    latency_mean_ms: float
+    # Not beaten on both latency p50 and cut-off rate by another setting
+    pareto: bool = False
+
+    @property
+    def premature_rate(self) -> float:
+        return self.premature_cutoffs / self.turns if self.turns else 0.0
+
+
+def load_recordings(path: Path) -> List[Recording]:
+    """A labelled WAV file, or every labelled WAV file under a directory."""
+    audio_paths = [path] if path.is_file() else sorted(path.rglob("*.wav"))
+    recordings = []
+    for audio_path in audio_paths:
+        label_path = audio_path.with_suffix(".json")
+        if not label_path.exists():
+            print(f"Skipping {audio_path.name}: no {label_path.name}")
+            continue
+        labels = json.loads(label_path.read_text(encoding="utf-8"))
+        turns = [
+            LabeledTurn(
+                utterances=[Utterance(float(u["start"]), float(u["end"]), u.get("text", "")) for u in turn["utterances"]],
+                agent=turn.get("agent", ""),
+            )
+            for turn in labels["turns"]
+            if turn.get("utterances")
+        ]
+        recordings.append(Recording(audio_path, turns))
+    return recordings
+
+
+def read_wav(path: Path) -> Tuple[np.ndarray, int]:
+    """16-bit PCM samples (downmixed to mono) and the sample rate."""
+    with wave.open(str(path), "rb") as wav:
+        if wav.getsampwidth() != 2:
+            raise ValueError(f"{path.name}: only 16-bit PCM WAV is supported")
+        channels = wav.getnchannels()
+        sample_rate = wav.getframerate()
+        samples = np.frombuffer(wav.readframes(wav.getnframes()), dtype=np.int16)
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1).astype(np.int16)
+    return samples, sample_rate
+
+
+async def detect_speech(samples: np.ndarray, sample_rate: int, vad_settings: Dict[str, float]) -> List[SpeechSegment]:
+    """Run Silero VAD over the samples as fast as it goes; times are audio seconds."""
+    settings = dict(vad_settings)
+    if "sample_rate" in settings:
+        settings["sample_rate"] = int(settings["sample_rate"])
+    stream = silero.VAD.load(**settings).stream()
+    samples_per_frame = sample_rate * _FRAME_MS // 1000
+    for start in range(0, len(samples), samples_per_frame):
+        chunk = samples[start:start + samples_per_frame]
+        stream.push_frame(
+            rtc.AudioFrame(chunk.tobytes(), sample_rate=sample_rate, num_channels=1, samples_per_channel=len(chunk))
+        )
+    stream.end_input()
+
+    segments: List[SpeechSegment] = []
+    speech_start: Optional[float] = None
+    async for event in stream:
+        if event.type == agents_vad.VADEventType.START_OF_SPEECH:
+            speech_start = max(0.0, event.timestamp - event.speech_duration)
+        elif event.type == agents_vad.VADEventType.END_OF_SPEECH and speech_start is not None:
+            segments.append(SpeechSegment(speech_start, event.timestamp - event.silence_duration, event.timestamp))
+            speech_start = None
+    await stream.aclose()
+    if speech_start is not None:
+        segments.append(SpeechSegment(speech_start, len(samples) / sample_rate, None))
+    return segments
+
+
+class TurnDetectorPredictor:
+    """The agent's turn detector model run in-process (the agent runs it in the inference executor)."""
+
+    def __init__(self, kind: str) -> None:
+        from livekit.plugins.turn_detector.base import _download_from_hf_hub
+        from livekit.plugins.turn_detector.english import _EUORunnerEn
+        from livekit.plugins.turn_detector.models import HG_MODEL
+        from livekit.plugins.turn_detector.multilingual import _EUORunnerMultilingual
+
+        runner_class = {"multilingual": _EUORunnerMultilingual, "english": _EUORunnerEn}[kind]
+        self._runner = runner_class()
+        self._runner.initialize()
+        languages_path = _download_from_hf_hub(
+            HG_MODEL, "languages.json", revision=runner_class.model_revision(), local_files_only=True
+        )
+        languages = json.loads(Path(languages_path).read_text(encoding="utf-8"))
+        self.unlikely_threshold: float = languages["en"]["threshold"]
+        self._cache: Dict[str, float] = {}
+
+    def __call__(self, history: List[Dict[str, str]]) -> float:
+        key = json.dumps(history)
+        if key not in self._cache:
+            result = self._runner.run(json.dumps({"chat_ctx": history}).encode())
+            self._cache[key] = json.loads(result)["eou_probability"]
+        return self._cache[key]
+
+
+def _turn_for(turns: Sequence[LabeledTurn], segment: SpeechSegment) -> Optional[int]:
+    """Index of the labelled turn the segment's speech belongs to (the last one it overlaps)."""
+    match = None
+    for index, turn in enumerate(turns):
+        if turn.start < segment.end and segment.start < turn.end:
+            match = index
+    return match
+
+
+def _history(turns: Sequence[LabeledTurn], index: int, heard_until: float) -> List[Dict[str, str]]:
+    history: List[Dict[str, str]] = []
+    for previous in turns[:index]:
+        if previous.agent:
+            history.append({"role": "assistant", "content": previous.agent})
+        history.append({"role": "user", "content": " ".join(u.text for u in previous.utterances)})
+    if turns[index].agent:
+        history.append({"role": "assistant", "content": turns[index].agent})
+    heard = [u.text for u in turns[index].utterances if u.start < heard_until]
+    history.append({"role": "user", "content": " ".join(heard)})
+    return history
+
+
+def replay_endpointing(
+    turns: Sequence[LabeledTurn],
+    segments: Sequence[SpeechSegment],
+    min_delay: float,
+    max_delay: float,
+    predictor: Optional[Predictor] = None,
+    unlikely_threshold: Optional[float] = None,
+) -> Tuple[List[float], int, int]:
+    """
+    Apply the endpointing rule to one recording's VAD segments.
+
+    Returns (latency per committed turn, premature cut-offs, missed turns).
+    """
+    first_commit: Dict[int, float] = {}
+    premature = set()
+    for position, segment in enumerate(segments):
+        if segment.end_of_speech_at is None:
+            continue
+        index = _turn_for(turns, segment)
+        if index is None:
+            continue
+        delay = min_delay
+        if predictor is not None and unlikely_threshold is not None:
+            if predictor(_history(turns, index, segment.end)) < unlikely_threshold:
+                delay = max_delay
+        committed_at = max(segment.end_of_speech_at, segment.end + delay)
+        next_start = segments[position + 1].start if position + 1 < len(segments) else None
+        if next_start is not None and next_start < committed_at:
+            # The caller spoke again before the delay ran out: the turn continues
+            continue
+        if committed_at < turns[index].end:
+            premature.add(index)
+        elif index not in first_commit:
+            first_commit[index] = committed_at
+
+    latencies = [first_commit[i] - turns[i].end for i in sorted(first_commit)]
+    missed = len(turns) - len(first_commit)
+    return latencies, len(premature), missed
+
+
+def parse_grid(specs: Sequence[str]) -> Dict[str, List[float]]:
+    """["min_silence_duration=0.3,0.5", ...] -> {"min_silence_duration": [0.3, 0.5], ...}"""
+    grid: Dict[str, List[float]] = {}
+    for spec in specs:
+        name, _, values = spec.partition("=")
+        name = name.strip()
+        if name not in VAD_SETTINGS + ENDPOINTING_SETTINGS:
+            raise ValueError(f"unknown setting {name!r}; tunable: {VAD_SETTINGS + ENDPOINTING_SETTINGS}")
+        grid[name] = [float(v) for v in values.split(",") if v.strip()]
+    return grid
+
+
+def base_settings(profile: SessionProfile) -> Dict[str, float]:
+    settings: Dict[str, float] = dict(profile.vad)
+    settings["min_endpointing_delay"] = profile.endpointing.get("min_endpointing_delay", DEFAULT_MIN_ENDPOINTING_DELAY)
+    settings["max_endpointing_delay"] = profile.endpointing.get("max_endpointing_delay", DEFAULT_MAX_ENDPOINTING_DELAY)
+    return settings
+
+
+def grid_settings(base: Dict[str, float], grid: Dict[str, List[float]]) -> List[Dict[str, float]]:
+    names = sorted(grid)
+    return [{**base, **dict(zip(names, combo))} for combo in itertools.product(*(grid[n] for n in names))] or [base]
+
+
+def mark_pareto(results: Sequence[SettingResult]) -> None:
+    for result in results:
+        result.pareto = not any(
+            other.latency_p50_ms <= result.latency_p50_ms
+            and other.premature_rate <= result.premature_rate
+            and (other.latency_p50_ms < result.latency_p50_ms or other.premature_rate < result.premature_rate)
+            for other in results
+        )
+
+
+async def run_sweep(
+    recordings: Sequence[Recording],
+    base: Dict[str, float],
+    grid: Dict[str, List[float]],
+    predictor: Optional[Predictor] = None,
+    unlikely_threshold: Optional[float] = None,
+) -> List[SettingResult]:
+    audio = {r.audio_path: read_wav(r.audio_path) for r in recordings}
+    vad_runs: Dict[str, Dict[Path, List[SpeechSegment]]] = {}
+    results = []
+    for settings in grid_settings(base, grid):
+        vad_settings = {k: v for k, v in settings.items() if k in VAD_SETTINGS}
+        vad_key = json.dumps(vad_settings, sort_keys=True)
+        if vad_key not in vad_runs:
+            # The VAD pass is the slow part; endpointing settings reuse it
+            vad_runs[vad_key] = {
+                path: await detect_speech(samples, rate, vad_settings) for path, (samples, rate) in audio.items()
+            }
+        latencies: List[float] = []
+        premature = missed = turns = 0
+        for recording in recordings:
+            rec_latencies, rec_premature, rec_missed = replay_endpointing(
+                recording.turns,
+                vad_runs[vad_key][recording.audio_path],
+                settings["min_endpointing_delay"],
+                settings["max_endpointing_delay"],
+                predictor,
+                settings.get("unlikely_threshold", unlikely_threshold),
+            )
+            latencies.extend(rec_latencies)
+            premature += rec_premature
+            missed += rec_missed
+            turns += len(recording.turns)
+        latencies.sort()
+        results.append(
+            SettingResult(
+                settings=settings,
+                turns=turns,
+                premature_cutoffs=premature,
+                missed=missed,
+                latency_p50_ms=percentile(latencies, 50) * 1000,
+                latency_p90_ms=percentile(latencies, 90) * 1000,
+                latency_mean_ms=(sum(latencies) / len(latencies) * 1000) if latencies else 0.0,
+            )
+        )
+    mark_pareto(results)
+    return sorted(results, key=lambda r: (r.premature_rate, r.latency_p50_ms))
+
+
+def format_results(results: Sequence[SettingResult], grid: Dict[str, List[float]]) -> str:
+    swept = sorted(grid)
+    lines = [f"{'':2}{'cut-off':>8} {'p50 ms':>8} {'p90 ms':>8} {'missed':>6}  settings"]
+    for r in results:
+        shown = ", ".join(f"{name}={r.settings[name]:g}" for name in swept) or "profile defaults"
+        lines.append(
+            f"{'*' if r.pareto else ' ':2}{r.premature_rate:8.1%} {r.latency_p50_ms:8.0f} "
+            f"{r.latency_p90_ms:8.0f} {r.missed:6d}  {shown}"
+        )
+    lines.append("* = Pareto-optimal (no other setting is both faster and cuts off less)")
+    return "\n".join(lines)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="agent.py replay-endpointing",
+        description="Sweep VAD/endpointing settings over labelled recordings.",
+    )
+    parser.add_argument("recordings", type=Path, help="A labelled WAV file or a directory of them.")
+    parser.add_argument("--profile", help="Latency profile to start from (default: the config default).")
+    parser.add_argument(
+        "--grid",
+        action="append",
+        default=[],
+        metavar="SETTING=V1,V2",
+        help=f"Values to sweep; repeatable. Settings: {', '.join(VAD_SETTINGS + ENDPOINTING_SETTINGS)}.",
+    )
+    parser.add_argument(
+        "--turn-detector",
+        choices=("multilingual", "english", "none"),
+        help="Override the profile's turn detector; 'none' uses min_endpointing_delay after every pause.",
+    )
+    parser.add_argument("--output", type=Path, help="Write the results as JSON here.")
+    args = parser.parse_args(argv)
+
+    config = load_profiles()
+    profile = config.get(args.profile or config.default)
+    grid = parse_grid(args.grid)
+    recordings = load_recordings(args.recordings)
+    if not recordings:
+        raise SystemExit(f"No labelled recordings found at {args.recordings}")
+
+    kind = args.turn_detector or profile.turn_detector
+    predictor: Optional[TurnDetectorPredictor] = None
+    if kind in ("multilingual", "english"):
+        try:
+            predictor = TurnDetectorPredictor(kind)
+        except RuntimeError as e:
+            raise SystemExit(
+                f"{e}\nDownload it with `python backend/agent.py download-files`, or pass --turn-detector none."
+            )
+    elif kind == "stt":
+        print("STT endpointing is not replayed; endpointing uses VAD pauses and min_endpointing_delay only.")
+
+    print(f"Replaying {sum(len(r.turns) for r in recordings)} turns from {len(recordings)} recordings "
+          f"with profile {profile.name} (turn detector: {kind})")
+    results = asyncio.run(
+        run_sweep(
+            recordings,
+            base_settings(profile),
+            grid,
+            predictor,
+            predictor.unlikely_threshold if predictor is not None else None,
+        )
+    )
+    print(format_results(results, grid))
+    if args.output:
+        args.output.write_text(
+            json.dumps([{**asdict(r), "premature_rate": r.premature_rate} for r in results], indent=2),
+            encoding="utf-8",
+        )
+        print(f"Results written to {args.output}")
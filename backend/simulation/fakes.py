@@ -0,0 +1,193 @@
+"""
+Local stand-ins for the LiveKit room and the STT / LLM / TTS providers.
+
+Each stand-in has a configurable, deterministic latency so benchmarks measure
+our own code (retrieval, context injection, tools, publishing) against a
+stable provider floor instead of whatever the network does that day.
+"""
+
+import asyncio
+import json
+import time
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
+
+from livekit import rtc
+
+
+@dataclass
+class PublishedFrame:
+    """One data packet sent through FakeLocalParticipant.publish_data."""
+
+    topic: str
+    message: Dict[str, Any]
+    reliable: bool
+    duration: float
+
+
+class FakeLocalParticipant:
+    """Records every publish_data call instead of sending it over WebRTC."""
+
+    def __init__(self, identity: str = "agent", publish_latency: float = 0.0) -> None:
+        self.identity = identity
+        self.publish_latency = publish_latency
+        self.published: List[PublishedFrame] = []
+
+    async def publish_data(
+        self,
+        payload: bytes,
+        *,
+        reliable: bool = True,
+        destination_identities: Sequence[str] = (),
+        topic: str = "",
+    ) -> None:
+        start = time.perf_counter()
+        if self.publish_latency:
+            await asyncio.sleep(self.publish_latency)
+        message = json.loads(payload.decode("utf-8"))
+        self.published.append(
+            PublishedFrame(
+                topic=topic,
+                message=message,
+                reliable=reliable,
+                duration=time.perf_counter() - start,
+            )
+        )
+
+    def messages(self, message_type: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Published messages, optionally only those of one "type"."""
+        return [
+            f.message
+            for f in self.published
+            if message_type is None or f.message.get("type") == message_type
+        ]
+
+
+class FakeRoom:
+    """Just enough of rtc.Room for the tool helpers: a name and a local participant."""
+
+    def __init__(self, name: str = "sim-room", publish_latency: float = 0.0) -> None:
+        self.name = name
+        self.local_participant = FakeLocalParticipant(publish_latency=publish_latency)
+        self.remote_participants: Dict[str, Any] = {}
+
+    def isconnected(self) -> bool:
+        return True
+
+
+@dataclass
+class FakeSpeech:
+    """A say() or generate_reply() call recorded by FakeSession."""
+
+    text: Optional[str] = None
+    instructions: Optional[str] = None
+    audio_frames: int = 0
+
+
+class FakeSession:
+    """
+    Stands in for AgentSession as seen from RestaurantAssistant and its tools.
+
+    Exposes .room (what the tool helpers read) and records speech requests.
+    """
+
+    def __init__(self, room: FakeRoom, userdata: Any = None) -> None:
+        self.room = room
+        self.userdata = userdata
+        self.speeches: List[FakeSpeech] = []
+
+    async def _consume_audio(self, audio: AsyncIterator[rtc.AudioFrame], speech: FakeSpeech) -> None:
+        async for _ in audio:
+            speech.audio_frames += 1
+
+    def say(self, text: str, *, audio: Optional[AsyncIterator[rtc.AudioFrame]] = None, **kwargs) -> FakeSpeech:
+        speech = FakeSpeech(text=text)
+        self.speeches.append(speech)
+        if audio is not None:
+            asyncio.ensure_future(self._consume_audio(audio, speech))
+        return speech
+
+    def generate_reply(self, *, instructions: Optional[str] = None, **kwargs) -> FakeSpeech:
+        speech = FakeSpeech(instructions=instructions)
+        self.speeches.append(speech)
+        return speech
+
+
+class FakeSTT:
+    """Returns the scripted transcript after a fixed end-of-utterance delay."""
+
+    def __init__(self, final_transcript_delay: float = 0.05) -> None:
+        self.final_transcript_delay = final_transcript_delay
+
+    async def transcribe(self, spoken_text: str) -> str:
+        await asyncio.sleep(self.final_transcript_delay)
+        return spoken_text
+
+
+@dataclass
+class FakeLLMResponse:
+    tool_calls: List[Tuple[str, Dict[str, Any]]] = field(default_factory=list)
+    text: str = ""
+
+
+class FakeLLM:
+    """
+    Replays scripted responses with a time-to-first-token that grows with the
+    prompt, so context growth over a conversation shows up in the numbers.
+
+    per_uncached_token_latency models prompt caching: the stable prefix
+    (instructions and tool schemas) is cached by the provider after the first
+    request, so only the remaining tokens add prefill time.
+    """
+
+    def __init__(
+        self,
+        time_to_first_token: float = 0.1,
+        per_message_latency: float = 0.001,
+        per_uncached_token_latency: float = 0.0,
+    ) -> None:
+        self.time_to_first_token = time_to_first_token
+        self.per_message_latency = per_message_latency
+        self.per_uncached_token_latency = per_uncached_token_latency
+
+    async def respond(
+        self, chat_items: int, response: FakeLLMResponse, uncached_tokens: int = 0
+    ) -> FakeLLMResponse:
+        await asyncio.sleep(
+            self.time_to_first_token
+            + chat_items * self.per_message_latency
+            + uncached_tokens * self.per_uncached_token_latency
+        )
+        return response
+
+
+class FakeTTS:
+    """
+    Produces silent audio frames for a text after a fixed first-frame delay.
+
+    Mirrors the parts of a LiveKit TTS used by this repo: sample_rate,
+    num_channels, and an async stream of rtc.AudioFrame per synthesized text.
+    """
+
+    def __init__(
+        self,
+        first_frame_delay: float = 0.08,
+        sample_rate: int = 24000,
+        num_channels: int = 1,
+        frame_ms: int = 20,
+        ms_per_char: int = 60,
+    ) -> None:
+        self.first_frame_delay = first_frame_delay
+        self.sample_rate = sample_rate
+        self.num_channels = num_channels
+        self.frame_ms = frame_ms
+        self.ms_per_char = ms_per_char
+        self.synthesized: List[str] = []
+
+    async def synthesize_frames(self, text: str) -> AsyncIterator[rtc.AudioFrame]:
+        self.synthesized.append(text)
+        await asyncio.sleep(self.first_frame_delay)
+        samples_per_frame = self.sample_rate * self.frame_ms // 1000
+        num_frames = max(1, len(text) * self.ms_per_char // self.frame_ms)
+        for _ in range(num_frames):
+            yield rtc.AudioFrame.create(self.sample_rate, self.num_channels, samples_per_frame)
@@ -0,0 +1,197 @@
+"""
+End-to-end latency benchmark for RestaurantAssistant.
+
+Drives the real assistant (real RAG, real cart/navigation/order tools) through
+scripted conversations, with local stand-ins for STT, LLM, TTS and the room.
+Every turn is timed per stage:
+
+- stt: end of caller speech -> final transcript (stand-in delay)
+- retrieval: search_menu inside on_user_turn_completed
+- context_injection: the rest of on_user_turn_completed (including the FAQ match)
+- faq_fast_path: on_user_turn_completed for turns answered from the FAQ index
+  (these turns have no llm or tool stages)
+- llm: time to first token (stand-in delay, plus prefill of the uncached prompt)
+- tool.<name>: each tool call, including its publish
+- publish.<type>: each publish_data frame on its own
+- tts_first_frame: reply text -> first audio frame (stand-in delay)
+- turn_total: end of caller speech -> first audio frame
+"""
+
+import asyncio
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Optional, Sequence
+
+from livekit.agents import ChatContext, StopResponse
+
+import agent as agent_module
+from agent import RestaurantAssistant
+from phrase_cache import PhraseCache
+from prompt_budget import measure as measure_prompt
+from simulation.conversations import DEFAULT_CONVERSATIONS, ScriptedConversation
+from simulation.fakes import FakeLLM, FakeRoom, FakeSession, FakeSTT, FakeTTS
+from simulation.latency import LatencyRecorder
+
+# Recorder for the conversation running in the current task; lets concurrent
+# simulated sessions share the one patched search_menu.
+_CURRENT_RECORDER: ContextVar[Optional[LatencyRecorder]] = ContextVar(
+    "simulation_recorder", default=None
+)
+
+
+@dataclass
+class SimulatedProviders:
+    """The stand-in plugins a simulated session runs with."""
+
+    stt: FakeSTT
+    llm: FakeLLM
+    tts: FakeTTS
+    publish_latency: float = 0.0
+
+    @classmethod
+    def zero_latency(cls) -> "SimulatedProviders":
+        """Providers that add no delay, so only our own code is measured."""
+        return cls(
+            stt=FakeSTT(final_transcript_delay=0.0),
+            llm=FakeLLM(time_to_first_token=0.0, per_message_latency=0.0),
+            tts=FakeTTS(first_frame_delay=0.0),
+        )
+
+
+class SimulatedAssistant(RestaurantAssistant):
+    """RestaurantAssistant bound to a FakeSession instead of a running AgentSession."""
+
+    def __init__(
+        self,
+        session: FakeSession,
+        context_mode: Optional[str] = None,
+        phrase_cache: Optional[PhraseCache] = None,
+    ) -> None:
+        super().__init__(context_mode=context_mode, phrase_cache=phrase_cache)
+        self._simulated_session = session
+
+    @property
+    def session(self) -> FakeSession:
+        return self._simulated_session
+
+
+def _install_retrieval_timer() -> None:
+    """Wrap agent.search_menu once so retrieval time lands in the current recorder."""
+    if getattr(agent_module.search_menu, "_is_simulation_timer", False):
+        return
+    original = agent_module.search_menu
+
+    def timed_search_menu(*args, **kwargs):
+        recorder = _CURRENT_RECORDER.get()
+        if recorder is None:
+            return original(*args, **kwargs)
+        with recorder.measure("retrieval"):
+            return original(*args, **kwargs)
+
+    timed_search_menu._is_simulation_timer = True
+    agent_module.search_menu = timed_search_menu
+
+
+async def run_conversation(
+    conversation: ScriptedConversation,
+    providers: SimulatedProviders,
+    recorder: LatencyRecorder,
+    room_name: str = "sim-room",
+    context_mode: Optional[str] = None,
+) -> SimulatedAssistant:
+    """Play one scripted conversation through a fresh assistant, recording stage latencies."""
+    _install_retrieval_timer()
+    _CURRENT_RECORDER.set(recorder)
+
+    room = FakeRoom(room_name, publish_latency=providers.publish_latency)
+    assistant = SimulatedAssistant(FakeSession(room), context_mode=context_mode)
+    chat_ctx = ChatContext.empty()
+    published = room.local_participant.published
+
+    for turn in conversation.turns:
+        turn_start = time.perf_counter()
+
+        with recorder.measure("stt"):
+            transcript = await providers.stt.transcribe(turn.user_text)
+
+        turn_ctx = chat_ctx.copy()
+        message = turn_ctx.add_message(role="user", content=transcript)
+        retrieval_samples = len(recorder.samples["retrieval"])
+        hook_start = time.perf_counter()
+        fast_answer = None
+        try:
+            await assistant.on_user_turn_completed(turn_ctx, message)
+        except StopResponse:
+            # FAQ fast path: the answer was handed to session.say, no LLM turn
+            fast_answer = assistant.session.speeches[-1].text
+        hook_time = time.perf_counter() - hook_start
+        retrieval_time = sum(recorder.samples["retrieval"][retrieval_samples:])
+        recorder.record("context_injection", max(0.0, hook_time - retrieval_time))
+        chat_ctx.add_message(role="user", content=transcript)
+
+        if fast_answer is not None:
+            recorder.record("faq_fast_path", hook_time)
+            await _speak(providers, recorder, fast_answer, turn_start)
+            chat_ctx.add_message(role="assistant", content=fast_answer)
+            continue
+
+        # Instructions and tool schemas are the cacheable prefix; the rest is prefilled per turn
+        usage = measure_prompt(turn_ctx, assistant.tools)
+        with recorder.measure("llm"):
+            response = await providers.llm.respond(
+                len(turn_ctx.items), turn.response, uncached_tokens=usage.rag_context + usage.history
+            )
+
+        for tool_name, arguments in response.tool_calls:
+            published_before = len(published)
+            with recorder.measure(f"tool.{tool_name}"):
+                await getattr(assistant, tool_name)(None, **arguments)
+            for frame in published[published_before:]:
+                recorder.record(f"publish.{frame.message.get('type')}", frame.duration)
+
+        await _speak(providers, recorder, response.text, turn_start)
+        chat_ctx.add_message(role="assistant", content=response.text)
+
+    return assistant
+
+
+async def _speak(providers: SimulatedProviders, recorder: LatencyRecorder, text: str, turn_start: float) -> None:
+    tts_start = time.perf_counter()
+    first_frame = True
+    async for _ in providers.tts.synthesize_frames(text):
+        if first_frame:
+            now = time.perf_counter()
+            recorder.record("tts_first_frame", now - tts_start)
+            recorder.record("turn_total", now - turn_start)
+            first_frame = False
+
+
+async def run_benchmark(
+    iterations: int = 10,
+    providers: Optional[SimulatedProviders] = None,
+    conversations: Sequence[ScriptedConversation] = DEFAULT_CONVERSATIONS,
+    wait_for_index: bool = True,
+    context_mode: Optional[str] = None,
+) -> LatencyRecorder:
+    """
+    Run every conversation `iterations` times, one after another.
+
+    With wait_for_index the vector index is loaded (or built) before timing
+    starts; otherwise early turns may be answered by the lexical fallback.
+    """
+    providers = providers or SimulatedProviders.zero_latency()
+    if wait_for_index:
+        await asyncio.to_thread(agent_module.get_index)
+
+    recorder = LatencyRecorder()
+    for i in range(iterations):
+        for conversation in conversations:
+            await run_conversation(
+                conversation,
+                providers,
+                recorder,
+                room_name=f"sim-{conversation.name}-{i}",
+                context_mode=context_mode,
+            )
+    return recorder
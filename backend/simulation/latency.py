@@ -0,0 +1,107 @@
+"""
+Per-stage latency recording, percentile summaries and baseline comparison.
+"""
+
+import json
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Sequence
+
+# Summary shape: {stage: {"count": n, "p50": s, "p95": s, "p99": s, "mean": s}}
+LatencySummary = Dict[str, Dict[str, float]]
+
+
+def percentile(sorted_samples: Sequence[float], pct: float) -> float:
+    """Linear-interpolated percentile of already-sorted samples (pct in 0..100)."""
+    if not sorted_samples:
+        return 0.0
+    rank = (len(sorted_samples) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(sorted_samples) - 1)
+    return sorted_samples[low] + (sorted_samples[high] - sorted_samples[low]) * (rank - low)
+
+
+class LatencyRecorder:
+    """Collects latency samples (seconds) per named stage."""
+
+    def __init__(self) -> None:
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+
+    def record(self, stage: str, seconds: float) -> None:
+        self.samples[stage].append(seconds)
+
+    @contextmanager
+    def measure(self, stage: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start)
+
+    def merge(self, other: "LatencyRecorder") -> None:
+        for stage, samples in other.samples.items():
+            self.samples[stage].extend(samples)
+
+    def summary(self) -> LatencySummary:
+        result = {}
+        for stage in sorted(self.samples):
+            ordered = sorted(self.samples[stage])
+            result[stage] = {
+                "count": len(ordered),
+                "p50": percentile(ordered, 50),
+                "p95": percentile(ordered, 95),
+                "p99": percentile(ordered, 99),
+                "mean": sum(ordered) / len(ordered),
+            }
+        return result
+
+
+def format_summary(summary: LatencySummary) -> str:
+    """Fixed-width table of a summary, in milliseconds."""
+    lines = [f"{'stage':<36} {'count':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}"]
+    for stage, stats in summary.items():
+        lines.append(
+            f"{stage:<36} {stats['count']:>6} {stats['p50'] * 1000:>9.2f} "
+            f"{stats['p95'] * 1000:>9.2f} {stats['p99'] * 1000:>9.2f}"
+        )
+    return "\n".join(lines)
+
+
+def save_baseline(summary: LatencySummary, path: Path) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(summary, indent=2, sort_keys=True), encoding="utf-8")
+
+
+def load_baseline(path: Path) -> LatencySummary:
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def compare_to_baseline(
+    summary: LatencySummary,
+    baseline: LatencySummary,
+    tolerance: float = 0.25,
+    min_delta: float = 0.002,
+    metrics: Sequence[str] = ("p50", "p95"),
+) -> List[str]:
+    """
+    List the regressions of summary against baseline.
+
+    A metric regresses when it is more than `tolerance` (fractional) slower
+    than the baseline and the absolute slowdown exceeds `min_delta` seconds,
+    so sub-millisecond jitter on fast stages doesn't trip the check.
+    Stages missing from either side are ignored.
+    """
+    regressions = []
+    for stage, stats in summary.items():
+        if stage not in baseline:
+            continue
+        for metric in metrics:
+            before = baseline[stage][metric]
+            after = stats[metric]
+            if after - before > min_delta and after > before * (1 + tolerance):
+                regressions.append(
+                    f"{stage} {metric}: {before * 1000:.2f} ms -> {after * 1000:.2f} ms"
+                )
+    return regressions
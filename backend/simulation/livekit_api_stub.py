@@ -0,0 +1,98 @@
+"""
+Local stand-in for the LiveKit server API (the Twirp RoomService and
+AgentDispatchService endpoints the token server calls).
+
+It speaks the same protobuf-over-HTTP protocol as a real server, checks the
+bearer token is signed with the configured secret and carries the needed
+grants, and records every room and dispatch created, so the token server's
+/bootstrap endpoint can be exercised end to end without LiveKit.
+
+    stub = LiveKitApiStub("devkey", "devsecret")
+    with stub.running() as url:
+        ...  # point LIVEKIT_URL at url
+    stub.rooms, stub.dispatches
+"""
+
+import asyncio
+import threading
+import uuid
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+from aiohttp import web
+from livekit import api
+
+
+class LiveKitApiStub:
+    def __init__(self, api_key: str, api_secret: str) -> None:
+        self._verifier = api.TokenVerifier(api_key, api_secret)
+        self.rooms: Dict[str, api.Room] = {}
+        self.dispatches: List[api.AgentDispatch] = []
+        # Optional artificial latency per call, to see what the caller waits on
+        self.latency = 0.0
+
+    def _authorize(self, request: web.Request, grant: str) -> Optional[web.Response]:
+        header = request.headers.get("Authorization", "")
+        try:
+            claims = self._verifier.verify(header.removeprefix("Bearer "))
+        except Exception:
+            return web.json_response({"code": "unauthenticated", "msg": "invalid token"}, status=401)
+        if not getattr(claims.video, grant, False):
+            return web.json_response({"code": "permission_denied", "msg": f"missing {grant}"}, status=403)
+        return None
+
+    async def _create_room(self, request: web.Request) -> web.Response:
+        denied = self._authorize(request, "room_create")
+        if denied is not None:
+            return denied
+        await asyncio.sleep(self.latency)
+        create = api.CreateRoomRequest.FromString(await request.read())
+        # Like the real server: creating an existing room returns it
+        room = self.rooms.get(create.name) or api.Room(
+            sid=f"RM_{uuid.uuid4().hex[:12]}",
+            name=create.name,
+            empty_timeout=create.empty_timeout,
+            metadata=create.metadata,
+        )
+        self.rooms[create.name] = room
+        return web.Response(body=room.SerializeToString(), content_type="application/protobuf")
+
+    async def _create_dispatch(self, request: web.Request) -> web.Response:
+        denied = self._authorize(request, "room_admin")
+        if denied is not None:
+            return denied
+        await asyncio.sleep(self.latency)
+        create = api.CreateAgentDispatchRequest.FromString(await request.read())
+        dispatch = api.AgentDispatch(
+            id=f"AD_{uuid.uuid4().hex[:12]}",
+            agent_name=create.agent_name,
+            room=create.room,
+            metadata=create.metadata,
+        )
+        self.dispatches.append(dispatch)
+        return web.Response(body=dispatch.SerializeToString(), content_type="application/protobuf")
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post("/twirp/livekit.RoomService/CreateRoom", self._create_room)
+        app.router.add_post("/twirp/livekit.AgentDispatchService/CreateDispatch", self._create_dispatch)
+        return app
+
+    @contextmanager
+    def running(self, host: str = "127.0.0.1") -> Iterator[str]:
+        """Serve on a free port in a background thread; yields the base URL."""
+        loop = asyncio.new_event_loop()
+        runner = web.AppRunner(self.app())
+        loop.run_until_complete(runner.setup())
+        site = web.TCPSite(runner, host, 0)
+        loop.run_until_complete(site.start())
+        port = site._server.sockets[0].getsockname()[1]
+        thread = threading.Thread(target=loop.run_forever, name="livekit-api-stub", daemon=True)
+        thread.start()
+        try:
+            yield f"http://{host}:{port}"
+        finally:
+            asyncio.run_coroutine_threadsafe(runner.cleanup(), loop).result(timeout=5)
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join(timeout=5)
+            loop.close()
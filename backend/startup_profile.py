@@ -0,0 +1,209 @@
+"""
+Startup-time profile: what a worker and each job process pay before they
+can take a call.
+
+Two parts are timed:
+
+- imports: `import agent` in a fresh interpreter under `python -X importtime`,
+  so nothing this process already imported hides the cost. Self time is
+  summed per top-level package (livekit, llama_index, numpy, ...)
+- initialization: the steps prewarm runs, each wrapped in startup_step().
+  Running workers log the same breakdown when prewarm finishes, and the
+  background index load is recorded as index_load
+
+Usage:
+    python backend/agent.py startup-profile                   # report and compare
+    python backend/agent.py startup-profile --save-baseline   # store as the new baseline
+    python backend/agent.py startup-profile --runs 5 --top 30
+"""
+
+import argparse
+import logging
+import os
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Callable, Dict, Iterator, List, Sequence
+
+logger = logging.getLogger("restaurant.startup")
+
+BACKEND_DIR = Path(__file__).parent
+PROJECT_ROOT = BACKEND_DIR.parent
+DEFAULT_BASELINE = PROJECT_ROOT / "benchmarks" / "startup_baseline.json"
+
+# Step name -> seconds, for this process
+_STEPS: Dict[str, float] = {}
+
+
+@contextmanager
+def startup_step(name: str) -> Iterator[None]:
+    """Time one startup step of this process (see startup_steps)."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _STEPS[name] = time.perf_counter() - start
+
+
+def startup_steps() -> Dict[str, float]:
+    """Seconds per startup step this process has finished, in the order they finished."""
+    return dict(_STEPS)
+
+
+@dataclass(frozen=True)
+class ImportTiming:
+    module: str
+    self_seconds: float
+    cumulative_seconds: float
+    # Nesting level in the import tree (0 = imported by the profiled statement itself)
+    depth: int
+
+    @property
+    def package(self) -> str:
+        return self.module.split(".")[0]
+
+
+def parse_importtime(output: str) -> List[ImportTiming]:
+    """Timings from `python -X importtime` stderr ("import time: self | cumulative | module")."""
+    timings = []
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:") :].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            # The header line
+            continue
+        name = fields[2].rstrip()
+        indent = len(name) - len(name.lstrip())
+        timings.append(
+            ImportTiming(
+                module=name.strip(),
+                self_seconds=int(fields[0]) / 1e6,
+                cumulative_seconds=int(fields[1]) / 1e6,
+                depth=(indent - 1) // 2,
+            )
+        )
+    return timings
+
+
+def import_tree(timings: Sequence[ImportTiming], module: str) -> List[ImportTiming]:
+    """The timings of `module` and everything its import pulled in (not interpreter startup)."""
+    # -X importtime prints a module after everything it imported
+    end = next((i for i, t in enumerate(timings) if t.module == module and t.depth == 0), None)
+    if end is None:
+        return []
+    start = end
+    while start > 0 and timings[start - 1].depth > 0:
+        start -= 1
+    return list(timings[start : end + 1])
+
+
+def measure_imports(module: str = "agent") -> List[ImportTiming]:
+    """Import timings of `module` in a fresh interpreter run from backend/."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR,
+        env=dict(os.environ, PYTHONDONTWRITEBYTECODE="1"),
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        tail = "\n".join(result.stderr.splitlines()[-20:])
+        raise SystemExit(f"import {module} failed:\n{tail}")
+    return import_tree(parse_importtime(result.stderr), module)
+
+
+def package_totals(timings: Sequence[ImportTiming]) -> Dict[str, float]:
+    """Self time summed per top-level package, slowest first."""
+    totals: Dict[str, float] = defaultdict(float)
+    for timing in timings:
+        totals[timing.package] += timing.self_seconds
+    return dict(sorted(totals.items(), key=lambda item: -item[1]))
+
+
+def import_total(timings: Sequence[ImportTiming]) -> float:
+    return sum(t.self_seconds for t in timings)
+
+
+def run_prewarm(prewarm: Callable) -> Dict[str, float]:
+    """Run prewarm in this process and wait for the background index load."""
+    import rag_engine
+
+    proc = SimpleNamespace(userdata={})
+    started = time.perf_counter()
+    with startup_step("prewarm"):
+        prewarm(proc)
+    rag_engine.get_index()
+    steps = startup_steps()
+    steps["index_ready"] = time.perf_counter() - started
+    return steps
+
+
+def format_report(timings: Sequence[ImportTiming], steps: Dict[str, float], top: int = 15) -> str:
+    lines = [f"import agent: {import_total(timings) * 1000:.0f} ms", "", f"{'package (self time)':<44} {'ms':>9}"]
+    for package, seconds in list(package_totals(timings).items())[:top]:
+        lines.append(f"{package:<44} {seconds * 1000:>9.1f}")
+    lines += ["", f"{'slowest modules (cumulative)':<44} {'ms':>9}"]
+    for timing in sorted(timings, key=lambda t: -t.cumulative_seconds)[:top]:
+        lines.append(f"{timing.module:<44} {timing.cumulative_seconds * 1000:>9.1f}")
+    if steps:
+        lines += ["", f"{'startup step':<44} {'ms':>9}"]
+        for name, seconds in steps.items():
+            lines.append(f"{name:<44} {seconds * 1000:>9.1f}")
+    return "\n".join(lines)
+
+
+def main(argv: Sequence[str], prewarm: Callable) -> None:
+    from simulation.latency import LatencyRecorder, compare_to_baseline, format_summary, load_baseline, save_baseline
+
+    parser = argparse.ArgumentParser(
+        prog="agent.py startup-profile", description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--runs", type=int, default=3, help="Fresh interpreters to time `import agent` in.")
+    parser.add_argument("--top", type=int, default=15, help="Packages and modules to list.")
+    parser.add_argument("--no-prewarm", action="store_true", help="Time imports only.")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE, help="Baseline JSON file.")
+    parser.add_argument("--save-baseline", action="store_true", help="Overwrite the baseline with this run.")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed fractional slowdown.")
+    args = parser.parse_args(argv)
+
+    recorder = LatencyRecorder()
+    runs = [measure_imports() for _ in range(max(1, args.runs))]
+    for timings in runs:
+        recorder.record("import.total", import_total(timings))
+        for package, seconds in list(package_totals(timings).items())[: args.top]:
+            recorder.record(f"import.{package}", seconds)
+
+    steps = {} if args.no_prewarm else run_prewarm(prewarm)
+    for name, seconds in steps.items():
+        recorder.record(f"startup.{name}", seconds)
+
+    print(format_report(runs[0], steps, top=args.top))
+    summary = recorder.summary()
+    print()
+    print(format_summary(summary))
+
+    if args.save_baseline:
+        save_baseline(summary, args.baseline)
+        print(f"\nBaseline saved to {args.baseline}")
+        return
+
+    if not args.baseline.exists():
+        print(f"\nNo baseline at {args.baseline}; run with --save-baseline to create one.")
+        return
+
+    # Startup steps are tens to thousands of ms: ignore sub-20 ms jitter
+    regressions = compare_to_baseline(
+        summary, load_baseline(args.baseline), tolerance=args.tolerance, min_delta=0.02, metrics=("p50",)
+    )
+    if regressions:
+        print("\nREGRESSIONS vs baseline:")
+        for line in regressions:
+            print(f"  {line}")
+        sys.exit(1)
+    print("\nOK: no regressions vs baseline")
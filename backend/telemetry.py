@@ -0,0 +1,201 @@
+"""
+Per-turn tracing and Prometheus metrics for the agent hot path.
+
+Spans time a named block (a turn hook, a retrieval step, a tool, a publish)
+and feed one histogram, labelled with the room and session bound to the
+current async context. Metrics are served at /metrics by the worker's local
+admin server. Recording a span is a perf_counter pair and one histogram
+observe, so it stays negligible next to a voice turn.
+"""
+
+import functools
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, Sequence, Set, Tuple
+
+from prometheus_client import REGISTRY, CONTENT_TYPE_LATEST, Counter, Histogram, generate_latest
+
+from admin_server import register_route
+from logging_setup import log_transcript
+
+_LABELS = ("room", "session")
+
+SPAN_SECONDS = Histogram(
+    "agent_span_seconds",
+    "Duration of traced agent operations.",
+    ("span",) + _LABELS,
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+SPAN_ERRORS = Counter(
+    "agent_span_errors_total",
+    "Traced agent operations that raised.",
+    ("span",) + _LABELS,
+)
+DATA_MESSAGES = Counter(
+    "agent_data_messages_total",
+    "Data messages published to the frontend.",
+    ("message_type", "outcome") + _LABELS,
+)
+PROMPT_TOKENS = Histogram(
+    "agent_prompt_tokens",
+    "Tokens per LLM request, by prompt component (after budget trimming).",
+    ("component",) + _LABELS,
+    buckets=(50, 100, 250, 500, 1000, 1500, 2000, 3000, 4000, 6000, 8000, 12000),
+)
+PROMPT_TRIMS = Counter(
+    "agent_prompt_trims_total",
+    "Trim actions applied to keep LLM requests within the token budget.",
+    ("action",) + _LABELS,
+)
+FAQ_FAST_PATH = Counter(
+    "agent_faq_fast_path_total",
+    "User turns that matched an FAQ intent, by whether the canonical answer was spoken.",
+    ("intent", "outcome") + _LABELS,
+)
+# Labelled by latency profile rather than session, to compare profiles on live traffic
+PIPELINE_LATENCY = Histogram(
+    "agent_pipeline_latency_seconds",
+    "Voice pipeline latency reported by the session, by stage and latency profile.",
+    ("stage", "profile"),
+    buckets=(0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 5.0),
+)
+LLM_HTTP_CONNECTIONS = Counter(
+    "agent_llm_http_connections_total",
+    "LLM HTTP requests by whether they reused a pooled connection or opened a new one.",
+    ("outcome",),
+)
+LLM_HTTP_POOL_WAIT = Histogram(
+    "agent_llm_http_pool_wait_seconds",
+    "Time an LLM HTTP request waited for a connection from the shared pool.",
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+LLM_HEDGES = Counter(
+    "agent_llm_hedge_total",
+    "Hedged LLM requests, by whether the primary started in time or the fallback model was raced.",
+    ("outcome",),
+)
+LLM_HEDGE_SAVED = Histogram(
+    "agent_llm_hedge_saved_seconds",
+    "How much sooner the fallback model's first token came than the primary's, when it won.",
+    buckets=(0.05, 0.1, 0.25, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 5.0),
+)
+PROVIDER_CHECKOUTS = Counter(
+    "agent_provider_checkouts_total",
+    "Sessions' STT/LLM/TTS provider sets, by whether they came pre-connected from the pool.",
+    ("profile", "outcome"),
+)
+
+# Room / session of the job running in the current async context. Tasks spawned
+# by AgentSession inherit these from the entrypoint that bound them.
+_ROOM: ContextVar[str] = ContextVar("telemetry_room", default="")
+_SESSION: ContextVar[str] = ContextVar("telemetry_session", default="")
+
+# Label sets created per session, so they can be dropped when the session ends
+_SESSION_SERIES: Dict[Tuple[str, str], Set[Tuple[object, Tuple[str, ...]]]] = {}
+
+
+def bind_session(room: str, session: str) -> None:
+    """Label everything recorded from this async context on with room and session."""
+    _ROOM.set(room)
+    _SESSION.set(session)
+
+
+def current_labels() -> Tuple[str, str]:
+    return _ROOM.get(), _SESSION.get()
+
+
+def release_session(room: str, session: str) -> None:
+    """Drop the session's series so per-session labels don't accumulate in a long-lived worker."""
+    for metric, label_values in _SESSION_SERIES.pop((room, session), ()):
+        try:
+            metric.remove(*label_values)
+        except KeyError:
+            pass
+
+
+def _labels(metric, *values: str):
+    room, session = current_labels()
+    label_values = values + (room, session)
+    _SESSION_SERIES.setdefault((room, session), set()).add((metric, label_values))
+    return metric.labels(*label_values)
+
+
+def observe_span(name: str, seconds: float) -> None:
+    _labels(SPAN_SECONDS, name).observe(seconds)
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    """Time the enclosed block into agent_span_seconds{span=name}."""
+    start = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        _labels(SPAN_ERRORS, name).inc()
+        raise
+    finally:
+        observe_span(name, time.perf_counter() - start)
+
+
+def traced_tool(func):
+    """Wrap an async @function_tool method in a "tool.<name>" span (apply under @function_tool)."""
+    name = f"tool.{func.__name__}"
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        log_transcript("tool_call", tool=func.__name__)
+        with span(name):
+            return await func(*args, **kwargs)
+
+    return wrapper
+
+
+def count_data_message(message_type: str, success: bool) -> None:
+    _labels(DATA_MESSAGES, message_type, "ok" if success else "error").inc()
+
+
+def record_prompt_usage(components: Dict[str, int], trimmed: Sequence[str]) -> None:
+    for component, tokens in components.items():
+        _labels(PROMPT_TOKENS, component).observe(tokens)
+    _labels(PROMPT_TOKENS, "total").observe(sum(components.values()))
+    for action in trimmed:
+        _labels(PROMPT_TRIMS, action).inc()
+
+
+def count_faq_fast_path(intent: str, answered: bool) -> None:
+    _labels(FAQ_FAST_PATH, intent, "answered" if answered else "below_threshold").inc()
+
+
+def observe_pipeline_metrics(profile: str, metrics) -> None:
+    """Record an AgentSession metrics event: end of turn, LLM first token, TTS first byte."""
+    if metrics.type == "eou_metrics":
+        PIPELINE_LATENCY.labels("end_of_utterance", profile).observe(metrics.end_of_utterance_delay)
+    elif metrics.type == "llm_metrics" and not metrics.cancelled:
+        PIPELINE_LATENCY.labels("llm_ttft", profile).observe(metrics.ttft)
+    elif metrics.type == "tts_metrics" and not metrics.cancelled:
+        PIPELINE_LATENCY.labels("tts_ttfb", profile).observe(metrics.ttfb)
+
+
+def count_provider_checkout(profile: str, warm: bool) -> None:
+    PROVIDER_CHECKOUTS.labels(profile, "warm" if warm else "cold").inc()
+
+
+def observe_llm_connection(reused: bool, pool_wait: float) -> None:
+    LLM_HTTP_CONNECTIONS.labels("reused" if reused else "new").inc()
+    LLM_HTTP_POOL_WAIT.observe(pool_wait)
+
+
+def observe_llm_hedge(outcome: str) -> None:
+    LLM_HEDGES.labels(outcome).inc()
+
+
+def observe_llm_hedge_saved(seconds: float) -> None:
+    LLM_HEDGE_SAVED.observe(seconds)
+
+
+def _metrics_route(params: Dict[str, str]) -> Tuple[int, str, bytes]:
+    return 200, CONTENT_TYPE_LATEST, generate_latest(REGISTRY)
+
+
+register_route("/metrics", _metrics_route)
@@ -0,0 +1,151 @@
+"""
+Load test for the token server: requests/s and tail latency.
+
+Sends POST /token from `--concurrency` concurrent clients. Each client picks
+from `--identities` (identity, room) pairs, so the mix of reconnects (cache
+hits) and new sessions is controllable: fewer identities means more repeats.
+
+Against a running server:
+    python backend/token_load_bench.py --url http://127.0.0.1:8000/token --requests 20000 --concurrency 64
+Or start one for the run (needs the LiveKit env vars, as the server does):
+    python backend/token_load_bench.py --start-server --workers 4
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import List, Optional, Sequence
+
+import aiohttp
+
+from simulation.latency import percentile
+
+PROJECT_ROOT = Path(__file__).parent.parent
+
+
+async def _client(
+    session: aiohttp.ClientSession,
+    url: str,
+    requests: int,
+    identities: int,
+    latencies: List[float],
+    errors: List[str],
+) -> None:
+    for _ in range(requests):
+        user = random.randrange(identities)
+        payload = {"room_name": f"load-room-{user}", "identity": f"load-user-{user}"}
+        start = time.perf_counter()
+        try:
+            async with session.post(url, json=payload) as resp:
+                await resp.read()
+                if resp.status != 200:
+                    errors.append(str(resp.status))
+                    continue
+        except aiohttp.ClientError as e:
+            errors.append(type(e).__name__)
+            continue
+        latencies.append(time.perf_counter() - start)
+
+
+async def run_load(url: str, total_requests: int, concurrency: int, identities: int) -> dict:
+    latencies: List[float] = []
+    errors: List[str] = []
+    # Spread the total over the clients; the first few take the remainder
+    per_client = [total_requests // concurrency + (i < total_requests % concurrency) for i in range(concurrency)]
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        # One untimed request per client opens its keep-alive connection
+        await asyncio.gather(*(_client(session, url, 1, identities, [], []) for _ in range(concurrency)))
+        start = time.perf_counter()
+        await asyncio.gather(
+            *(_client(session, url, count, identities, latencies, errors) for count in per_client)
+        )
+        elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "requests": len(latencies) + len(errors),
+        "errors": len(errors),
+        "seconds": elapsed,
+        "requests_per_second": (len(latencies) + len(errors)) / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "max_ms": (latencies[-1] * 1000) if latencies else 0.0,
+    }
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def _wait_healthy(base_url: str, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    async with aiohttp.ClientSession() as session:
+        while time.monotonic() < deadline:
+            try:
+                async with session.get(f"{base_url}/health") as resp:
+                    if resp.status == 200:
+                        return
+            except aiohttp.ClientError:
+                pass
+            await asyncio.sleep(0.2)
+    raise SystemExit(f"token server at {base_url} did not become healthy within {timeout:.0f}s")
+
+
+def _start_server(port: int, workers: int) -> subprocess.Popen:
+    return subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "backend.token_server:app",
+            "--host", "127.0.0.1", "--port", str(port),
+            "--workers", str(workers), "--log-level", "warning",
+        ],
+        cwd=PROJECT_ROOT,
+        env=os.environ.copy(),
+    )
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Token server load test.")
+    parser.add_argument("--url", default="http://127.0.0.1:8000/token", help="Token endpoint to load.")
+    parser.add_argument("--requests", type=int, default=10000, help="Total timed requests.")
+    parser.add_argument("--concurrency", type=int, default=64, help="Concurrent clients.")
+    parser.add_argument("--identities", type=int, default=200, help="Distinct identity/room pairs (repeats hit the cache).")
+    parser.add_argument("--start-server", action="store_true", help="Start the token server with uvicorn for this run.")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers when using --start-server.")
+    args = parser.parse_args(argv)
+
+    server = None
+    url = args.url
+    if args.start_server:
+        port = _free_port()
+        server = _start_server(port, args.workers)
+        url = f"http://127.0.0.1:{port}/token"
+    try:
+        if server is not None:
+            asyncio.run(_wait_healthy(url.rsplit("/", 1)[0]))
+        result = asyncio.run(run_load(url, args.requests, args.concurrency, args.identities))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=10)
+
+    print(
+        f"{result['requests']} requests in {result['seconds']:.2f}s: "
+        f"{result['requests_per_second']:.0f} req/s, {result['errors']} errors"
+    )
+    print(
+        f"latency p50 {result['p50_ms']:.2f} ms, p95 {result['p95_ms']:.2f} ms, "
+        f"p99 {result['p99_ms']:.2f} ms, max {result['max_ms']:.2f} ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
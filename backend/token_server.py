@@ -1,12 +1,33 @@
+"""
+LiveKit access-token server for the frontend.
+
+POST /token is async and signs on the event loop; signing an HS256 JWT takes
+microseconds, so there is no threadpool hop. A still-valid token for an
+identical (identity, room, grants, metadata, expiry) request is reused from a
+bounded cache, which absorbs frontend reconnect storms.
+
+Run with several workers for throughput (each keeps its own cache; tokens
+are self-contained JWTs, so any worker can serve any request):
+    uvicorn backend.token_server:app --port 8000 --workers 4
+Load test it with backend/token_load_bench.py.
+"""
+
+import json
 import os
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
 from datetime import timedelta
-from typing import Optional
+from typing import Callable, Hashable, Optional, Tuple
 
 from dotenv import load_dotenv
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 
+from livekit import api
 from livekit.api import AccessToken
 from livekit.api.access_token import VideoGrants
 
@@ -15,6 +36,10 @@ load_dotenv()
 LIVEKIT_API_KEY = os.getenv("LIVEKIT_API_KEY")
 LIVEKIT_API_SECRET = os.getenv("LIVEKIT_API_SECRET")
 LIVEKIT_URL = os.getenv("LIVEKIT_URL")
+# Must match the agent worker's AGENT_NAME (see session_factory.py)
+AGENT_NAME = os.getenv("AGENT_NAME", "restaurant-assistant")
+# Seconds a bootstrapped room stays open if the caller never joins
+BOOTSTRAP_ROOM_EMPTY_TIMEOUT = int(os.getenv("BOOTSTRAP_ROOM_EMPTY_TIMEOUT", "120"))
 
 if not LIVEKIT_API_KEY or not LIVEKIT_API_SECRET or not LIVEKIT_URL:
     # We don't raise here to keep FastAPI importable, but requests will fail with 500
@@ -30,6 +55,75 @@ if not LIVEKIT_API_KEY or not LIVEKIT_API_SECRET or not LIVEKIT_URL:
     print(f"WARNING: Missing LiveKit env vars: {', '.join(missing)}")
 
 
+@dataclass
+class CachedToken:
+    jwt: str
+    issued_at: float
+    expires_at: float
+
+
+class SignedTokenCache:
+    """
+    LRU of signed tokens by request. An entry is reused only while at least
+    `min_remaining` of its lifetime is left, so a client never gets a token
+    that is about to expire.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 10000,
+        min_remaining: float = 0.5,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.max_entries = max_entries
+        self.min_remaining = min_remaining
+        self._clock = clock
+        self._entries: "OrderedDict[Hashable, CachedToken]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _reusable(self, entry: CachedToken, now: float) -> bool:
+        lifetime = entry.expires_at - entry.issued_at
+        return entry.expires_at - now >= lifetime * self.min_remaining
+
+    def get(self, key: Hashable) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is not None and self._reusable(entry, self._clock()):
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry.jwt
+        if entry is not None:
+            del self._entries[key]
+        self.misses += 1
+        return None
+
+    def put(self, key: Hashable, jwt: str, ttl_seconds: float) -> None:
+        now = self._clock()
+        self._entries[key] = CachedToken(jwt, now, now + ttl_seconds)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get_or_sign(self, key: Hashable, ttl_seconds: float, sign: Callable[[], str]) -> Tuple[str, bool]:
+        """The cached token for key, or a newly signed one; returns (jwt, was_cached)."""
+        jwt = self.get(key)
+        if jwt is not None:
+            return jwt, True
+        jwt = sign()
+        self.put(key, jwt, ttl_seconds)
+        return jwt, False
+
+    def stats(self) -> dict:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+# Per worker process; size with TOKEN_CACHE_SIZE
+token_cache = SignedTokenCache(max_entries=int(os.getenv("TOKEN_CACHE_SIZE", "10000")))
+
+
 class TokenRequest(BaseModel):
     room_name: str
     identity: str
@@ -44,7 +138,45 @@ class TokenResponse(BaseModel):
     url: str
 
 
-app = FastAPI(title="LiveKit Token Server", version="1.0.0")
+class BootstrapRequest(BaseModel):
+    identity: str
+    # Optional: a fresh room is created per session if omitted
+    room_name: Optional[str] = None
+    metadata: Optional[str] = None
+    expires_in_hours: int = 6
+    # Optional: latency profile for the agent (see latency_profiles.py)
+    latency_profile: Optional[str] = None
+
+
+class BootstrapResponse(BaseModel):
+    token: str
+    url: str
+    room_name: str
+    dispatch_id: str
+
+
+# One LiveKit API client per worker, opened on first use so its HTTP
+# connections are reused across bootstrap requests
+_livekit_api: Optional[api.LiveKitAPI] = None
+
+
+def _get_livekit_api() -> api.LiveKitAPI:
+    global _livekit_api
+    if _livekit_api is None:
+        _livekit_api = api.LiveKitAPI(LIVEKIT_URL, LIVEKIT_API_KEY, LIVEKIT_API_SECRET)
+    return _livekit_api
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global _livekit_api
+    yield
+    if _livekit_api is not None:
+        await _livekit_api.aclose()
+        _livekit_api = None
+
+
+app = FastAPI(title="LiveKit Token Server", version="1.0.0", lifespan=lifespan)
 
 # Allow all origins in dev; tighten in production.
 app.add_middleware(
@@ -56,47 +188,109 @@ app.add_middleware(
 )
 
 
-@app.post("/token", response_model=TokenResponse)
-def create_token(req: TokenRequest) -> TokenResponse:
+def _require_config() -> None:
     if not LIVEKIT_API_KEY or not LIVEKIT_API_SECRET or not LIVEKIT_URL:
         raise HTTPException(
             status_code=500,
             detail="LiveKit configuration is missing on the server.",
         )
 
-    if not req.room_name.strip():
-        raise HTTPException(status_code=400, detail="room_name is required")
-    if not req.identity.strip():
-        raise HTTPException(status_code=400, detail="identity is required")
 
+def _participant_token(
+    room_name: str,
+    identity: str,
+    metadata: Optional[str],
+    expires_in_hours: int,
+    dispatch_agent: bool,
+) -> str:
+    """
+    A signed join token, reused from the cache for identical requests. With
+    dispatch_agent the token asks LiveKit to dispatch the agent when the
+    caller joins.
+    """
     # Configure grants – allow join, publish and subscribe in this room
     grants = VideoGrants(
-        room=req.room_name,
+        room=room_name,
         room_join=True,
         can_publish=True,
         can_subscribe=True,
     )
 
-    expires_in = timedelta(hours=max(1, req.expires_in_hours))
-    token_builder = (
-        AccessToken(LIVEKIT_API_KEY, LIVEKIT_API_SECRET)
-        .with_identity(req.identity)
-        .with_grants(grants)
-        .with_ttl(expires_in)
-    )
-    if req.metadata:
-        token_builder = token_builder.with_metadata(req.metadata)
+    expires_in = timedelta(hours=max(1, expires_in_hours))
+
+    def sign() -> str:
+        token_builder = (
+            AccessToken(LIVEKIT_API_KEY, LIVEKIT_API_SECRET)
+            .with_identity(identity)
+            .with_grants(grants)
+            .with_ttl(expires_in)
+        )
+        if metadata:
+            token_builder = token_builder.with_metadata(metadata)
+        if dispatch_agent and AGENT_NAME:
+            token_builder = token_builder.with_room_config(
+                api.RoomConfiguration(agents=[api.RoomAgentDispatch(agent_name=AGENT_NAME)])
+            )
+        return token_builder.to_jwt()
+
+    cache_key = (identity, room_name, repr(grants), metadata, expires_in, dispatch_agent)
+    jwt, _ = token_cache.get_or_sign(cache_key, expires_in.total_seconds(), sign)
+    return jwt
 
-    jwt = token_builder.to_jwt()
 
+@app.post("/token", response_model=TokenResponse)
+async def create_token(req: TokenRequest) -> TokenResponse:
+    _require_config()
+
+    if not req.room_name.strip():
+        raise HTTPException(status_code=400, detail="room_name is required")
+    if not req.identity.strip():
+        raise HTTPException(status_code=400, detail="identity is required")
+
+    jwt = _participant_token(req.room_name, req.identity, req.metadata, req.expires_in_hours, dispatch_agent=True)
     return TokenResponse(token=jwt, url=LIVEKIT_URL)
 
 
+@app.post("/bootstrap", response_model=BootstrapResponse)
+async def bootstrap_session(req: BootstrapRequest) -> BootstrapResponse:
+    """
+    Create the room, dispatch the agent and return the caller's token in one
+    request. The agent is dispatched with a warm-up hint, so it connects and
+    prepares its pipeline while the browser is still joining.
+    """
+    _require_config()
+
+    if not req.identity.strip():
+        raise HTTPException(status_code=400, detail="identity is required")
+    room_name = (req.room_name or "").strip() or f"order-{uuid.uuid4().hex[:12]}"
+
+    hints = {"warmup": True, "identity": req.identity}
+    if req.latency_profile:
+        hints["latency_profile"] = req.latency_profile
+
+    lkapi = _get_livekit_api()
+    try:
+        await lkapi.room.create_room(
+            api.CreateRoomRequest(name=room_name, empty_timeout=BOOTSTRAP_ROOM_EMPTY_TIMEOUT)
+        )
+        dispatch = await lkapi.agent_dispatch.create_dispatch(
+            api.CreateAgentDispatchRequest(agent_name=AGENT_NAME, room=room_name, metadata=json.dumps(hints))
+        )
+    except api.TwirpError as e:
+        raise HTTPException(status_code=502, detail=f"LiveKit API error: {e.message}") from e
+
+    # The agent is already dispatched; the caller's token must not dispatch another
+    jwt = _participant_token(room_name, req.identity, req.metadata, req.expires_in_hours, dispatch_agent=False)
+    return BootstrapResponse(token=jwt, url=LIVEKIT_URL, room_name=room_name, dispatch_id=dispatch.id)
+
+
 @app.get("/health")
 def health() -> dict:
     return {
         "status": "ok",
         "livekit_url": LIVEKIT_URL,
         "has_key": bool(LIVEKIT_API_KEY),
+        "pid": os.getpid(),
+        "token_cache": token_cache.stats(),
     }
 
@@ -3,9 +3,14 @@ Utility functions for sending data messages to the frontend.
 """
 
 import json
+import logging
 from typing import Dict, Any, Optional
 from livekit import rtc
 
+from telemetry import count_data_message, span
+
+logger = logging.getLogger("restaurant.message_sender")
+
 
 async def send_data_message(
     room: Optional[rtc.Room],
@@ -34,12 +39,15 @@ async def send_data_message(
             **data,
         }
         
-        await room.local_participant.publish_data(
-            json.dumps(data_message).encode("utf-8"),
-            topic=topic,
-            reliable=True,
-        )
+        with span("send_data_message"):
+            await room.local_participant.publish_data(
+                json.dumps(data_message).encode("utf-8"),
+                topic=topic,
+                reliable=True,
+            )
+        count_data_message(message_type, success=True)
         return True
     except Exception as e:
-        print(f"Error sending data message ({message_type}): {e}")
+        count_data_message(message_type, success=False)
+        logger.warning("error sending data message (%s): %s", message_type, e)
         return False
@@ -3,6 +3,7 @@ Helper functions for navigation operations.
 """
 
 from .message_sender import send_data_message
+from .order_helpers import cancel_pending_order
 
 
 async def handle_go_to_menu(agent_instance) -> str:
@@ -29,6 +30,9 @@ async def handle_cancel_payment(agent_instance) -> str:
     if not room:
         return "I'm having trouble processing your request right now. Please try again."
     
+    # The caller backed out of paying: the order they were sent to pay for isn't placed
+    await cancel_pending_order(room)
+    
     success = await send_data_message(
         room=room,
         message_type="cancel_payment",
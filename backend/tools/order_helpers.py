@@ -2,9 +2,89 @@
 Helper functions for order management operations.
 """
 
-from typing import Optional
+import asyncio
+import json
+import logging
+from typing import Optional, Set
+from livekit import rtc
+
+from order_store import STATUS_CANCELLED, STATUS_PENDING, STATUS_PLACED, get_order_store, new_order_id
 from .message_sender import send_data_message
 
+logger = logging.getLogger("restaurant.order_helpers")
+
+# Messages from the frontend about orders (payment confirmations)
+ORDERS_TOPIC = "orders"
+
+
+def _caller_identity(room: rtc.Room) -> str:
+    """Identity of the customer in the room (the room name if they've left)."""
+    for participant in room.remote_participants.values():
+        if participant.kind != rtc.ParticipantKind.PARTICIPANT_KIND_AGENT:
+            return participant.identity
+    return room.name
+
+
+async def _find_order(room: rtc.Room, order_id: Optional[str]):
+    """The caller's order with the given id, or their latest order."""
+    store = get_order_store()
+    identity = _caller_identity(room)
+    if not order_id:
+        return await store.latest_for_async(identity)
+    order = await store.get_async(order_id)
+    # An id alone proves nothing: only the caller's own orders, placed in this room
+    if order is None or order.identity != identity or order.room != room.name:
+        return None
+    return order
+
+
+async def cancel_pending_order(room: rtc.Room) -> None:
+    """Cancel the caller's order in this room that is waiting on payment, if any."""
+    store = get_order_store()
+    order = await store.latest_for_async(_caller_identity(room))
+    if order is not None and order.status == STATUS_PENDING and order.room == room.name:
+        store.set_status(order.order_id, STATUS_CANCELLED)
+
+
+async def handle_payment_confirmed(room: rtc.Room, identity: str, order_id: Optional[str]) -> bool:
+    """
+    Mark a pending order placed when the payment page reports it paid.
+
+    The 5-minute window starts now. Only the order's own caller, in the
+    order's room, can confirm it.
+    """
+    if not order_id:
+        return False
+    store = get_order_store()
+    order = await store.get_async(order_id)
+    if order is None or order.status != STATUS_PENDING or order.identity != identity or order.room != room.name:
+        return False
+    store.set_status(order.order_id, STATUS_PLACED, restart=True)
+    logger.info("order %s paid", order.order_id)
+    return True
+
+
+def listen_for_payments(room: rtc.Room) -> None:
+    """Place pending orders as the payment page reports them paid (see handle_payment_confirmed)."""
+    tasks: Set[asyncio.Task] = set()
+
+    def _on_data(packet: rtc.DataPacket) -> None:
+        if packet.topic != ORDERS_TOPIC or packet.participant is None:
+            return
+        try:
+            message = json.loads(packet.data)
+        except ValueError:
+            return
+        if message.get("type") != "payment_confirmed":
+            return
+        task = asyncio.create_task(
+            handle_payment_confirmed(room, packet.participant.identity, message.get("orderId"))
+        )
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+
+    room.on("data_received", _on_data)
+
 
 async def handle_proceed_to_payment(agent_instance) -> str:
     """Handle proceeding to the payment page."""
@@ -23,12 +103,29 @@ async def handle_proceed_to_payment(agent_instance) -> str:
     )
     gst = subtotal * 0.05
     total = subtotal + gst
+
+    # Record the order server-side, pending until the payment page confirms it (then the
+    # 5-minute window starts). Confirming the same unpaid cart again reuses its order id.
+    store = get_order_store()
+    identity = _caller_identity(room)
+    latest = await store.latest_for_async(identity)
+    if (
+        latest is not None
+        and latest.status == STATUS_PENDING
+        and latest.room == room.name
+        and latest.items == agent_instance._cart_items
+    ):
+        order_id = latest.order_id
+        store.set_status(order_id, STATUS_PENDING, restart=True)
+    else:
+        order_id = new_order_id()
+        store.place(order_id, identity, room.name, agent_instance._cart_items, total, status=STATUS_PENDING, fresh=True)
     
     # Send data message to frontend
     success = await send_data_message(
         room=room,
         message_type="navigate_to_payment",
-        data={},
+        data={"orderId": order_id},
     )
     
     if success:
@@ -37,20 +134,40 @@ async def handle_proceed_to_payment(agent_instance) -> str:
         return "I'm having trouble processing your order right now. Please try again."
 
 
+FULFILMENT_METHODS = ("pickup", "delivery")
+
+
+def handle_set_fulfilment(agent_instance, method: str) -> str:
+    """Handle recording whether the order is for pickup or delivery."""
+    method = (method or "").strip().lower()
+    if method not in FULFILMENT_METHODS:
+        return "Would you like this order for pickup or delivery?"
+    agent_instance._fulfilment = method
+    return f"Got it, the order is for {method}."
+
+
 async def handle_cancel_order(agent_instance, order_id: Optional[str] = None) -> str:
     """Handle cancelling a confirmed order."""
     room = agent_instance.session.room
     if not room:
         return "I'm having trouble processing your request right now. Please try again."
     
-    # Note: In a real implementation, we would check the order timestamp
-    # and validate it's within 5 minutes. For now, we'll allow cancellation
-    # and let the frontend handle the time validation based on localStorage.
+    # The 5-minute rule is checked against the backend order store (in memory)
+    order = await _find_order(room, order_id)
+    if order is None:
+        return "I couldn't find an order to cancel. Could you check the order number?"
+    if order.status == STATUS_CANCELLED:
+        return "That order has already been cancelled."
+    if order.status == STATUS_PENDING:
+        return "That order hasn't been paid for yet, so there's nothing to cancel. Just say cancel payment if you don't want it."
+    if not order.can_change():
+        return "I'm sorry, that order was placed more than 5 minutes ago, so preparation may have started and it can't be cancelled. Please contact the restaurant directly."
+    get_order_store().set_status(order.order_id, STATUS_CANCELLED)
     
     success = await send_data_message(
         room=room,
         message_type="cancel_order",
-        data={"orderId": order_id} if order_id else {},
+        data={"orderId": order.order_id},
     )
     
     if success:
@@ -59,9 +176,17 @@ async def handle_cancel_order(agent_instance, order_id: Optional[str] = None) ->
         return "I'm having trouble cancelling your order. Please contact the restaurant directly."
 
 
-def handle_modify_order(agent_instance) -> str:
+async def handle_modify_order(agent_instance) -> str:
     """Handle modifying a confirmed order."""
-    # Note: In a real implementation, we would check the order timestamp
-    # For now, we'll allow modifications and let the frontend handle validation
-    
+    room = agent_instance.session.room
+    order = await _find_order(room, None) if room else None
+    if order is not None:
+        if order.status == STATUS_CANCELLED:
+            return "Your last order was cancelled, so there's nothing to modify. Would you like to place a new order?"
+        if order.status == STATUS_PENDING:
+            return "Your order hasn't been paid for yet. Just tell me what you'd like to change in your cart."
+        if not order.can_change():
+            return "I'm sorry, your order was placed more than 5 minutes ago, so preparation may have started and it can't be modified. Please contact the restaurant directly."
+        return "Your order can still be changed. What would you like to modify?"
+
     return "I can help you modify your order if it's within 5 minutes of placement. What would you like to change? If it's been longer, please contact the restaurant directly as preparation may have started."
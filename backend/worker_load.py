@@ -0,0 +1,304 @@
+"""
+Load-aware admission control for the agent worker.
+
+With the default load calculation a worker keeps accepting rooms while its
+job processes' event loops lag, and every caller on it slows down. Here the
+worker reports a load score to the dispatcher and refuses new jobs once the
+score reaches LOAD_THRESHOLD (default 0.8), so new calls go to a healthier
+worker.
+
+The score is the highest of four readings, each scaled so 1.0 means "at
+capacity":
+
+- event-loop lag: worst p99 over the last few seconds across the worker's
+  job processes, divided by LOAD_LAG_BUDGET_MS (default 50, the load
+  test's healthy budget)
+- CPU: host CPU utilisation
+- sessions: active jobs divided by LOAD_MAX_SESSIONS (default 8; take
+  max_healthy_sessions from `agent.py loadtest`)
+- retrieval: retrievals in flight across job processes, divided by
+  LOAD_MAX_RETRIEVALS (default 4)
+
+Job processes measure their own lag and retrievals, since that is where
+sessions run. Each one writes a small report file every
+LOAD_REPORT_INTERVAL seconds (default 1) from a background thread, into the
+directory the worker claimed for them before starting (claim_report_dir). The
+worker process reads those reports when the dispatcher asks for its load.
+Job requests are judged on the last of those samples, with the worker's
+current session count, so admission never waits on the disk.
+"""
+
+import asyncio
+import json
+import logging
+import math
+import os
+import tempfile
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Deque, Dict, Iterator, Optional
+
+import psutil
+
+logger = logging.getLogger("restaurant.worker_load")
+
+DEFAULT_THRESHOLD = 0.8
+# How often the job processes' lag monitors tick
+LAG_INTERVAL = 0.01
+
+
+class EventLoopLagMonitor:
+    """Measures how late a periodic timer fires: the delay every coroutine on the loop sees."""
+
+    def __init__(self, interval: float = LAG_INTERVAL, max_samples: Optional[int] = None) -> None:
+        self.interval = interval
+        self.samples: Deque[float] = deque(maxlen=max_samples)
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, loop.time() - expected))
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+
+def _default_report_base() -> Path:
+    return Path(tempfile.gettempdir()) / "restaurant-agent-load"
+
+
+def claim_report_dir() -> Path:
+    """
+    Give this worker its own report directory and export it as AGENT_LOAD_DIR.
+
+    Call in the worker before it starts any job processes: they inherit the
+    variable, whichever process (the worker or a forkserver) forks them.
+    """
+    base = Path(os.getenv("AGENT_LOAD_DIR", "") or _default_report_base())
+    path = base / str(os.getpid())
+    os.environ["AGENT_LOAD_DIR"] = str(path)
+    return path
+
+
+def report_dir() -> Path:
+    """Where this worker's job processes leave their reports (see claim_report_dir)."""
+    directory = os.getenv("AGENT_LOAD_DIR", "")
+    if directory:
+        return Path(directory)
+    return _default_report_base() / str(os.getpid())
+
+
+# --- job processes -----------------------------------------------------------
+
+_RETRIEVALS_IN_FLIGHT = 0
+_RETRIEVALS_LOCK = threading.Lock()
+
+
+@contextmanager
+def retrieval_in_flight() -> Iterator[None]:
+    """Count the enclosed retrieval towards this process's retrieval load."""
+    global _RETRIEVALS_IN_FLIGHT
+    with _RETRIEVALS_LOCK:
+        _RETRIEVALS_IN_FLIGHT += 1
+    try:
+        yield
+    finally:
+        with _RETRIEVALS_LOCK:
+            _RETRIEVALS_IN_FLIGHT -= 1
+
+
+def _p99(samples) -> float:
+    ordered = sorted(samples)
+    return ordered[math.ceil((len(ordered) - 1) * 0.99)] if ordered else 0.0
+
+
+class ProcessLoadReporter:
+    """Publishes a job process's event-loop lag and retrievals in flight for its worker."""
+
+    def __init__(self, path: Path, interval: float = 1.0, window: float = 5.0) -> None:
+        self.path = path
+        self.interval = interval
+        self.lag = EventLoopLagMonitor(max_samples=int(window / LAG_INTERVAL))
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Start measuring (call from the process's event loop)."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.lag.start()
+        self._thread = threading.Thread(target=self._report_loop, name="load-reporter", daemon=True)
+        self._thread.start()
+
+    def _report_loop(self) -> None:
+        while not self._stop.wait(self.interval):
+            # Sampled from this thread, so a retrieval blocking the event loop still counts
+            report = {
+                "pid": os.getpid(),
+                "lag_p99": _p99(tuple(self.lag.samples)),
+                "retrievals": _RETRIEVALS_IN_FLIGHT,
+                "at": time.time(),
+            }
+            tmp = self.path.with_suffix(".tmp")
+            try:
+                tmp.write_text(json.dumps(report), encoding="utf-8")
+                os.replace(tmp, self.path)
+            except OSError:
+                logger.warning("could not write load report %s", self.path, exc_info=True)
+
+    async def stop(self) -> None:
+        self._stop.set()
+        await self.lag.stop()
+        self.path.unlink(missing_ok=True)
+
+
+_REPORTER: Optional[ProcessLoadReporter] = None
+
+
+def start_load_reporting() -> None:
+    """Start this job process's load reports for its worker, once per process."""
+    global _REPORTER
+    if _REPORTER is not None:
+        return
+    _REPORTER = ProcessLoadReporter(
+        report_dir() / f"{os.getpid()}.json",
+        interval=float(os.getenv("LOAD_REPORT_INTERVAL", "1")),
+    )
+    _REPORTER.start()
+
+
+# --- worker process ----------------------------------------------------------
+
+
+@dataclass(frozen=True)
+class LoadSample:
+    score: float
+    lag_p99: float
+    cpu: float
+    sessions: int
+    retrievals: int
+    components: Dict[str, float]
+
+
+class WorkerLoad:
+    def __init__(
+        self,
+        reports: Path,
+        threshold: float = DEFAULT_THRESHOLD,
+        lag_budget: float = 0.05,
+        max_sessions: int = 8,
+        max_retrievals: int = 4,
+        stale_after: float = 5.0,
+    ) -> None:
+        self.reports = reports
+        self.threshold = threshold
+        self.lag_budget = lag_budget
+        self.max_sessions = max_sessions
+        self.max_retrievals = max_retrievals
+        self.stale_after = stale_after
+        self.last: Optional[LoadSample] = None
+        # First call primes psutil's CPU counter; later calls return usage since the last one
+        psutil.cpu_percent(interval=None)
+
+    def _read_reports(self) -> Iterator[dict]:
+        now = time.time()
+        for path in self.reports.glob("*.json"):
+            try:
+                report = json.loads(path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                continue
+            # Reports from exited job processes stop being refreshed
+            if now - report.get("at", 0) <= self.stale_after:
+                yield report
+
+    def sample(self, sessions: int) -> LoadSample:
+        reports = list(self._read_reports())
+        lag_p99 = max((r["lag_p99"] for r in reports), default=0.0)
+        retrievals = sum(r["retrievals"] for r in reports)
+        cpu = psutil.cpu_percent(interval=None) / 100
+        components = {
+            "lag": lag_p99 / self.lag_budget,
+            "cpu": cpu,
+            "sessions": sessions / self.max_sessions,
+            "retrieval": retrievals / self.max_retrievals,
+        }
+        self.last = LoadSample(
+            score=min(1.0, max(components.values())),
+            lag_p99=lag_p99,
+            cpu=cpu,
+            sessions=sessions,
+            retrievals=retrievals,
+            components=components,
+        )
+        return self.last
+
+    def accepts(self, sessions: int) -> bool:
+        """
+        Whether to take another job, judged on the last sample (compute_load's)
+        with the current session count.
+
+        No new sample is taken: a CPU reading right after the last one would
+        cover almost no time, and reading the reports touches the disk.
+        """
+        components = dict(self.last.components) if self.last is not None else {}
+        components["sessions"] = sessions / self.max_sessions
+        score = min(1.0, max(components.values()))
+        if score < self.threshold:
+            return True
+        logger.warning("refusing job at load %.2f", score, extra={"load": components})
+        return False
+
+
+_LOAD: Optional[WorkerLoad] = None
+
+
+def get_worker_load() -> WorkerLoad:
+    global _LOAD
+    if _LOAD is None:
+        _LOAD = WorkerLoad(
+            report_dir(),
+            threshold=load_threshold(),
+            lag_budget=float(os.getenv("LOAD_LAG_BUDGET_MS", "50")) / 1000,
+            max_sessions=int(os.getenv("LOAD_MAX_SESSIONS", "8")),
+            max_retrievals=int(os.getenv("LOAD_MAX_RETRIEVALS", "4")),
+        )
+    return _LOAD
+
+
+def load_threshold() -> float:
+    return float(os.getenv("LOAD_THRESHOLD", str(DEFAULT_THRESHOLD)))
+
+
+def _active_sessions(server) -> int:
+    return len(getattr(server, "active_jobs", None) or ())
+
+
+def compute_load(server=None) -> float:
+    """The worker's load score for the dispatcher (the server's load_fnc)."""
+    return get_worker_load().sample(_active_sessions(server)).score
+
+
+def admission_control(server):
+    """A job request handler for `server` that accepts jobs only below the load threshold."""
+
+    async def on_request(request) -> None:
+        if get_worker_load().accepts(_active_sessions(server)):
+            await request.accept()
+        else:
+            await request.reject()
+
+    return on_request
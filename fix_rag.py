@@ -1,3 +1,4 @@
+import argparse
 import shutil
 import sys
 from pathlib import Path
@@ -6,7 +7,7 @@ import os
 # Add the backend directory to path so we can import from rag_engine
 sys.path.append(os.path.join(os.getcwd(), 'backend'))
 
-def fix_rag():
+def fix_rag(force: bool = False):
     print("Checking environment...")
     try:
         from llama_index.embeddings.huggingface import HuggingFaceEmbedding
@@ -16,9 +17,19 @@ def fix_rag():
         print("Please run: pip install llama-index-embeddings-huggingface")
         sys.exit(1)
 
+    from backend.rag_engine import build_index, index_staleness
+
+    # The index manifest tells us whether a rebuild is actually needed
+    reason = index_staleness()
+    if reason is None and not force:
+        print("Index manifest matches the current embedding model, chunker and docs. Nothing to fix.")
+        print("Use --force to delete and rebuild anyway.")
+        return
+    print(f"Index needs rebuilding: {reason or 'forced'}")
+
     # Path to storage
     storage_path = Path("storage/restaurant_index")
-    if storage_path.exists():
+    if force and storage_path.exists():
         print(f"Removing existing storage at {storage_path} to force rebuild...")
         try:
             shutil.rmtree(storage_path)
@@ -26,23 +37,20 @@ def fix_rag():
         except Exception as e:
             print(f"Error removing storage: {e}")
             sys.exit(1)
-    else:
-        print("No existing storage found.")
 
     print("Rebuilding index...")
     try:
-        # Import after path fix
-        from backend.rag_engine import get_index
-        # get_index will call init_settings and rebuild if storage is missing
-        index = get_index()
+        index = build_index()
         if index:
             print("SUCCESS: Index rebuilt and loaded successfully.")
         else:
-            print("FAILURE: get_index returned None.")
+            print("FAILURE: build_index returned None.")
     except Exception as e:
         print(f"CRITICAL ERROR during index rebuild: {e}")
         import traceback
         traceback.print_exc()
 
 if __name__ == "__main__":
-    fix_rag()
+    parser = argparse.ArgumentParser(description="Check and repair the RAG index.")
+    parser.add_argument("--force", action="store_true", help="Delete and rebuild even if the index is current.")
+    fix_rag(force=parser.parse_args().force)
@@ -417,6 +417,10 @@ function CallUI() {
           // Store cart items in sessionStorage for payment page
           if (cartItems.length > 0) {
             sessionStorage.setItem("pendingOrderItems", JSON.stringify(cartItems));
+            // Order id the agent recorded for this order, used for cancellation
+            if (data.orderId) {
+              sessionStorage.setItem("pendingOrderId", data.orderId);
+            }
             router.push("/payment");
           }
         } else if (data.type === "navigate_to_menu") {
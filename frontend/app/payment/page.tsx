@@ -108,7 +108,7 @@ export default function PaymentPage() {
     }
 
     // Generate order data
-    const orderId = generateOrderId();
+    const orderId = sessionStorage.getItem("pendingOrderId") || generateOrderId();
     const orderData = {
       orderId,
       status: "in_progress" as const,
@@ -122,6 +122,7 @@ export default function PaymentPage() {
 
     // Clear sessionStorage
     sessionStorage.removeItem("pendingOrderItems");
+    sessionStorage.removeItem("pendingOrderId");
 
     // Navigate back to home
     router.push("/");
@@ -207,6 +208,23 @@ export default function PaymentPage() {
       };
     }, [room, router]);
 
+    // Tell the agent the order is paid: it becomes placed (and cancellable for 5 minutes) now
+    const handlePaid = async () => {
+      const orderId = sessionStorage.getItem("pendingOrderId");
+      if (room && orderId && cartItems.length > 0) {
+        try {
+          const encoder = new TextEncoder();
+          await room.localParticipant.publishData(
+            encoder.encode(JSON.stringify({ type: "payment_confirmed", orderId })),
+            { reliable: true, topic: "orders" }
+          );
+        } catch (error) {
+          console.error("Error confirming payment:", error);
+        }
+      }
+      handleDone();
+    };
+
     return (
       <div className="min-h-screen bg-stone-50 dark:bg-stone-950 text-stone-900 dark:text-stone-100 relative overflow-hidden">
         {/* Background Gradients */}
@@ -233,7 +251,7 @@ export default function PaymentPage() {
                 calculateSubtotal={calculateSubtotal}
                 calculateGST={calculateGST}
                 calculateTotal={calculateTotal}
-                handleDone={handleDone}
+                handleDone={handlePaid}
                 onCancel={() => router.push("/")}
               />
             </div>
@@ -7,6 +7,8 @@ from pathlib import Path
 # Add the backend directory to sys.path so we can import modules from it
 BACKEND_DIR = Path(__file__).parent.parent / "backend"
 sys.path.append(str(BACKEND_DIR.parent))
+# Backend modules import each other flat (e.g. `from rag_engine import ...`), as when run from backend/
+sys.path.append(str(BACKEND_DIR))
 
 @pytest.fixture(scope="session", autouse=True)
 def load_env():
@@ -0,0 +1,113 @@
+import asyncio
+import json
+import wave
+
+import numpy as np
+import pytest
+
+from simulation.endpointing_replay import (
+    LabeledTurn,
+    SettingResult,
+    SpeechSegment,
+    Utterance,
+    detect_speech,
+    grid_settings,
+    load_recordings,
+    mark_pareto,
+    parse_grid,
+    read_wav,
+    replay_endpointing,
+)
+
+# One turn with a 0.8 s mid-turn pause, then a second turn
+TURNS = [
+    LabeledTurn([Utterance(0.5, 2.0, "I'd like a large"), Utterance(2.8, 4.0, "pepperoni pizza")]),
+    LabeledTurn([Utterance(7.0, 7.6, "no thanks")], agent="Anything else?"),
+]
+
+
+def _segments(min_silence):
+    # What the VAD reports: END_OF_SPEECH fires min_silence after speech stops
+    spans = [(0.5, 2.0), (2.8, 4.0), (7.0, 7.6)]
+    return [SpeechSegment(start, end, end + min_silence) for start, end in spans]
+
+
+def test_short_delay_cuts_off_mid_turn_pause():
+    latencies, premature, missed = replay_endpointing(TURNS, _segments(0.3), min_delay=0.4, max_delay=3.0)
+    assert premature == 1
+    assert missed == 0
+    assert latencies == pytest.approx([0.4, 0.4])
+
+
+def test_longer_delay_waits_out_the_pause():
+    latencies, premature, missed = replay_endpointing(TURNS, _segments(0.3), min_delay=1.0, max_delay=3.0)
+    assert premature == 0
+    assert latencies == pytest.approx([1.0, 1.0])
+
+
+def test_turn_detector_holds_incomplete_sentences():
+    def predictor(history):
+        # "I'd like a large" is clearly unfinished
+        return 0.01 if history[-1]["content"].endswith("large") else 0.9
+
+    latencies, premature, _ = replay_endpointing(
+        TURNS, _segments(0.3), min_delay=0.4, max_delay=3.0, predictor=predictor, unlikely_threshold=0.1
+    )
+    assert premature == 0
+    assert latencies == pytest.approx([0.4, 0.4])
+
+
+def test_turn_detector_sees_prior_turns_and_agent_text():
+    seen = []
+
+    def predictor(history):
+        seen.append(history)
+        return 1.0
+
+    replay_endpointing(TURNS, _segments(0.3), 0.4, 3.0, predictor=predictor, unlikely_threshold=0.5)
+    assert seen[-1] == [
+        {"role": "user", "content": "I'd like a large pepperoni pizza"},
+        {"role": "assistant", "content": "Anything else?"},
+        {"role": "user", "content": "no thanks"},
+    ]
+
+
+def test_recording_ending_mid_speech_is_missed():
+    segments = _segments(0.3)[:2] + [SpeechSegment(7.0, 7.6, None)]
+    _, _, missed = replay_endpointing(TURNS, segments, min_delay=1.0, max_delay=3.0)
+    assert missed == 1
+
+
+def test_grid_and_pareto():
+    grid = parse_grid(["min_endpointing_delay=0.3,0.6", "min_silence_duration=0.4"])
+    settings = grid_settings({"min_endpointing_delay": 0.5, "max_endpointing_delay": 3.0}, grid)
+    assert len(settings) == 2
+    assert {s["min_endpointing_delay"] for s in settings} == {0.3, 0.6}
+    with pytest.raises(ValueError):
+        parse_grid(["patience=1"])
+
+    fast = SettingResult({}, 10, 3, 0, 300, 400, 300)
+    safe = SettingResult({}, 10, 0, 0, 900, 1000, 900)
+    worse = SettingResult({}, 10, 3, 0, 950, 1000, 950)
+    mark_pareto([fast, safe, worse])
+    assert (fast.pareto, safe.pareto, worse.pareto) == (True, True, False)
+
+
+def test_sip_recording_loads_and_replays_through_silero(tmp_path):
+    audio_path = tmp_path / "call.wav"
+    with wave.open(str(audio_path), "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(8000)
+        wav.writeframes(np.zeros(8000 * 2, dtype=np.int16).tobytes())
+    (tmp_path / "call.json").write_text(
+        json.dumps({"turns": [{"utterances": [{"start": 0.2, "end": 1.0, "text": "hello"}]}]}), encoding="utf-8"
+    )
+
+    [recording] = load_recordings(tmp_path)
+    samples, rate = read_wav(recording.audio_path)
+    assert rate == 8000
+    # Silence: no speech, so the labelled turn is never committed
+    segments = asyncio.run(detect_speech(samples, rate, {"min_silence_duration": 0.3}))
+    assert segments == []
+    assert replay_endpointing(recording.turns, segments, 0.5, 3.0) == ([], 0, 1)
@@ -0,0 +1,119 @@
+import asyncio
+import zlib
+
+import numpy as np
+import pytest
+from livekit.agents import ChatContext, StopResponse
+
+import agent
+import faq_fast_path
+import telemetry
+from faq_fast_path import FaqIndex, build_faq_entries
+from lexical_index import tokenize
+from rag_engine import DATA_DIR
+from simulation.fakes import FakeRoom, FakeSession
+from simulation.harness import SimulatedAssistant
+
+
+def _bag_of_words_embedding(text, dim=256):
+    """Deterministic stand-in for the embedding model: hashed term counts."""
+    vector = np.zeros(dim, dtype=np.float32)
+    for token in tokenize(text):
+        vector[zlib.crc32(token.encode()) % dim] += 1.0
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class _FakeRetriever:
+    embed = staticmethod(_bag_of_words_embedding)
+
+
+def _index():
+    return FaqIndex.build(build_faq_entries(DATA_DIR), _bag_of_words_embedding)
+
+
+def _match(index, query):
+    return index.match(query, _bag_of_words_embedding(query))
+
+
+def test_answers_are_rendered_from_the_rules_doc():
+    entries = {e.intent: e for e in build_faq_entries(DATA_DIR)}
+    assert "Monday to Thursday, 11:00 AM to 11:00 PM" in entries["opening_hours"].answer
+    assert "Lajpat Nagar" in entries["delivery_area"].answer
+    assert "600 rupees" in entries["minimum_order"].answer
+    assert "₹" not in entries["delivery_fee"].answer
+    # Nothing addressed to the assistant is spoken to the caller
+    assert all("assistant" not in e.answer.lower() for e in entries.values())
+    # Allergy questions stay with the LLM
+    assert not any("allerg" in q.lower() for e in entries.values() for q in e.questions)
+
+
+def test_match_needs_an_intent_keyword():
+    index = _index()
+    match = _match(index, "What are your opening hours?")
+    assert match.entry.intent == "opening_hours" and match.score > 0.9
+    assert _match(index, "Where are you located?").entry.intent == "address"
+    assert _match(index, "I'd like a large margherita") is None
+    # Mixed with an order change: the LLM has to handle it
+    assert _match(index, "Add a coke, and what are your opening hours?") is None
+
+
+def test_payment_and_fulfilment_statements_go_to_the_llm():
+    """
+    Scenario: The caller states a choice that uses a payment or delivery intent's words.
+    The LLM has to record it (set_fulfilment_method), so the fast path must not answer.
+    """
+    index = _index()
+    for statement in (
+        "I'll pay by card",
+        "I want delivery",
+        "Deliver it to Lajpat Nagar please",
+        "I'll collect it myself, pickup is fine",
+        "I'd like delivery, what's the delivery fee?",
+        "Cash on delivery then",
+    ):
+        assert _match(index, statement) is None, statement
+
+    # The same words asked as questions are FAQs, with or without a "?"
+    assert _match(index, "Can I pay by card?").entry.intent == "payment_methods"
+    assert _match(index, "do you deliver to my area").entry.intent == "delivery_area"
+    assert _match(index, "What is the delivery fee?").entry.intent == "delivery_fee"
+
+
+def test_index_file_is_ignored_when_docs_change(tmp_path):
+    path = tmp_path / "faq_index.json"
+    written = faq_fast_path.write_faq_index(_bag_of_words_embedding, DATA_DIR, path)
+    loaded = faq_fast_path.load_faq_index(DATA_DIR, path)
+    assert [e.answer for e in loaded.entries] == [e.answer for e in written.entries]
+    assert _match(loaded, "When are you open?").entry.intent == "opening_hours"
+    assert FaqIndex.from_json(path.read_text(encoding="utf-8"), "other-corpus") is None
+
+
+def _turn(assistant, text):
+    ctx = ChatContext.empty()
+    message = ctx.add_message(role="user", content=text)
+    asyncio.run(assistant.on_user_turn_completed(ctx, message))
+    return ctx
+
+
+def test_confident_match_is_spoken_without_the_llm(monkeypatch):
+    index = _index()
+    monkeypatch.setattr(agent, "get_faq_index", lambda: index)
+    monkeypatch.setattr(agent, "get_retriever", lambda block=True: _FakeRetriever())
+    searches = []
+    monkeypatch.setattr(agent, "search_menu", lambda query, *args, **kwargs: searches.append(kwargs) or "ctx")
+
+    assistant = SimulatedAssistant(FakeSession(FakeRoom("faq-room")))
+    with pytest.raises(StopResponse):
+        _turn(assistant, "What time do you close?")
+    assert assistant.session.speeches[-1].text.startswith("We're open")
+    assert searches == []
+    assert telemetry.REGISTRY.get_sample_value(
+        "agent_faq_fast_path_total",
+        {"intent": "opening_hours", "outcome": "answered", "room": "", "session": ""},
+    ) >= 1
+
+    # Below the threshold the turn goes to retrieval, reusing the query embedding
+    monkeypatch.setenv("FAQ_CONFIDENCE_THRESHOLD", "1.01")
+    ctx = _turn(assistant, "What time do you close?")
+    assert len(ctx.items) == 2 and searches[-1]["query_embedding"] is not None
@@ -0,0 +1,140 @@
+import asyncio
+import json
+
+from aiohttp import web
+from livekit.agents import llm
+from livekit.plugins import groq
+from prometheus_client import REGISTRY
+
+from hedged_llm import HedgedLLM
+from llm_http import create_llm_client
+
+
+def _sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+class _LlmServer:
+    """Local stand-in for an OpenAI-compatible chat endpoint that streams after a delay."""
+
+    def __init__(self, reply, delay=0.0, status=200):
+        self.reply = reply
+        self.delay = delay
+        self.status = status
+        self.requests = 0
+
+    async def handle(self, request):
+        self.requests += 1
+        body = await request.json()
+        await asyncio.sleep(self.delay)
+        if self.status != 200:
+            return web.json_response({"error": {"message": "overloaded"}}, status=self.status)
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        for word in self.reply.split(" "):
+            chunk = {
+                "id": "chatcmpl-test",
+                "object": "chat.completion.chunk",
+                "created": 0,
+                "model": body["model"],
+                "choices": [{"index": 0, "delta": {"role": "assistant", "content": word + " "}, "finish_reason": None}],
+            }
+            await response.write(f"data: {json.dumps(chunk)}\n\n".encode())
+        await response.write(b"data: [DONE]\n\n")
+        return response
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_post("/v1/chat/completions", self.handle)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        url = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}/v1"
+        return create_llm_client(url, api_key="test")
+
+
+async def _hedged(primary, fallback, deadline, measure_window=0.0):
+    return HedgedLLM(
+        groq.LLM(model="primary-model", client=await primary.start()),
+        groq.LLM(model="fallback-model", client=await fallback.start()),
+        deadline=deadline,
+        measure_window=measure_window,
+    )
+
+
+async def _reply(model):
+    chat_ctx = llm.ChatContext.empty()
+    chat_ctx.add_message(role="user", content="When do you close?")
+    async with model.chat(chat_ctx=chat_ctx) as stream:
+        return "".join([chunk.delta.content async for chunk in stream if chunk.delta and chunk.delta.content]).strip()
+
+
+async def _until(condition, timeout=3.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline, "timed out"
+        await asyncio.sleep(0.01)
+
+
+def test_fast_primary_is_not_hedged():
+    async def run():
+        primary, fallback = _LlmServer("We close at eleven."), _LlmServer("Eleven.")
+        model = await _hedged(primary, fallback, deadline=1.0)
+        before = _sample("agent_llm_hedge_total", outcome="primary")
+        assert await _reply(model) == "We close at eleven."
+        assert _sample("agent_llm_hedge_total", outcome="primary") - before == 1
+        assert fallback.requests == 0
+        await model.aclose()
+        await primary.runner.cleanup()
+        await fallback.runner.cleanup()
+
+    asyncio.run(run())
+
+
+def test_slow_primary_is_raced_by_the_fallback():
+    async def run():
+        primary, fallback = _LlmServer("We close at eleven.", delay=0.6), _LlmServer("Eleven.")
+        model = await _hedged(primary, fallback, deadline=0.1, measure_window=2.0)
+        before = _sample("agent_llm_hedge_total", outcome="fallback")
+        saved_count = _sample("agent_llm_hedge_saved_seconds_count")
+        saved_sum = _sample("agent_llm_hedge_saved_seconds_sum")
+        assert await _reply(model) == "Eleven."
+        assert _sample("agent_llm_hedge_total", outcome="fallback") - before == 1
+        # The losing primary is timed in the background once it starts streaming
+        await _until(lambda: _sample("agent_llm_hedge_saved_seconds_count") > saved_count)
+        assert 0.3 < _sample("agent_llm_hedge_saved_seconds_sum") - saved_sum < 0.8
+        await model.aclose()
+        await primary.runner.cleanup()
+        await fallback.runner.cleanup()
+
+    asyncio.run(run())
+
+
+def test_primary_wins_when_it_starts_before_the_fallback():
+    async def run():
+        primary, fallback = _LlmServer("We close at eleven.", delay=0.2), _LlmServer("Eleven.", delay=1.0)
+        model = await _hedged(primary, fallback, deadline=0.05)
+        before = _sample("agent_llm_hedge_total", outcome="primary_after_hedge")
+        assert await _reply(model) == "We close at eleven."
+        assert _sample("agent_llm_hedge_total", outcome="primary_after_hedge") - before == 1
+        assert fallback.requests == 1
+        await model.aclose()
+        await primary.runner.cleanup()
+        await fallback.runner.cleanup()
+
+    asyncio.run(run())
+
+
+def test_failed_primary_falls_back_before_the_deadline():
+    async def run():
+        primary, fallback = _LlmServer("", status=503), _LlmServer("Eleven.")
+        model = await _hedged(primary, fallback, deadline=5.0)
+        started = asyncio.get_running_loop().time()
+        assert await _reply(model) == "Eleven."
+        assert asyncio.get_running_loop().time() - started < 1.0
+        await model.aclose()
+        await primary.runner.cleanup()
+        await fallback.runner.cleanup()
+
+    asyncio.run(run())
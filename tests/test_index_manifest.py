@@ -0,0 +1,86 @@
+import os
+from pathlib import Path
+
+import pytest
+
+from backend import index_manifest
+from backend.index_manifest import (
+    IndexCompatibilityError,
+    expected_manifest,
+    find_incompatibility,
+    validate_manifest,
+    write_manifest,
+)
+
+@pytest.fixture
+def corpus(tmp_path):
+    data_dir = tmp_path / "docs"
+    data_dir.mkdir()
+    (data_dir / "menu.txt").write_text("Margherita Pizza - 449")
+    return data_dir
+
+def test_matching_manifest_is_compatible(corpus, tmp_path):
+    storage = tmp_path / "index"
+    storage.mkdir()
+    write_manifest(storage, expected_manifest(corpus))
+
+    assert find_incompatibility(storage, expected_manifest(corpus)) is None
+    validate_manifest(storage, expected_manifest(corpus))
+
+def test_missing_manifest_fails_fast(corpus, tmp_path):
+    """
+    Scenario: An index persisted before manifests existed should be flagged, not loaded.
+    """
+    storage = tmp_path / "index"
+    storage.mkdir()
+
+    with pytest.raises(IndexCompatibilityError, match="no readable"):
+        validate_manifest(storage, expected_manifest(corpus))
+
+def test_changed_docs_or_model_are_reported(corpus, tmp_path):
+    storage = tmp_path / "index"
+    storage.mkdir()
+    built_with = expected_manifest(corpus)
+    write_manifest(storage, built_with)
+
+    (corpus / "menu.txt").write_text("Margherita Pizza - 499")
+    assert "source documents changed" in find_incompatibility(storage, expected_manifest(corpus))
+
+    other_model = type(built_with)(
+        embed_model="some/other-model",
+        embed_dim=768,
+        chunker_version=built_with.chunker_version,
+        corpus_hash=built_with.corpus_hash,
+    )
+    reason = find_incompatibility(storage, other_model)
+    assert "embed_model mismatch" in reason
+
+def test_unchanged_docs_are_not_read_again(corpus, tmp_path, monkeypatch):
+    """
+    Scenario: A new process loads an index built from unchanged docs. The
+    manifest's fingerprint matches, so no doc is read to validate it.
+    """
+    storage = tmp_path / "index"
+    storage.mkdir()
+    write_manifest(storage, expected_manifest(corpus))
+    monkeypatch.setattr(index_manifest, "_CORPUS_HASHES", {})
+
+    def no_reads(self):
+        raise AssertionError(f"{self.name} was read")
+
+    monkeypatch.setattr(Path, "read_bytes", no_reads)
+    validate_manifest(storage, expected_manifest(corpus, storage))
+
+def test_touched_docs_are_rehashed_by_content(corpus, tmp_path):
+    storage = tmp_path / "index"
+    storage.mkdir()
+    write_manifest(storage, expected_manifest(corpus))
+
+    # Same contents, new mtime: the contents are hashed again and still match
+    menu = corpus / "menu.txt"
+    os.utime(menu, ns=(menu.stat().st_atime_ns, menu.stat().st_mtime_ns + 10**9))
+    assert find_incompatibility(storage, expected_manifest(corpus, storage)) is None
+
+    menu.write_text("Margherita Pizza - 999")
+    os.utime(menu, ns=(menu.stat().st_atime_ns, menu.stat().st_mtime_ns + 2 * 10**9))
+    assert "source documents changed" in find_incompatibility(storage, expected_manifest(corpus, storage))
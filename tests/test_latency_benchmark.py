@@ -0,0 +1,101 @@
+import pytest
+
+from simulation.conversations import DEFAULT_CONVERSATIONS, PIZZA_ORDER
+from simulation.harness import SimulatedProviders, run_benchmark, run_conversation
+from simulation.latency import LatencyRecorder, compare_to_baseline, percentile
+from simulation.capacity_probe import CapacityPoint, build_report, load_score, measure_level, realistic_providers
+
+# 1. Test Case: The harness drives the real assistant and tools offline
+@pytest.mark.asyncio
+async def test_scripted_order_reaches_the_frontend():
+    """
+    Scenario: Replay a full pizza order with stand-in providers.
+    Every tool should publish to the fake room, and every stage should be timed.
+    """
+    recorder = LatencyRecorder()
+    assistant = await run_conversation(PIZZA_ORDER, SimulatedProviders.zero_latency(), recorder)
+
+    participant = assistant.session.room.local_participant
+    assert [m["type"] for m in participant.messages()] == [
+        "show_item",
+        "add_to_cart",
+        "add_to_cart",
+        "update_cart",
+        "navigate_to_payment",
+    ]
+    assert participant.messages("update_cart")[0]["items"][0]["quantity"] == 2
+
+    summary = recorder.summary()
+    for stage in ("stt", "retrieval", "context_injection", "llm", "tts_first_frame", "turn_total"):
+        assert summary[stage]["count"] == len(PIZZA_ORDER.turns)
+    assert summary["tool.add_item_to_cart"]["count"] == 2
+    assert summary["publish.add_to_cart"]["count"] == 2
+
+@pytest.mark.asyncio
+async def test_benchmark_reports_percentiles():
+    recorder = await run_benchmark(iterations=2, wait_for_index=False)
+    stats = recorder.summary()["turn_total"]
+    assert stats["p50"] <= stats["p95"] <= stats["p99"]
+
+# 2. Test Case: Baseline comparison
+def test_compare_to_baseline_flags_only_real_regressions():
+    baseline = {
+        "retrieval": {"count": 10, "p50": 0.010, "p95": 0.020, "p99": 0.030, "mean": 0.012},
+        "publish.add_to_cart": {"count": 10, "p50": 0.0001, "p95": 0.0002, "p99": 0.0003, "mean": 0.0001},
+    }
+    current = {
+        "retrieval": {"count": 10, "p50": 0.011, "p95": 0.040, "p99": 0.050, "mean": 0.015},
+        # 3x slower but only by a fraction of a millisecond: jitter, not a regression
+        "publish.add_to_cart": {"count": 10, "p50": 0.0003, "p95": 0.0006, "p99": 0.0009, "mean": 0.0003},
+    }
+    regressions = compare_to_baseline(current, baseline)
+    assert len(regressions) == 1
+    assert regressions[0].startswith("retrieval p95")
+
+def test_percentile_interpolates():
+    assert percentile([1.0, 2.0, 3.0, 4.0], 50) == 2.5
+    assert percentile([5.0], 99) == 5.0
+    assert percentile([], 50) == 0.0
+
+# 3. Test Case: Capacity model
+def _point(sessions, turn_p95_ms, loop_lag_p99_ms, host_cpu_percent):
+    return CapacityPoint(
+        sessions=sessions, turns=10 * sessions,
+        turn_p50_ms=turn_p95_ms / 2, turn_p95_ms=turn_p95_ms, turn_p99_ms=turn_p95_ms,
+        loop_lag_p50_ms=1.0, loop_lag_p99_ms=loop_lag_p99_ms, loop_lag_max_ms=loop_lag_p99_ms,
+        cpu_percent=host_cpu_percent * 4, host_cpu_percent=host_cpu_percent,
+        rss_mb=200.0, rss_per_session_mb=2.0,
+    )
+
+def test_capacity_report_stops_at_first_degraded_level():
+    points = [
+        _point(1, 900, 2, 5),
+        _point(10, 950, 10, 40),
+        _point(20, 1100, 30, 70),
+        _point(40, 2400, 180, 100),
+    ]
+    report = build_report(points, lag_budget_ms=50, max_turn_degradation=0.5)
+    assert report.capacity_reached
+    assert report.max_healthy_sessions == 20
+    # Host CPU (70%) outweighs loop lag (30 / 50 ms) at the last healthy level
+    assert report.suggested_load_threshold == 0.7
+    assert "turn detector" in report.excludes
+
+def test_suggested_threshold_is_the_load_score():
+    """
+    Scenario: Loop lag, not CPU, is what limits capacity.
+    The threshold uses the lag component, as WorkerLoad scores it.
+    """
+    points = [_point(1, 900, 2, 5), _point(8, 1000, 40, 20), _point(16, 2000, 90, 30)]
+    report = build_report(points, lag_budget_ms=50, max_turn_degradation=0.5)
+    assert report.max_healthy_sessions == 8
+    assert report.suggested_load_threshold == 0.8
+    assert report.suggested_load_threshold == round(load_score(points[1], 50), 2)
+
+@pytest.mark.asyncio
+async def test_measure_level_runs_sessions_concurrently():
+    point = await measure_level(3, rounds=1, providers=realistic_providers())
+    assert point.sessions == 3
+    assert point.turns == 3 * sum(len(c.turns) for c in DEFAULT_CONVERSATIONS)
+    assert point.loop_lag_p99_ms >= 0
+    assert 0 <= point.host_cpu_percent <= 100
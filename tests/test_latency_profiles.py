@@ -0,0 +1,65 @@
+import json
+from collections import Counter
+
+import pytest
+
+from latency_profiles import load_profiles, parse_config
+
+
+def _config(**overrides):
+    data = json.loads(json.dumps({
+        "default": "quality",
+        "profiles": {
+            name: {
+                "stt": {"model": "stt-model"},
+                "llm": {"model": "llm-model"},
+                "tts": {"model": "tts-model", "voice": "voice"},
+            }
+            for name in ("quality", "low-latency")
+        },
+    }))
+    data.update(overrides)
+    return parse_config(data)
+
+
+def test_shipped_profiles_load():
+    config = load_profiles()
+    assert {"quality", "low-latency", "telephony"} <= set(config.profiles)
+    assert config.get(config.default).turn_detector == "multilingual"
+    assert config.get("low-latency").endpointing["min_endpointing_delay"] < 0.5
+    assert config.get("quality").hedge["model"] == config.get("low-latency").llm["model"]
+
+
+def test_selection_order(monkeypatch):
+    monkeypatch.delenv("LATENCY_PROFILE", raising=False)
+    config = _config()
+    assert config.select("job-1").name == "quality"
+
+    monkeypatch.setenv("LATENCY_PROFILE", "low-latency")
+    assert config.select("job-1").name == "low-latency"
+    # Dispatch metadata wins over the worker setting
+    assert config.select("job-1", json.dumps({"latency_profile": "quality"})).name == "quality"
+    # An unknown or malformed request from a client falls through
+    assert config.select("job-1", json.dumps({"latency_profile": "nope"})).name == "low-latency"
+    assert config.select("job-1", "not json").name == "low-latency"
+
+
+def test_rollout_is_weighted_and_sticky_per_session(monkeypatch):
+    monkeypatch.delenv("LATENCY_PROFILE", raising=False)
+    config = _config(rollout={"quality": 75, "low-latency": 25})
+    picks = Counter(config.select(f"job-{i}").name for i in range(2000))
+    assert 0.2 < picks["low-latency"] / 2000 < 0.3
+    assert all(config.select("job-7").name == config.select("job-7").name for _ in range(5))
+
+
+def test_invalid_config_is_rejected():
+    with pytest.raises(ValueError):
+        _config(default="missing")
+    with pytest.raises(ValueError):
+        _config(rollout={"missing": 1})
+    for bad_setting in ({"turn_detector": "psychic"}, {"endpointing": {"min_delay": 0.1}}):
+        with pytest.raises(ValueError):
+            parse_config({
+                "default": "quality",
+                "profiles": {"quality": {"stt": {}, "llm": {}, "tts": {"model": "m"}, **bad_setting}},
+            })
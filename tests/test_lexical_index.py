@@ -0,0 +1,52 @@
+import threading
+
+from backend import rag_engine
+from backend.lexical_index import LexicalIndex, split_into_chunks
+
+def test_fallback_answers_from_raw_docs():
+    """
+    Scenario: The vector index isn't ready yet, so the keyword fallback has to answer.
+    """
+    index = LexicalIndex.from_directory(rag_engine.DATA_DIR)
+    assert index is not None, "Fallback should build from data/company_docs"
+
+    chunks = index.search("What are your opening hours?")
+    assert chunks, "Should retrieve at least one chunk"
+    assert any("Monday to Thursday: 11:00 AM" in c for c in chunks)
+
+    chunks = index.search("how much is the tiramisu")
+    assert any("Tiramisu" in c and "₹299" in c for c in chunks)
+
+def test_fallback_ignores_unmatched_queries():
+    index = LexicalIndex(split_into_chunks("Margherita Pizza\nPrice: 449\n\nCoke\nPrice: 99"))
+    assert index.search("the and of") == []
+    assert index.search("sushi") == []
+    assert index.search("coke")[0].startswith("Coke")
+
+def test_index_build_is_single_flight(monkeypatch):
+    """
+    Scenario: Several turns arrive while the index is still building.
+    Only one build should run, and non-blocking callers should get None meanwhile.
+    """
+    calls = []
+    release = threading.Event()
+
+    def slow_build():
+        calls.append(1)
+        release.wait(timeout=5)
+        return "index"
+
+    monkeypatch.setattr(rag_engine, "_load_or_build_index", slow_build)
+    monkeypatch.setattr(rag_engine, "_build_retriever", lambda index: None)
+    monkeypatch.setattr(rag_engine, "_INDEX", None)
+    monkeypatch.setattr(rag_engine, "_BUILD_THREAD", None)
+
+    assert rag_engine.get_index(block=False) is None
+    assert rag_engine.get_index(block=False) is None
+    threads = {rag_engine.start_index_build() for _ in range(5)}
+    assert len(threads) == 1
+
+    release.set()
+    assert rag_engine.get_index() == "index"
+    assert len(calls) == 1
+    assert rag_engine.start_index_build() is None
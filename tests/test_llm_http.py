@@ -0,0 +1,55 @@
+import asyncio
+
+from aiohttp import web
+from prometheus_client import REGISTRY
+
+from llm_http import create_llm_client
+
+
+def _sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+async def _serve(delay):
+    # Local stand-in for an OpenAI-compatible endpoint
+    async def models(request):
+        await asyncio.sleep(delay)
+        return web.json_response({"object": "list", "data": []})
+
+    app = web.Application()
+    app.router.add_get("/v1/models", models)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    return runner, f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}/v1"
+
+
+def test_sequential_requests_reuse_one_connection():
+    async def run():
+        runner, url = await _serve(delay=0)
+        client = create_llm_client(url, api_key="test")
+        new = _sample("agent_llm_http_connections_total", outcome="new")
+        reused = _sample("agent_llm_http_connections_total", outcome="reused")
+        for _ in range(3):
+            await client.models.list()
+        await client.close()
+        await runner.cleanup()
+        assert _sample("agent_llm_http_connections_total", outcome="new") - new == 1
+        assert _sample("agent_llm_http_connections_total", outcome="reused") - reused == 2
+
+    asyncio.run(run())
+
+
+def test_pool_wait_is_recorded_when_the_pool_is_full():
+    async def run():
+        runner, url = await _serve(delay=0.2)
+        client = create_llm_client(url, api_key="test", max_connections=1)
+        waited = _sample("agent_llm_http_pool_wait_seconds_sum")
+        await asyncio.gather(client.models.list(), client.models.list())
+        await client.close()
+        await runner.cleanup()
+        # The second request queued behind the first for its whole response
+        assert _sample("agent_llm_http_pool_wait_seconds_sum") - waited >= 0.15
+
+    asyncio.run(run())
@@ -0,0 +1,59 @@
+import asyncio
+import json
+import logging
+
+import logging_setup
+
+
+def _read_lines(path):
+    return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+
+
+def test_records_carry_session_correlation_id(tmp_path, capsys):
+    logging_setup.configure_logging(level="INFO", transcript_dir=tmp_path)
+    try:
+        async def session(job_id):
+            logging_setup.bind_correlation_id(job_id)
+            logging.getLogger("restaurant.test").info("hello %s", "world", extra={"room": "r1"})
+            logging_setup.log_transcript("user_turn", text="one margherita please")
+
+        async def main():
+            await asyncio.gather(session("job-a"), session("job-b"))
+
+        asyncio.run(main())
+    finally:
+        logging_setup.shutdown_logging()
+
+    console = [json.loads(line) for line in capsys.readouterr().err.splitlines()]
+    assert {r["correlation_id"] for r in console} == {"job-a", "job-b"}
+    assert all(r["msg"] == "hello world" and r["room"] == "r1" for r in console)
+
+    transcript = _read_lines(next(tmp_path.glob("transcript-*.jsonl")))
+    assert {r["correlation_id"] for r in transcript} == {"job-a", "job-b"}
+    assert all(r["event"] == "user_turn" and r["text"] == "one margherita please" for r in transcript)
+
+
+def test_disabled_level_is_not_enqueued(tmp_path, capsys):
+    logging_setup.configure_logging(level="WARNING", transcript_dir=tmp_path)
+    try:
+        logger = logging.getLogger("restaurant.test")
+        assert not logger.isEnabledFor(logging.DEBUG)
+        logger.debug("dropped")
+        logger.warning("kept")
+    finally:
+        logging_setup.shutdown_logging()
+    assert [json.loads(line)["msg"] for line in capsys.readouterr().err.splitlines()] == ["kept"]
+
+
+def test_batched_sink_rotates(tmp_path):
+    handler = logging_setup.BatchedRotatingFileHandler(
+        tmp_path / "events.jsonl", max_bytes=200, backup_count=2, batch_size=4, flush_interval=60
+    )
+    handler.setFormatter(logging_setup.JsonFormatter())
+    for i in range(12):
+        handler.emit(logging.LogRecord("t", logging.INFO, "", 0, "event %d", (i,), None))
+    handler.close()
+    files = sorted(tmp_path.glob("events.jsonl*"))
+    assert len(files) > 1
+    messages = sorted(int(r["msg"].split()[1]) for f in files for r in _read_lines(f))
+    assert messages == list(range(12))[-len(messages):]
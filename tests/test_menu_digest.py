@@ -0,0 +1,76 @@
+import asyncio
+
+from livekit.agents import ChatContext
+
+import agent
+import menu_digest
+from doc_metadata import DOC_TYPE_MENU, DOC_TYPE_PROMOTIONS, DOC_TYPE_RULES
+from rag_engine import DATA_DIR
+
+
+def _items_by_name():
+    menu_text = next(p for p in DATA_DIR.iterdir() if "menu" in p.name.lower()).read_text(encoding="utf-8")
+    notes, items = menu_digest.parse_menu(menu_text)
+    assert any("GST" in note for note in notes)
+    return {item.name: item for item in items}
+
+
+def test_digest_captures_prices_addons_and_dietary():
+    items = _items_by_name()
+    margherita = items["Margherita Pizza"]
+    assert margherita.prices == ["Medium 449", "Large 549"]
+    assert "Gluten-free base (Medium only) 80" in margherita.addons
+    assert margherita.dietary == "veg"
+    assert items["Tiramisu"].dietary == "veg (contains eggs)"
+    assert items["Pepperoni Piccante Pizza"].dietary == "non-veg"
+    assert items["Spaghetti Aglio e Olio"].prices == ["399"]
+    assert items["Soft Drinks (330 ml can)"].prices == ["Coke 99", "Diet Coke 99", "Sprite 99"]
+
+
+def test_stale_digest_file_is_rebuilt(tmp_path, monkeypatch):
+    monkeypatch.setattr(menu_digest, "_digest_cache", None)
+    path = tmp_path / "menu_digest.txt"
+    path.write_text("# corpus-hash: outdated\nstale digest\n", encoding="utf-8")
+    digest = menu_digest.load_digest(DATA_DIR, path)
+    assert "stale digest" not in digest and "Margherita Pizza |" in digest
+
+    written = menu_digest.write_digest(DATA_DIR, path)
+    monkeypatch.setattr(menu_digest, "_digest_cache", None)
+    assert menu_digest.load_digest(DATA_DIR, path) == written
+
+
+def _run_turn(assistant, text):
+    ctx = ChatContext.empty()
+    message = ctx.add_message(role="user", content=text)
+    asyncio.run(assistant.on_user_turn_completed(ctx, message))
+    return ctx
+
+
+def test_digest_mode_only_retrieves_promotions_and_rules(monkeypatch):
+    searches = []
+
+    def fake_search(query, retrieval_filter, widen=True, query_embedding=None):
+        searches.append((retrieval_filter, widen))
+        return "context"
+
+    monkeypatch.setattr(agent, "search_menu", fake_search)
+    assistant = agent.RestaurantAssistant(context_mode=menu_digest.CONTEXT_MODE_DIGEST)
+    assert "Margherita Pizza |" in assistant.instructions
+
+    # Answered from the digest: no retrieval, no injected context
+    ctx = _run_turn(assistant, "Which pizzas and desserts do you have?")
+    assert searches == [] and len(ctx.items) == 1
+
+    _run_turn(assistant, "Do you deliver to Lajpat Nagar?")
+    (retrieval_filter, widen), = searches
+    assert retrieval_filter.doc_types == frozenset({DOC_TYPE_RULES}) and not widen
+
+    searches.clear()
+    _run_turn(assistant, "Add a medium pepperoni")
+    assert searches[0][0].doc_types == frozenset({DOC_TYPE_PROMOTIONS, DOC_TYPE_RULES})
+    assert DOC_TYPE_MENU not in searches[0][0].doc_types
+
+
+def test_retrieval_mode_keeps_the_menu_out_of_the_instructions():
+    assistant = agent.RestaurantAssistant(context_mode=menu_digest.CONTEXT_MODE_RETRIEVAL)
+    assert "Margherita Pizza |" not in assistant.instructions
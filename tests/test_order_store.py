@@ -0,0 +1,143 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+from order_store import STATUS_CANCELLED, STATUS_PENDING, STATUS_PLACED, OrderStore, new_order_id
+
+ITEMS = [{"name": "Margherita", "quantity": 1, "price": 299.0, "size": "Medium", "addons": []}]
+
+
+def test_placing_an_order_id_twice_keeps_the_first(tmp_path):
+    store = OrderStore(tmp_path / "orders.sqlite3")
+    first = store.place("ORD-1", "alice", "room-1", ITEMS, 314.0)
+    again = store.place("ORD-1", "bob", "room-2", [], 0.0)
+    assert again == first
+    store.close()
+
+
+def test_orders_and_status_changes_survive_a_restart(tmp_path):
+    path = tmp_path / "orders.sqlite3"
+    store = OrderStore(path)
+    store.place("ORD-1", "alice", "room-1", ITEMS, 314.0, placed_at=time.time() - 60)
+    store.place("ORD-2", "alice", "room-1", ITEMS, 314.0)
+    store.set_status("ORD-1", STATUS_CANCELLED)
+    assert store.flush(timeout=2.0)
+    store.close()
+
+    reopened = OrderStore(path)
+    assert reopened.get("ORD-1").status == STATUS_CANCELLED
+    assert reopened.latest_for("alice").order_id == "ORD-2"
+    assert reopened.get("ORD-2").items == ITEMS
+    reopened.close()
+
+
+def test_orders_outside_retention_are_read_from_the_table(tmp_path):
+    path = tmp_path / "orders.sqlite3"
+    store = OrderStore(path)
+    store.place("ORD-OLD", "alice", "room-1", ITEMS, 314.0, placed_at=time.time() - 3 * 86400)
+    store.close()
+
+    reopened = OrderStore(path, retention=86400)
+    assert reopened.latest_for("alice").order_id == "ORD-OLD"
+    assert reopened.latest_for("nobody") is None
+    reopened.close()
+
+
+def test_event_loop_reads_miss_to_a_worker_thread(tmp_path):
+    path = tmp_path / "orders.sqlite3"
+    store = OrderStore(path)
+    store.place("ORD-OLD", "alice", "room-1", ITEMS, 314.0, placed_at=time.time() - 3 * 86400)
+    store.close()
+
+    async def run(store):
+        return await store.get_async("ORD-OLD"), await store.latest_for_async("alice"), await store.get_async("nope")
+
+    reopened = OrderStore(path, retention=86400)
+    by_id, latest, missing = asyncio.run(run(reopened))
+    assert by_id.order_id == latest.order_id == "ORD-OLD"
+    assert missing is None
+    # Now in memory
+    assert reopened._orders["ORD-OLD"] == by_id
+    reopened.close()
+
+
+def test_placing_a_fresh_id_skips_the_table(tmp_path, monkeypatch):
+    store = OrderStore(tmp_path / "orders.sqlite3")
+
+    def no_reads(*args):
+        raise AssertionError("fresh ids must not be looked up")
+
+    monkeypatch.setattr(store, "_select", no_reads)
+    order = store.place(new_order_id(), "alice", "room-1", ITEMS, 314.0, fresh=True)
+    assert store.get(order.order_id) == order
+    store.close()
+
+
+def test_change_window(tmp_path):
+    store = OrderStore(tmp_path / "orders.sqlite3")
+    fresh = store.place("ORD-1", "alice", "room-1", ITEMS, 314.0)
+    stale = store.place("ORD-2", "bob", "room-2", ITEMS, 314.0, placed_at=time.time() - 301)
+    assert fresh.can_change()
+    assert not stale.can_change()
+    assert not store.set_status("ORD-1", STATUS_CANCELLED).can_change()
+    store.close()
+
+
+def test_window_starts_when_a_pending_order_is_paid(tmp_path):
+    """
+    Scenario: The caller is sent to pay and pays ten minutes later. The
+    unpaid order isn't placed, and the 5-minute window starts at payment.
+    """
+    path = tmp_path / "orders.sqlite3"
+    store = OrderStore(path)
+    pending = store.place("ORD-1", "alice", "room-1", ITEMS, 314.0, placed_at=time.time() - 600, status=STATUS_PENDING)
+    assert not pending.can_change()
+    paid = store.set_status("ORD-1", STATUS_PLACED, restart=True)
+    assert paid.can_change()
+    store.place("ORD-2", "bob", "room-2", ITEMS, 314.0, status=STATUS_PENDING)
+    store.set_status("ORD-2", STATUS_CANCELLED)
+    assert store.flush(timeout=2.0)
+    store.close()
+
+    reopened = OrderStore(path)
+    assert reopened.get("ORD-1").can_change()
+    assert reopened.get("ORD-2").status == STATUS_CANCELLED
+    reopened.close()
+
+
+def test_writes_are_batched(tmp_path):
+    store = OrderStore(tmp_path / "orders.sqlite3", batch_size=50, flush_interval=0.5)
+    started = time.perf_counter()
+    for i in range(200):
+        store.place(f"ORD-{i}", f"caller-{i % 7}", "room", ITEMS, 314.0)
+    # Queued, not written: placing never waits on the disk
+    assert time.perf_counter() - started < 0.1
+    assert store.flush(timeout=5.0)
+    count = store._reader.execute("SELECT COUNT(*) FROM orders").fetchone()[0]
+    assert count == 200
+    store.close()
+
+
+def test_orders_can_only_be_cancelled_by_their_caller(tmp_path, monkeypatch):
+    """
+    Scenario: A caller reads out someone else's order number. The order
+    must not be found, so it isn't cancelled.
+    """
+    from livekit import rtc
+
+    import tools.order_helpers as order_helpers
+
+    store = OrderStore(tmp_path / "orders.sqlite3")
+    store.place("ORD-1", "alice", "room-1", ITEMS, 314.0)
+    monkeypatch.setattr(order_helpers, "get_order_store", lambda: store)
+
+    def agent_for(identity, room_name):
+        caller = SimpleNamespace(identity=identity, kind=rtc.ParticipantKind.PARTICIPANT_KIND_STANDARD)
+        room = SimpleNamespace(name=room_name, remote_participants={identity: caller})
+        return SimpleNamespace(session=SimpleNamespace(room=room))
+
+    for identity, room_name in (("mallory", "room-1"), ("alice", "room-2")):
+        reply = asyncio.run(order_helpers.handle_cancel_order(agent_for(identity, room_name), "ORD-1"))
+        assert reply.startswith("I couldn't find an order")
+    assert store.get("ORD-1").status == STATUS_PLACED
+    store.close()
@@ -0,0 +1,107 @@
+import zlib
+
+import numpy as np
+
+from backend import rag_engine
+from backend.doc_metadata import (
+    DIETARY_GLUTEN_FREE_OPTION,
+    DIETARY_NON_VEGETARIAN,
+    DIETARY_VEGETARIAN,
+    DOC_TYPE_MENU,
+    DOC_TYPE_RULES,
+    chunk_document,
+    split_labels,
+)
+from backend.partitioned_retriever import PartitionedRetriever
+from backend.retrieval_filters import NO_FILTER, RetrievalFilter, infer_retrieval_filter
+from backend.lexical_index import tokenize
+
+def _load_chunks():
+    chunks = []
+    for path in sorted(rag_engine.DATA_DIR.glob("*.txt")):
+        chunks.extend(chunk_document(path.read_text(encoding="utf-8"), path.name))
+    return chunks
+
+def _bag_of_words_embedding(text, dim=256):
+    """Deterministic stand-in for the embedding model: hashed term counts."""
+    vector = np.zeros(dim, dtype=np.float32)
+    for token in tokenize(text):
+        vector[zlib.crc32(token.encode()) % dim] += 1.0
+    return vector
+
+def _retriever():
+    chunks = _load_chunks()
+    return PartitionedRetriever(
+        texts=[text for text, _ in chunks],
+        metadatas=[metadata for _, metadata in chunks],
+        embeddings=np.stack([_bag_of_words_embedding(text) for text, _ in chunks]),
+        embed_query=_bag_of_words_embedding,
+    )
+
+def test_menu_items_are_tagged():
+    # Keyed by every line, since section headings are merged into the first item
+    chunks = {line: metadata for text, metadata in _load_chunks() for line in text.splitlines()}
+
+    pepperoni = chunks["Pepperoni Piccante Pizza"]
+    assert pepperoni["doc_type"] == DOC_TYPE_MENU
+    assert pepperoni["category"] == "pizza"
+    assert split_labels(pepperoni["dietary"]) == [DIETARY_NON_VEGETARIAN]
+
+    tiramisu = chunks["Tiramisu"]
+    assert tiramisu["category"] == "dessert"
+    assert DIETARY_VEGETARIAN in split_labels(tiramisu["dietary"])
+    assert "contains-eggs" in split_labels(tiramisu["dietary"])
+
+    assert chunks["OPENING HOURS"]["doc_type"] == DOC_TYPE_RULES
+
+def test_infer_filter_from_query():
+    assert infer_retrieval_filter("hello there") == NO_FILTER
+
+    hours = infer_retrieval_filter("what are your opening hours")
+    assert hours.doc_types == frozenset({DOC_TYPE_RULES})
+
+def test_spoken_dietary_phrases():
+    for query in ("any non veg pizza?", "something nonveg", "non-veg starters", "non vegetarian pasta"):
+        assert infer_retrieval_filter(query).dietary == frozenset({DIETARY_NON_VEGETARIAN}), query
+
+    for query in ("is the base gluten free?", "a gluten-free pizza"):
+        assert infer_retrieval_filter(query).dietary == frozenset({DIETARY_GLUTEN_FREE_OPTION}), query
+
+    assert infer_retrieval_filter("veg pizza").dietary == frozenset({DIETARY_VEGETARIAN})
+
+def test_vegan_is_not_narrowed_to_vegetarian_items():
+    """
+    Scenario: Vegetarian items can contain dairy, and nothing is labelled vegan.
+    "Vegan" must not filter on the vegetarian label.
+    """
+    assert infer_retrieval_filter("is anything vegan?") == NO_FILTER
+
+    vegan_pizza = infer_retrieval_filter("do you have a vegan pizza?")
+    assert vegan_pizza.dietary == frozenset()
+    assert vegan_pizza.categories == frozenset({"pizza"})
+    # The allergy policy and the FAQs answer it
+    assert DOC_TYPE_RULES in vegan_pizza.doc_types
+
+def test_filtered_search_stays_inside_partition():
+    """
+    Scenario: "Which pizzas are vegetarian?" should only score vegetarian pizzas.
+    """
+    retriever = _retriever()
+    veg_pizzas = RetrievalFilter(
+        doc_types=frozenset({DOC_TYPE_MENU}),
+        categories=frozenset({"pizza"}),
+        dietary=frozenset({DIETARY_VEGETARIAN}),
+    )
+    results = retriever.retrieve("which pizzas are vegetarian", veg_pizzas, top_k=10)
+
+    assert len(results) == 4
+    for chunk in results:
+        assert chunk.metadata["category"] == "pizza"
+        assert DIETARY_VEGETARIAN in split_labels(chunk.metadata["dietary"])
+
+    rules_only = RetrievalFilter(doc_types=frozenset({DOC_TYPE_RULES}))
+    results = retriever.retrieve("opening hours monday", rules_only, top_k=3)
+    assert all(c.metadata["doc_type"] == DOC_TYPE_RULES for c in results)
+    assert any("Monday to Thursday" in c.text for c in results)
+
+    assert len(retriever.retrieve("pizza", NO_FILTER, top_k=100)) == len(retriever)
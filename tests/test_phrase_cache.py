@@ -0,0 +1,85 @@
+import asyncio
+
+import phrase_cache
+from phrase_cache import CLEARED_CART, GREETING, PhraseCache, default_phrases
+from simulation.fakes import FakeRoom, FakeSession, FakeTTS
+from simulation.harness import SimulatedAssistant
+
+
+def _filled_cache(tmp_path, phrases, tts=None):
+    cache = PhraseCache("test-model", "test-voice", tmp_path)
+    asyncio.run(cache.fill(phrases, (tts or FakeTTS(first_frame_delay=0.0)).synthesize_frames))
+    return cache
+
+
+def test_default_phrases_cover_fixed_and_templated_confirmations():
+    phrases = default_phrases()
+    assert GREETING in phrases
+    assert CLEARED_CART in phrases
+    assert "Removed Margherita Pizza from your cart." in phrases
+
+
+def test_fill_persists_phrases_and_skips_cached_ones(tmp_path):
+    tts = FakeTTS(first_frame_delay=0.0)
+    cache = _filled_cache(tmp_path, [GREETING, CLEARED_CART], tts)
+    assert tts.synthesized == [GREETING, CLEARED_CART]
+    assert len(list(tmp_path.glob("*.wav"))) == 2
+
+    asyncio.run(cache.fill([GREETING, CLEARED_CART], tts.synthesize_frames))
+    assert tts.synthesized == [GREETING, CLEARED_CART]
+
+    reloaded = PhraseCache("test-model", "test-voice", tmp_path)
+    assert reloaded.load([GREETING, CLEARED_CART, "Not cached."]) == 2
+    assert reloaded.missing([GREETING, "Not cached."]) == ["Not cached."]
+
+
+def test_cache_is_keyed_by_voice_and_model(tmp_path):
+    _filled_cache(tmp_path, [GREETING])
+    assert PhraseCache("test-model", "other-voice", tmp_path).load([GREETING]) == 0
+    assert PhraseCache("other-model", "test-voice", tmp_path).load([GREETING]) == 0
+
+
+def test_cached_audio_round_trips_as_frames(tmp_path):
+    tts = FakeTTS(first_frame_delay=0.0, sample_rate=16000)
+    _filled_cache(tmp_path, [GREETING], tts)
+    reloaded = PhraseCache("test-model", "test-voice", tmp_path)
+    reloaded.load([GREETING])
+
+    async def collect():
+        return [frame async for frame in reloaded.audio(GREETING)]
+
+    frames = asyncio.run(collect())
+    expected_samples = (len(GREETING) * tts.ms_per_char // tts.frame_ms) * 16000 * tts.frame_ms // 1000
+    assert all(frame.sample_rate == 16000 for frame in frames)
+    assert sum(frame.samples_per_channel for frame in frames) == expected_samples
+    assert reloaded.audio("Not cached.") is None
+
+
+def test_greeting_and_confirmations_play_from_the_cache(tmp_path):
+    cache = _filled_cache(tmp_path, [GREETING, CLEARED_CART])
+
+    async def run():
+        session = FakeSession(FakeRoom("phrase-room"))
+        assistant = SimulatedAssistant(session, phrase_cache=cache)
+        await assistant.on_enter()
+        result = await assistant.clear_cart(None)
+        await asyncio.sleep(0.05)
+        return session, result
+
+    session, result = asyncio.run(run())
+    # No LLM turn: the greeting and the confirmation are played as cached audio
+    assert result is None
+    assert [s.text for s in session.speeches] == [GREETING, CLEARED_CART]
+    assert all(s.instructions is None and s.audio_frames > 0 for s in session.speeches)
+
+
+def test_uncached_confirmation_is_returned_to_the_llm(tmp_path):
+    cache = _filled_cache(tmp_path, [GREETING])
+
+    async def run():
+        session = FakeSession(FakeRoom("phrase-room"))
+        return session, await SimulatedAssistant(session, phrase_cache=cache).go_to_menu(None)
+
+    session, result = asyncio.run(run())
+    assert result == phrase_cache.BACK_TO_MENU
+    assert session.speeches == []
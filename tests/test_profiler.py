@@ -0,0 +1,85 @@
+import threading
+import time
+import urllib.request
+
+import pytest
+from livekit.agents import ChatContext
+
+import admin_server
+import profiler
+
+
+def _busy_loop(stop):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+class _Agent:
+    def __init__(self):
+        self.chat_ctx = ChatContext.empty()
+
+
+def test_sampled_stacks_are_collapsed_and_tagged_with_sessions():
+    agent = _Agent()
+    profiler.track_session("job-1", agent)
+    stop = threading.Event()
+    worker = threading.Thread(target=_busy_loop, args=(stop,), name="busy worker")
+    worker.start()
+    try:
+        collapsed = profiler.profile_cpu(seconds=0.2, interval=0.005)
+    finally:
+        stop.set()
+        worker.join()
+        profiler.untrack_session("job-1")
+
+    lines = collapsed.splitlines()
+    assert lines
+    for line in lines:
+        stack, count = line.rsplit(" ", 1)
+        assert int(count) > 0 and " " not in stack
+    busy = [line for line in lines if ";busy_worker;" in line]
+    assert busy and all(line.startswith("sessions[job-1];") for line in busy)
+    assert any("_busy_loop" in line for line in busy)
+
+
+def test_heap_snapshot_reports_chat_context_growth():
+    agent = _Agent()
+    profiler.track_session("job-2", agent)
+
+    def grow():
+        time.sleep(0.05)
+        for i in range(20):
+            agent.chat_ctx.add_message(role="user", content=f"one more margherita please {i}")
+
+    grower = threading.Thread(target=grow)
+    grower.start()
+    try:
+        report = profiler.profile_heap(seconds=0.2)
+    finally:
+        grower.join()
+        profiler.untrack_session("job-2")
+
+    session = report["sessions"]["job-2"]
+    assert session["chat_items"] == 20 and session["chat_items_delta"] == 20
+    assert session["chat_bytes_delta"] > 0
+    assert report["top_growth"]
+
+
+def test_concurrent_captures_are_rejected():
+    assert profiler._CAPTURE_LOCK.acquire(blocking=False)
+    try:
+        with pytest.raises(profiler.ProfilerBusyError):
+            profiler.profile_cpu(seconds=0.01)
+    finally:
+        profiler._CAPTURE_LOCK.release()
+
+
+def test_profile_endpoint():
+    port = admin_server.start_admin_server(port=0)
+    assert port
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/debug/profile?seconds=0.1") as response:
+            body = response.read().decode()
+    finally:
+        admin_server.stop_admin_server()
+    assert "sessions[" in body
@@ -0,0 +1,80 @@
+from livekit.agents.llm import ChatContext, FunctionCall, FunctionCallOutput
+
+import prompt_budget
+from agent import RestaurantAssistant
+from prompt_budget import RAG_CONTEXT_EXTRA, enforce_budget, measure
+
+MENU_CHUNKS = [
+    "Margherita Pizza: San Marzano tomato, fior di latte, basil. Medium 449, Large 589.",
+    "Pepperoni Piccante Pizza: spicy pepperoni, chilli oil, mozzarella. Medium 549, Large 699.",
+    "Four Cheese Pizza: mozzarella, gorgonzola, parmesan, provolone. Medium 529, Large 679.",
+]
+
+
+def _rag(ctx, chunks):
+    ctx.add_message(
+        role="assistant",
+        content="Menu and rules context relevant to the user's query:\n" + "\n\n".join(chunks),
+        extra={RAG_CONTEXT_EXTRA: True},
+    )
+
+
+def _conversation(turns):
+    assistant = RestaurantAssistant()
+    ctx = ChatContext.empty()
+    ctx.add_message(role="system", content=assistant.instructions)
+    for i in range(turns):
+        ctx.add_message(role="user", content=f"Add pizza number {i} to my order please")
+        _rag(ctx, MENU_CHUNKS)
+        call = FunctionCall(call_id=f"call-{i}", name="add_item_to_cart", arguments='{"item_name": "Margherita Pizza"}')
+        ctx.insert(call)
+        ctx.insert(FunctionCallOutput(call_id=f"call-{i}", name="add_item_to_cart", output="Added.", is_error=False))
+        ctx.add_message(role="assistant", content=f"Added pizza number {i}. Anything else?")
+    return ctx, assistant.tools
+
+
+def test_measures_each_component():
+    ctx, tools = _conversation(2)
+    usage = measure(ctx, tools)
+    assert usage.instructions > 200 and usage.tools > 500
+    assert usage.rag_context > 0 and usage.history > 0
+    assert usage.total == sum(usage.by_component().values())
+
+
+def test_under_budget_is_untouched():
+    ctx, tools = _conversation(1)
+    trimmed, usage = enforce_budget(ctx, tools, budget=100_000)
+    assert trimmed is ctx and usage.trimmed == []
+
+
+def test_trims_stale_rag_then_history_within_budget():
+    ctx, tools = _conversation(12)
+    before = measure(ctx, tools)
+    budget = before.instructions + before.tools + 300
+    original_items = list(ctx.items)
+
+    trimmed, usage = enforce_budget(ctx, tools, budget=budget)
+
+    assert usage.total <= budget
+    assert usage.trimmed[0] == "stale_rag_context"
+    assert "history" in usage.trimmed
+    # Instructions and the current turn's context survive
+    assert trimmed.items[0].role == "system"
+    rag = [i for i in trimmed.items if i.type == "message" and i.extra.get(RAG_CONTEXT_EXTRA)]
+    assert len(rag) == 1 and rag[0].id == original_items[-4].id
+    # Tool calls are never separated from their outputs
+    calls = {i.call_id for i in trimmed.items if i.type == "function_call"}
+    outputs = {i.call_id for i in trimmed.items if i.type == "function_call_output"}
+    assert calls == outputs
+    # The caller's context is left as it was
+    assert list(ctx.items) == original_items
+
+
+def test_current_rag_context_loses_lowest_ranked_chunks_last():
+    ctx, tools = _conversation(1)
+    before = measure(ctx, tools)
+    budget = before.total - prompt_budget.count_tokens(MENU_CHUNKS[-1])
+    trimmed, usage = enforce_budget(ctx, tools, budget=budget, min_history_items=10)
+    assert usage.trimmed == ["rag_chunks"]
+    rag = next(i for i in trimmed.items if i.type == "message" and i.extra.get(RAG_CONTEXT_EXTRA))
+    assert MENU_CHUNKS[0] in rag.text_content and MENU_CHUNKS[-1] not in rag.text_content
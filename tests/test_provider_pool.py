@@ -0,0 +1,167 @@
+import asyncio
+import json
+
+import aiohttp
+from aiohttp import web
+from livekit.agents import inference
+
+from latency_profiles import load_profiles
+from provider_pool import ProviderPool, Providers
+
+PROFILE = load_profiles().get("quality")
+
+
+class _FakeComponent:
+    def __init__(self):
+        self.prewarmed = 0
+        self.closed = False
+
+    def prewarm(self):
+        self.prewarmed += 1
+
+    async def aclose(self):
+        self.closed = True
+
+
+class _TtsGateway:
+    """Local stand-in for the inference gateway's TTS websocket."""
+
+    def __init__(self):
+        self.sessions = []
+        self.open = 0
+
+    async def handle(self, request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self.open += 1
+        async for msg in ws:
+            self.sessions.append(json.loads(msg.data))
+        self.open -= 1
+        return ws
+
+
+async def _serve(handler):
+    app = web.Application()
+    app.router.add_get("/tts", handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    return runner, f"ws://127.0.0.1:{site._server.sockets[0].getsockname()[1]}"
+
+
+async def _until(condition, timeout=2.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline, "timed out"
+        await asyncio.sleep(0.01)
+
+
+def test_pooled_tts_is_connected_before_checkout_and_evicted_when_idle():
+    async def run():
+        gateway = _TtsGateway()
+        runner, url = await _serve(gateway.handle)
+        async with aiohttp.ClientSession() as http:
+
+            def factory(profile):
+                tts = inference.TTS(
+                    profile.tts["model"],
+                    voice=profile.tts["voice"],
+                    base_url=url,
+                    api_key="key",
+                    api_secret="secret-that-is-long-enough-for-hs256",
+                    http_session=http,
+                )
+                return Providers(stt=_FakeComponent(), llm=_FakeComponent(), tts=tts)
+
+            pool = ProviderPool(size=1, max_idle=0.3, max_sessions=2, factory=factory)
+            assert pool.fill(PROFILE) == 1
+            await _until(lambda: gateway.open == 1)
+            assert gateway.sessions[0]["voice"] == PROFILE.tts["voice"]
+
+            # The session gets the already-connected set; a replacement is warmed behind it
+            providers = pool.checkout(PROFILE)
+            assert providers.llm.prewarmed == 1
+            await _until(lambda: gateway.open == 2)
+            assert pool.idle_count(PROFILE) == 1
+
+            # The pooled replacement is closed once idle too long
+            await _until(lambda: gateway.open == 1)
+            assert pool.idle_count(PROFILE) == 0
+
+            await pool.release(providers)
+            await _until(lambda: gateway.open == 0)
+            await pool.aclose()
+        await runner.cleanup()
+
+    asyncio.run(run())
+
+
+def test_failed_warmup_falls_back_to_a_direct_build_and_backs_off():
+    async def run():
+        calls = []
+
+        def factory(profile):
+            calls.append(profile.name)
+            if len(calls) == 1:
+                raise ConnectionError("provider down")
+            return Providers(stt=_FakeComponent(), llm=_FakeComponent(), tts=_FakeComponent())
+
+        pool = ProviderPool(size=1, retry_after=60.0, max_sessions=2, factory=factory)
+        assert pool.fill(PROFILE) == 0
+        # Still in the retry window: no refill attempt
+        assert pool.fill(PROFILE) == 0
+        assert len(calls) == 1
+
+        providers = pool.checkout(PROFILE)
+        assert providers.tts.prewarmed == 1
+        assert len(calls) == 2
+        await asyncio.sleep(0)
+        # The direct build succeeded, which clears the back-off and refills the pool
+        assert pool.idle_count(PROFILE) == 1
+        await pool.aclose()
+
+    asyncio.run(run())
+
+
+def _fake_providers(profile):
+    return Providers(stt=_FakeComponent(), llm=_FakeComponent(), tts=_FakeComponent())
+
+
+def test_prewarm_fill_is_connected_at_the_first_checkout():
+    """
+    Scenario: prewarm fills the pool before the job process's event loop
+    starts. The sets wait unconnected, and the first session connects its set.
+    """
+    pool = ProviderPool(size=1, max_idle=0.01, factory=_fake_providers)
+    assert pool.fill(PROFILE) == 1
+
+    async def run():
+        # Unconnected sets hold no connections, so they aren't evicted for idling
+        assert pool.evict_idle() == 0
+        providers = pool.checkout(PROFILE)
+        assert providers.tts.prewarmed == 1
+        assert providers.warmed_at is not None
+        await pool.release(providers)
+        assert providers.tts.closed
+        await pool.aclose()
+
+    asyncio.run(run())
+
+
+def test_busy_process_is_not_refilled():
+    async def run():
+        pool = ProviderPool(size=1, max_sessions=1, factory=_fake_providers)
+        assert pool.fill(PROFILE) == 1
+        providers = pool.checkout(PROFILE)
+        await asyncio.sleep(0)
+        # The process's only session has the set: no second one is connected
+        assert pool.idle_count(PROFILE) == 0
+
+        await pool.release(providers)
+        second = pool.checkout(PROFILE)
+        assert second.tts.prewarmed == 1
+        await pool.release(second)
+        await pool.aclose()
+
+    asyncio.run(run())
@@ -1,3 +1,5 @@
+import os
+
 import pytest
 from backend.rag_engine import get_index
 
@@ -18,7 +20,7 @@ def test_retrieval_specific_fact(rag_index):
     """
     assert rag_index is not None, "Index should be loaded"
     
-    question = "What are the opening hours?" # Adjust based on your actual data
+    question = "What are the opening hours?"
     retriever = rag_index.as_retriever(similarity_top_k=3)
     nodes = retriever.retrieve(question)
     
@@ -29,13 +31,12 @@ def test_retrieval_specific_fact(rag_index):
     content = "\n".join([n.text for n in nodes]).lower()
     print(f"\nRetrieved Content: {content}")
     
-    # Check for keywords (Assuming '11 am' or generic time is in the docs)
-    # Since I don't know the exact doc content, I will check for general lengths or expected trivial tokens.
-    # Replace these assertions with real ones based on your data/company_docs/
-    # assert "am" in content or "pm" in content
+    # The rules doc opens at 11:00 AM every day
+    assert "11:00 am" in content
 
 # 3. Test Case: Verify Query Engine (LLM Mode - checks Synthesis)
 # This requires an LLM API Key (Groq) to be active.
+@pytest.mark.skipif(not os.getenv("GROQ_API_KEY"), reason="needs GROQ_API_KEY for synthesis")
 def test_query_engine_synthesis(rag_index):
     """
     Scenario: Ask the engine to answer a question.
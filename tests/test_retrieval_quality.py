@@ -0,0 +1,61 @@
+from pathlib import Path
+
+import pytest
+
+from doc_metadata import chunk_document
+from partitioned_retriever import RetrievedChunk
+from retrieval_benchmark import MODE_INFERRED, MODE_UNFILTERED, GoldenQuery, evaluate, load_golden, score_ranking
+
+DATA_DIR = Path(__file__).parent.parent / "data" / "company_docs"
+
+
+def _real_chunks():
+    chunks = []
+    for path in sorted(DATA_DIR.glob("*.txt")):
+        for text, metadata in chunk_document(path.read_text(encoding="utf-8"), path.name):
+            chunks.append(RetrievedChunk(text=text, score=0.0, metadata=metadata))
+    return chunks
+
+
+# 1. Test Case: The golden set points at sections that exist
+def test_every_golden_section_is_one_real_chunk():
+    """
+    Scenario: A doc or chunker change renames or splits a section.
+    Each golden marker must still pick out exactly one chunk, or the
+    benchmark would silently score against nothing.
+    """
+    chunks = _real_chunks()
+    for query in load_golden():
+        for doc_type, marker in query.relevant:
+            matches = [c for c in chunks if c.metadata["doc_type"] == doc_type and marker in c.text]
+            assert len(matches) == 1, f"{query.question!r}: {doc_type} {marker!r} matches {len(matches)} chunks"
+
+
+# 2. Test Case: recall@k and MRR
+def test_ranking_scores():
+    query = GoldenQuery("Delivery fee?", relevant=(("rules", "Delivery fee:"), ("promotions", "Delivery minimum")))
+    fee = RetrievedChunk("Delivery fee: ₹40", 0.9, {"doc_type": "rules"})
+    minimum = RetrievedChunk("Delivery minimum of ₹600", 0.8, {"doc_type": "promotions"})
+    # Right text, wrong partition: not relevant
+    decoy = RetrievedChunk("Delivery fee: see rules", 0.7, {"doc_type": "menu"})
+
+    scores = score_ranking(query, [decoy, fee, fee, minimum])
+    assert scores == {"recall@1": 0.0, "recall@3": 0.5, "recall@5": 1.0, "mrr": 0.5}
+    assert score_ranking(query, [decoy])["mrr"] == 0.0
+
+
+# 3. Test Case: Quality of the real index (needs the embedding model)
+def test_real_index_finds_the_golden_sections():
+    pytest.importorskip("llama_index.embeddings.huggingface")
+    from rag_engine import get_retriever
+
+    retriever = get_retriever()
+    if retriever is None:
+        pytest.skip("Partitioned retriever unavailable")
+
+    report, misses = evaluate(retriever, load_golden())
+    print("\n".join(misses))
+    # Floors, not targets: track the real numbers with backend/retrieval_benchmark.py
+    for mode in (MODE_INFERRED, MODE_UNFILTERED):
+        assert report[mode]["recall@5"] >= 0.7, report[mode]
+        assert report[mode]["mrr"] >= 0.5, report[mode]
@@ -0,0 +1,60 @@
+from dataclasses import replace
+from types import SimpleNamespace
+
+from livekit import rtc
+
+import session_factory
+from latency_profiles import load_profiles
+
+
+class _FakeProc:
+    def __init__(self):
+        self.userdata = {}
+
+
+def _participant(kind):
+    return SimpleNamespace(participant=SimpleNamespace(kind=kind))
+
+
+def test_noise_cancellation_is_created_once_per_process():
+    proc = _FakeProc()
+    first = session_factory.room_options(proc).audio_input.noise_cancellation
+    second = session_factory.room_options(proc).audio_input.noise_cancellation
+
+    sip = first(_participant(rtc.ParticipantKind.PARTICIPANT_KIND_SIP))
+    web = first(_participant(rtc.ParticipantKind.PARTICIPANT_KIND_STANDARD))
+    assert sip is not web
+    assert second(_participant(rtc.ParticipantKind.PARTICIPANT_KIND_SIP)) is sip
+    assert second(_participant(rtc.ParticipantKind.PARTICIPANT_KIND_STANDARD)) is web
+
+
+def test_turn_detector_is_shared_across_jobs_in_a_process(monkeypatch):
+    created = []
+
+    def fake_model():
+        created.append("multilingual")
+        return object()
+
+    monkeypatch.setitem(session_factory._TURN_DETECTOR_MODELS, "multilingual", fake_model)
+    profile = load_profiles().get("quality")
+    proc = _FakeProc()
+    first_job = SimpleNamespace(proc=proc)
+    second_job = SimpleNamespace(proc=proc)
+
+    assert session_factory.turn_detector(first_job, profile) is session_factory.turn_detector(second_job, profile)
+    assert created == ["multilingual"]
+
+
+def test_vad_and_stt_turn_detection_need_no_model():
+    profile = replace(load_profiles().get("quality"), turn_detector="vad")
+    assert session_factory.turn_detector(SimpleNamespace(proc=_FakeProc()), profile) == "vad"
+
+
+def test_only_bootstrap_dispatches_are_warmed_up():
+    def ctx(metadata):
+        return SimpleNamespace(job=SimpleNamespace(metadata=metadata))
+
+    assert session_factory.is_warmup_dispatch(ctx('{"warmup": true, "identity": "caller-1"}'))
+    assert not session_factory.is_warmup_dispatch(ctx('{"latency_profile": "telephony"}'))
+    assert not session_factory.is_warmup_dispatch(ctx(""))
+    assert not session_factory.is_warmup_dispatch(ctx("not json"))
@@ -0,0 +1,76 @@
+import time
+
+from session_store import SUMMARY_LINE_CHARS, SUMMARY_LINES, SessionSnapshot, SessionStore, compact_summary
+
+CART = [{"name": "Margherita", "quantity": 2, "price": 299.0, "size": "Medium", "addons": ["olives"]}]
+
+
+def _snapshot(**overrides):
+    fields = dict(
+        cart_items=CART,
+        fulfilment="delivery",
+        summary=[("user", "Two medium margheritas with olives"), ("assistant", "Added them to your cart.")],
+    )
+    fields.update(overrides)
+    return SessionSnapshot(**fields)
+
+
+def test_latest_snapshot_survives_a_restart(tmp_path):
+    path = tmp_path / "sessions.sqlite3"
+    store = SessionStore(path)
+    store.save("room-1", "alice", _snapshot(fulfilment="pickup"))
+    store.save("room-1", "alice", _snapshot())
+    store.save("room-1", "bob", _snapshot(cart_items=[]))
+    assert store.flush(timeout=2.0)
+    store.close()
+
+    reopened = SessionStore(path)
+    restored = reopened.load("room-1", "alice")
+    assert restored.cart_items == CART
+    assert restored.fulfilment == "delivery"
+    assert restored.summary[0] == ("user", "Two medium margheritas with olives")
+    assert reopened.load("room-1", "bob").cart_items == []
+    assert reopened.load("room-2", "alice") is None
+    reopened.close()
+
+
+def test_unwritten_snapshot_is_loaded_and_expired_ones_are_not(tmp_path):
+    store = SessionStore(tmp_path / "sessions.sqlite3", ttl=60)
+    store.save("room-1", "alice", _snapshot())
+    assert store.load("room-1", "alice").fulfilment == "delivery"
+    store.save("room-1", "carol", _snapshot(saved_at=time.time() - 120))
+    assert store.load("room-1", "carol") is None
+    store.close()
+
+
+def test_summary_is_compact():
+    lines = [("user", f"line {i} " + "word " * 100) for i in range(20)] + [("assistant", "  ")]
+    summary = compact_summary(lines)
+    assert len(summary) == SUMMARY_LINES
+    assert summary[-1][1].startswith("line 19")
+    assert all(len(text) <= SUMMARY_LINE_CHARS for _, text in summary)
+
+
+def test_resume_context_and_welcome_back_describe_the_cart():
+    snapshot = _snapshot()
+    context = snapshot.resume_context()
+    assert "2x Margherita (Medium) with olives at ₹299 each" in context
+    assert "Fulfilment: delivery" in context
+    assert "user: Two medium margheritas with olives" in context
+    assert "2x Margherita (Medium) with olives" in snapshot.welcome_back()
+    assert SessionSnapshot().is_empty
+
+
+def test_assistant_restores_and_snapshots_its_state():
+    from agent import RestaurantAssistant
+
+    assistant = RestaurantAssistant(resume=_snapshot())
+    assert assistant._cart_items == CART
+    assert assistant._fulfilment == "delivery"
+    assert any(
+        item.type == "message" and "reconnected" in (item.text_content or "") for item in assistant.chat_ctx.items
+    )
+    assistant._cart_items.append({"name": "Coke", "quantity": 1, "price": 60.0})
+    snapshot = assistant.snapshot()
+    assert [item["name"] for item in snapshot.cart_items] == ["Margherita", "Coke"]
+    assert snapshot.summary == _snapshot().summary
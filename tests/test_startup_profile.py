@@ -0,0 +1,59 @@
+import subprocess
+import sys
+import time
+
+import pytest
+
+from startup_profile import (
+    BACKEND_DIR,
+    import_total,
+    import_tree,
+    package_totals,
+    parse_importtime,
+    startup_step,
+    startup_steps,
+)
+
+IMPORTTIME = """\
+import time: self [us] | cumulative | imported package
+import time:       100 |        100 |   encodings
+import time:       200 |        200 | site
+import time:       300 |        300 |     numpy.core
+import time:       500 |        800 |   numpy
+import time:       150 |        150 |   doc_metadata
+import time:        50 |       1000 | agent
+"""
+
+
+def test_import_tree_excludes_interpreter_startup():
+    timings = import_tree(parse_importtime(IMPORTTIME), "agent")
+    assert [t.module for t in timings] == ["numpy.core", "numpy", "doc_metadata", "agent"]
+    assert [t.depth for t in timings] == [2, 1, 1, 0]
+    assert package_totals(timings) == pytest.approx({"numpy": 0.0008, "doc_metadata": 0.00015, "agent": 0.00005})
+    assert list(package_totals(timings)) == ["numpy", "doc_metadata", "agent"]
+    assert import_total(timings) == pytest.approx(0.001)
+
+
+def test_startup_steps_are_timed():
+    with startup_step("test.sleep"):
+        time.sleep(0.02)
+    assert startup_steps()["test.sleep"] >= 0.02
+
+
+def test_importing_the_agent_leaves_heavy_modules_to_prewarm():
+    """
+    Scenario: A job process is spawned and imports agent.py.
+    llama_index, torch and the plugins should load in prewarm, not at import.
+    """
+    heavy = (
+        "llama_index",
+        "torch",
+        "transformers",
+        "onnxruntime",
+        "livekit.plugins.silero",
+        "livekit.plugins.turn_detector",
+    )
+    check = f"import sys, agent; print([m for m in sys.modules if m.startswith({heavy!r})])"
+    result = subprocess.run([sys.executable, "-c", check], cwd=BACKEND_DIR, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == "[]"
@@ -0,0 +1,59 @@
+import asyncio
+import urllib.request
+
+import pytest
+
+import admin_server
+import telemetry
+from simulation.conversations import PIZZA_ORDER
+from simulation.harness import SimulatedProviders, run_conversation
+from simulation.latency import LatencyRecorder
+
+def _span_count(span_name, room, session):
+    return telemetry.REGISTRY.get_sample_value(
+        "agent_span_seconds_count", {"span": span_name, "room": room, "session": session}
+    )
+
+def test_span_records_with_session_labels():
+    async def traced_turn():
+        telemetry.bind_session(room="room-a", session="job-1")
+        with telemetry.span("unit.block"):
+            await asyncio.sleep(0)
+        with pytest.raises(ValueError):
+            with telemetry.span("unit.block"):
+                raise ValueError("boom")
+
+    asyncio.run(traced_turn())
+    assert _span_count("unit.block", "room-a", "job-1") == 2
+    assert telemetry.REGISTRY.get_sample_value(
+        "agent_span_errors_total", {"span": "unit.block", "room": "room-a", "session": "job-1"}
+    ) == 1
+
+    telemetry.release_session(room="room-a", session="job-1")
+    assert _span_count("unit.block", "room-a", "job-1") is None
+
+@pytest.mark.asyncio
+async def test_hot_path_is_traced():
+    """
+    Scenario: A scripted order should produce spans for the turn hook,
+    retrieval, every tool, and every publish.
+    """
+    telemetry.bind_session(room="sim-room", session="traced-order")
+    await run_conversation(PIZZA_ORDER, SimulatedProviders.zero_latency(), LatencyRecorder())
+
+    assert _span_count("on_user_turn_completed", "sim-room", "traced-order") == len(PIZZA_ORDER.turns)
+    assert _span_count("tool.add_item_to_cart", "sim-room", "traced-order") == 2
+    assert _span_count("send_data_message", "sim-room", "traced-order") == 5
+    assert telemetry.REGISTRY.get_sample_value(
+        "agent_data_messages_total",
+        {"message_type": "add_to_cart", "outcome": "ok", "room": "sim-room", "session": "traced-order"},
+    ) == 2
+    telemetry.release_session(room="sim-room", session="traced-order")
+
+def test_metrics_endpoint_serves_prometheus_text():
+    port = admin_server.start_admin_server(port=19464)
+    try:
+        body = urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=5).read().decode()
+        assert "agent_span_seconds" in body
+    finally:
+        admin_server.stop_admin_server()
@@ -0,0 +1,112 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+from livekit import api
+
+import token_server
+from simulation.livekit_api_stub import LiveKitApiStub
+from token_server import SignedTokenCache
+
+API_KEY = "test-key"
+API_SECRET = "test-secret-that-is-long-enough-for-hs256"
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(token_server, "LIVEKIT_API_KEY", API_KEY)
+    monkeypatch.setattr(token_server, "LIVEKIT_API_SECRET", API_SECRET)
+    monkeypatch.setattr(token_server, "LIVEKIT_URL", "wss://example.livekit.cloud")
+    monkeypatch.setattr(token_server, "token_cache", SignedTokenCache(max_entries=100))
+    return TestClient(token_server.app)
+
+
+def test_identical_requests_reuse_the_signed_token(client):
+    request = {"room_name": "room-1", "identity": "caller-1"}
+    first = client.post("/token", json=request).json()["token"]
+    second = client.post("/token", json=request).json()["token"]
+    assert first == second
+    assert token_server.token_cache.stats() == {"entries": 1, "hits": 1, "misses": 1}
+
+
+def test_different_requests_get_different_tokens(client):
+    base = client.post("/token", json={"room_name": "room-1", "identity": "caller-1"}).json()["token"]
+    other_room = client.post("/token", json={"room_name": "room-2", "identity": "caller-1"}).json()["token"]
+    with_metadata = client.post(
+        "/token", json={"room_name": "room-1", "identity": "caller-1", "metadata": "{}"}
+    ).json()["token"]
+    assert len({base, other_room, with_metadata}) == 3
+
+
+def test_token_dispatches_the_named_agent(client):
+    jwt = client.post("/token", json={"room_name": "room-1", "identity": "caller-1"}).json()["token"]
+    claims = api.TokenVerifier(API_KEY, API_SECRET).verify(jwt)
+    assert [a.agent_name for a in claims.room_config.agents] == [token_server.AGENT_NAME]
+
+
+@pytest.fixture
+def livekit_stub(monkeypatch):
+    stub = LiveKitApiStub(API_KEY, API_SECRET)
+    with stub.running() as url:
+        monkeypatch.setattr(token_server, "LIVEKIT_URL", url)
+        yield stub
+
+
+def test_bootstrap_creates_room_and_dispatches_agent(client, livekit_stub):
+    with client:
+        resp = client.post("/bootstrap", json={"identity": "caller-1", "latency_profile": "low-latency"})
+    assert resp.status_code == 200
+    body = resp.json()
+
+    room_name = body["room_name"]
+    assert room_name.startswith("order-")
+    assert list(livekit_stub.rooms) == [room_name]
+    [dispatch] = livekit_stub.dispatches
+    assert (dispatch.id, dispatch.agent_name, dispatch.room) == (body["dispatch_id"], token_server.AGENT_NAME, room_name)
+    assert json.loads(dispatch.metadata) == {"warmup": True, "identity": "caller-1", "latency_profile": "low-latency"}
+
+    # The agent is already on its way: the caller's token must not dispatch a second one
+    claims = api.TokenVerifier(API_KEY, API_SECRET).verify(body["token"])
+    assert claims.video.room == room_name
+    assert claims.room_config is None or not claims.room_config.agents
+
+
+def test_bootstrap_reports_livekit_api_errors(client, livekit_stub, monkeypatch):
+    monkeypatch.setattr(token_server, "LIVEKIT_API_SECRET", "a-different-secret-that-is-long-enough")
+    with client:
+        resp = client.post("/bootstrap", json={"identity": "caller-1", "room_name": "room-1"})
+    assert resp.status_code == 502
+    assert livekit_stub.rooms == {}
+
+
+def test_validation_errors_are_not_cached(client):
+    assert client.post("/token", json={"room_name": " ", "identity": "caller-1"}).status_code == 400
+    assert len(token_server.token_cache) == 0
+
+
+def test_tokens_near_expiry_are_re_signed():
+    now = [1000.0]
+    cache = SignedTokenCache(min_remaining=0.5, clock=lambda: now[0])
+    signed = []
+
+    def sign():
+        signed.append(now[0])
+        return f"jwt-{len(signed)}"
+
+    assert cache.get_or_sign("key", 3600, sign) == ("jwt-1", False)
+    now[0] += 1700
+    assert cache.get_or_sign("key", 3600, sign) == ("jwt-1", True)
+    # Less than half the lifetime left: sign a fresh one
+    now[0] += 200
+    assert cache.get_or_sign("key", 3600, sign) == ("jwt-2", False)
+
+
+def test_cache_is_bounded_lru():
+    cache = SignedTokenCache(max_entries=2)
+    cache.put("a", "jwt-a", 3600)
+    cache.put("b", "jwt-b", 3600)
+    assert cache.get("a") == "jwt-a"
+    cache.put("c", "jwt-c", 3600)
+    assert len(cache) == 2
+    assert cache.get("b") is None
+    assert cache.get("a") == "jwt-a"
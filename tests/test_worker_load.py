@@ -0,0 +1,151 @@
+import asyncio
+import json
+import multiprocessing
+import os
+import time
+
+import pytest
+
+import worker_load
+from worker_load import ProcessLoadReporter, WorkerLoad, admission_control, retrieval_in_flight
+
+
+def _report(directory, pid, lag_p99=0.0, retrievals=0, age=0.0):
+    (directory / f"{pid}.json").write_text(
+        json.dumps({"pid": pid, "lag_p99": lag_p99, "retrievals": retrievals, "at": time.time() - age})
+    )
+
+
+def _idle_cpu(monkeypatch):
+    monkeypatch.setattr(worker_load.psutil, "cpu_percent", lambda interval=None: 10.0)
+
+
+def test_score_is_the_most_loaded_component(tmp_path, monkeypatch):
+    _idle_cpu(monkeypatch)
+    load = WorkerLoad(tmp_path, lag_budget=0.05, max_sessions=8, max_retrievals=4)
+    _report(tmp_path, 1, lag_p99=0.01)
+    _report(tmp_path, 2, lag_p99=0.04, retrievals=1)
+    sample = load.sample(sessions=2)
+    assert sample.lag_p99 == 0.04
+    assert sample.retrievals == 1
+    assert sample.components["lag"] == pytest.approx(0.8)
+    assert sample.components["sessions"] == 0.25
+    assert sample.cpu == 0.1
+    assert sample.score == sample.components["lag"]
+
+
+def test_stale_reports_are_ignored(tmp_path):
+    load = WorkerLoad(tmp_path, lag_budget=0.05, stale_after=5.0)
+    _report(tmp_path, 1, lag_p99=1.0, retrievals=10, age=60)
+    sample = load.sample(sessions=0)
+    assert sample.lag_p99 == 0.0
+    assert sample.retrievals == 0
+
+
+def test_jobs_are_refused_at_the_threshold(tmp_path, monkeypatch):
+    _idle_cpu(monkeypatch)
+
+    class Request:
+        outcome = None
+
+        async def accept(self):
+            self.outcome = "accepted"
+
+        async def reject(self):
+            self.outcome = "rejected"
+
+    class Server:
+        active_jobs = []
+
+    async def run():
+        server = Server()
+        on_request = admission_control(server)
+        request = Request()
+        await on_request(request)
+        assert request.outcome == "accepted"
+
+        server.active_jobs = [object()] * 4
+        request = Request()
+        await on_request(request)
+        assert request.outcome == "rejected"
+
+    monkeypatch.setattr(worker_load, "_LOAD", WorkerLoad(tmp_path, threshold=0.8, max_sessions=4))
+
+    asyncio.run(run())
+
+
+def test_reporter_publishes_loop_lag(tmp_path):
+    async def run():
+        path = tmp_path / "123.json"
+        reporter = ProcessLoadReporter(path, interval=0.05)
+        reporter.start()
+        await asyncio.sleep(0.05)
+        with retrieval_in_flight():
+            # A blocking retrieval: the loop stalls and the retrieval is in flight
+            time.sleep(0.15)
+        await asyncio.sleep(0.1)
+        report = json.loads(path.read_text())
+        await reporter.stop()
+        return report
+
+    report = asyncio.run(run())
+    assert report["lag_p99"] >= 0.1
+    assert not (tmp_path / "123.json").exists()
+
+
+def _job_process(seconds):
+    async def run():
+        worker_load.start_load_reporting()
+        with retrieval_in_flight():
+            await asyncio.sleep(seconds)
+
+    asyncio.run(run())
+
+
+def test_worker_sees_reports_from_forkserver_job_processes(tmp_path, monkeypatch):
+    """
+    Scenario: livekit starts job processes from a forkserver, so a job
+    process's parent is not the worker. Its report must still land in the
+    directory the worker reads.
+    """
+    _idle_cpu(monkeypatch)
+    monkeypatch.setenv("AGENT_LOAD_DIR", str(tmp_path))
+    monkeypatch.setenv("LOAD_REPORT_INTERVAL", "0.05")
+    directory = worker_load.claim_report_dir()
+    assert directory == tmp_path / str(os.getpid())
+    load = WorkerLoad(worker_load.report_dir())
+
+    job = multiprocessing.get_context("forkserver").Process(target=_job_process, args=(5.0,))
+    job.start()
+    try:
+        deadline = time.monotonic() + 10
+        while load.sample(sessions=0).retrievals == 0 and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert load.last.retrievals == 1
+        assert (directory / f"{job.pid}.json").exists()
+    finally:
+        job.terminate()
+        job.join()
+
+
+def test_admission_uses_the_last_sample(tmp_path, monkeypatch):
+    """
+    Scenario: A job request arrives right after the periodic load sample.
+    Admission judges it on that sample and the live session count, without
+    a new CPU reading or report scan.
+    """
+    _idle_cpu(monkeypatch)
+    load = WorkerLoad(tmp_path, threshold=0.8, lag_budget=0.05, max_sessions=8)
+    _report(tmp_path, 1, lag_p99=0.045)
+    load.sample(sessions=0)
+
+    def no_sampling(*args, **kwargs):
+        raise AssertionError("admission must not sample")
+
+    monkeypatch.setattr(worker_load.psutil, "cpu_percent", no_sampling)
+    monkeypatch.setattr(load, "_read_reports", no_sampling)
+    # Lag at 0.9 of its budget in the last sample
+    assert not load.accepts(sessions=0)
+    load.last = None
+    assert load.accepts(sessions=6)
+    assert not load.accepts(sessions=7)